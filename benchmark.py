@@ -0,0 +1,408 @@
+"""Times the simulation and the quad tree so changes can be compared against a baseline.
+
+    python benchmark.py run --output results.json
+    python benchmark.py compare benchmark_baseline.json results.json
+    python benchmark.py memory
+"""
+
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pygame
+from pygame.math import Vector2 as Vector
+import quad_tree
+import simulation
+from boid import Boid
+from spatial_hash import SpatialHashGrid
+from neighbor_list import NeighborList
+from boids.flock import Flock
+from boids.settings import create_settings
+from boids.params import SimulationParams
+from boids.parallel import ParallelStepper
+from boids import jit
+from boids.jit import JitStepper
+from boids.morton import MortonStepper
+
+WIDTH, HEIGHT = 1280, 720
+ACTIVE_AREA = ((100, 100), (WIDTH - 200, HEIGHT - 200))
+DT = 1 / 60
+
+
+def get_metadata():
+    """Information about the machine and code the benchmark was run with."""
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+
+    return {
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "system": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "numpy": np.__version__,
+        "pygame": pygame.version.ver,
+        "numba": jit.numba.__version__ if jit.AVAILABLE else None
+    }
+
+def uniform_distribution(count, rng):
+    """Boids spread evenly over the screen in random directions."""
+
+    states = []
+    for _ in range(count):
+        angle = rng.uniform(0, math.tau)
+        states.append((rng.uniform(0, WIDTH), rng.uniform(0, HEIGHT),
+                       math.cos(angle) * 4, math.sin(angle) * 4))
+
+    return states
+
+def clustered_distribution(count, rng, clusters=8):
+    """Boids bunched into several groups, each group flying its own direction."""
+
+    centers = [(rng.uniform(200, WIDTH - 200), rng.uniform(200, HEIGHT - 200), rng.uniform(0, math.tau))
+               for _ in range(clusters)]
+    states = []
+    for index in range(count):
+        x, y, angle = centers[index % clusters]
+        angle += rng.gauss(0, 0.3)
+        states.append((rng.gauss(x, 60), rng.gauss(y, 60), math.cos(angle) * 4, math.sin(angle) * 4))
+
+    return states
+
+def flock_distribution(count, rng):
+    """Every boid packed into one tight flock flying the same direction."""
+
+    return clustered_distribution(count, rng, clusters=1)
+
+DISTRIBUTIONS = {
+    "uniform": uniform_distribution,
+    "clustered": clustered_distribution,
+    "flock": flock_distribution
+}
+
+def create_index(index, params):
+    """Creates an empty spatial index like main.create_index does."""
+
+    if index == "grid":
+        return SpatialHashGrid(params.sight_radius)
+
+    tree = quad_tree.create_tree(5000, 5000, Vector(WIDTH // 2, HEIGHT // 2), params.max_per_node, params.min_per_node)
+    tree.update_radius(params.sight_radius)
+    return tree
+
+def create_boids(states, params):
+    """Turns (x, y, vx, vy) states into Boid objects."""
+
+    return [Boid(params.settings, Vector(x, y), Vector(vx, vy), color=(227, 220, 194)) for x, y, vx, vy in states]
+
+def measure(function, setup=None, min_repeats=3, max_repeats=20, budget=1.0):
+    """Calls the function repeatedly until the time budget runs out, calling setup
+    before every call without timing it. Returns the times of every call."""
+
+    times = []
+    spent = 0
+    while len(times) < min_repeats or (len(times) < max_repeats and spent < budget):
+        argument = setup() if setup else None
+        start = time.perf_counter()
+        function(argument)
+        elapsed = time.perf_counter() - start
+        times.append(elapsed)
+        spent += elapsed
+
+    return times
+
+def summarize(times, per=1):
+    """Turns a list of call times into the numbers that get saved. The per
+    argument divides the times so they are reported per operation."""
+
+    return {
+        "median": statistics.median(times) / per,
+        "min": min(times) / per,
+        "max": max(times) / per,
+        "repeats": len(times),
+        "operations": per
+    }
+
+def bench_simulation(engine, index, count, distribution, budget, stepper=None, skin=0):
+    """Times single simulation.simulate steps of the given engine. With a skin, the objects
+    engine uses a NeighborList and is timed over several steps, since only some of them rebuild it."""
+
+    rng = random.Random(count)
+    params = SimulationParams(create_settings(boids=count))
+    states = DISTRIBUTIONS[distribution](count, rng)
+    if engine in ("numpy", "parallel", "jit", "morton"):
+        boids = Flock([state[:2] for state in states], [state[2:] for state in states],
+                      [(227, 220, 194)] * count)
+        tree = None
+    else:
+        tree = create_index(index, params)
+        boids = create_boids(states, params)
+        for boid in boids:
+            tree.insert_boid(boid)
+
+    neighbors = NeighborList(skin) if skin and tree is not None else None
+    steps = 10 if neighbors else 1
+
+    def run_steps(_):
+        for _ in range(steps):
+            simulation.simulate(boids, ACTIVE_AREA, params, tree, [], DT, stepper, neighbors=neighbors)
+
+    run_steps(None) # Warm up
+    times = measure(run_steps, min_repeats=1 if count * (engine == "objects") >= 10000 else 3, budget=budget)
+    return summarize(times, per=steps)
+
+def bench_index(index, operation, count, distribution, budget):
+    """Times one spatial index operation, reported as the time per boid."""
+
+    params = SimulationParams(create_settings())
+    radius = params.sight_radius
+
+    def fresh_boids():
+        return create_boids(DISTRIBUTIONS[distribution](count, random.Random(count)), params)
+
+    def filled_index():
+        tree = create_index(index, params)
+        boids = fresh_boids()
+        for boid in boids:
+            tree.insert_boid(boid)
+        return tree, boids
+
+    if operation == "insert":
+        def setup():
+            return create_index(index, params), fresh_boids()
+
+        def run(state):
+            tree, boids = state
+            for boid in boids:
+                tree.insert_boid(boid)
+    elif operation == "insert_bulk":
+        def setup():
+            return create_index(index, params), fresh_boids()
+
+        def run(state):
+            tree, boids = state
+            tree.insert_boids(boids)
+    elif operation == "remove":
+        setup = filled_index
+
+        def run(state):
+            tree, boids = state
+            for boid in boids:
+                tree.remove_boid(boid)
+    elif operation == "remove_bulk":
+        setup = filled_index
+
+        def run(state):
+            tree, boids = state
+            tree.remove_boids(boids)
+    elif operation == "adjust":
+        setup = filled_index
+
+        def run(state):
+            tree, boids = state
+            for boid in boids:
+                tree.adjust_boid_position(boid, DT)
+    elif operation == "query":
+        # query_radius rather than find_points_in_radius, since it's the query simulate calls every step
+        state = filled_index()
+
+        def setup():
+            return state
+
+        def run(state):
+            tree, boids = state
+            for boid in boids:
+                tree.query_radius(boid.position, radius)
+    else:
+        raise ValueError(f"Unknown operation '{operation}'.")
+
+    return summarize(measure(run, setup, budget=budget), per=count)
+
+def count_quads(tree):
+    """Returns the number of quads in the tree."""
+
+    return 1 + sum(count_quads(child) for child in tree.children if child is not None)
+
+def measure_memory(index, count, distribution):
+    """Returns how many bytes a spatial index holding count boids takes, not counting the boids
+    themselves, per boid and in total. For a quad tree it also gives the number of quads and the
+    bytes of a single Node and quad, measured by making many of them."""
+
+    params = SimulationParams(create_settings())
+    boids = create_boids(DISTRIBUTIONS[distribution](count, random.Random(count)), params)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        tree = create_index(index, params)
+        for boid in boids:
+            tree.insert_boid(boid)
+        total = tracemalloc.get_traced_memory()[0] - before
+        result = {"bytes": total, "bytes per boid": total / count}
+        if index == "quadtree":
+            result["quads"] = count_quads(tree)
+            before = tracemalloc.get_traced_memory()[0]
+            nodes = [quad_tree.Node(boid) for boid in boids]
+            result["bytes per node"] = (tracemalloc.get_traced_memory()[0] - before) / count
+            before = tracemalloc.get_traced_memory()[0]
+            quads = [tree.new_child(quad_tree.TOP_LEFT, []) for _ in range(count)]
+            result["bytes per quad"] = (tracemalloc.get_traced_memory()[0] - before) / count
+    finally:
+        tracemalloc.stop()
+
+    return result
+
+def run_benchmarks(args, out=sys.stdout):
+    """Runs every selected benchmark and returns the results keyed by name."""
+
+    results = {}
+
+    def record(name, result):
+        results[name] = result
+        print(f"{name:<45} {result['median'] * 1000:10.4f} ms", file=out)
+        out.flush()
+
+    stepper = ParallelStepper(args.workers, min_parallel_boids=0) if "parallel" in args.engines else None
+    steppers = {"parallel": stepper, "jit": JitStepper(), "morton": MortonStepper()}
+    try:
+        for engine in args.engines:
+            for count in args.sizes:
+                if engine == "objects" and count > args.max_object_boids:
+                    continue # The object engine takes far too long at the largest sizes
+
+                index = args.simulate_index + (f"-skin{args.skin:g}" if args.skin else "")
+                index = {"objects": index, "morton": "morton"}.get(engine, "grid")
+                name = f"simulate/{engine}/{index}/uniform/{count}"
+                record(name, bench_simulation(engine, args.simulate_index, count, "uniform", args.budget,
+                                              steppers.get(engine), args.skin))
+    finally:
+        if stepper:
+            stepper.close()
+
+    for index in args.indexes:
+        for distribution in args.distributions:
+            for count in args.index_sizes:
+                for operation in ("insert", "insert_bulk", "remove", "remove_bulk", "adjust", "query"):
+                    name = f"index/{index}/{operation}/{distribution}/{count}"
+                    record(name, bench_index(index, operation, count, distribution, args.budget))
+
+    return results
+
+def compare(baseline, current, threshold, out=sys.stdout):
+    """Prints how each benchmark changed from the baseline and returns the names
+    of the ones that got slower by more than the threshold."""
+
+    regressions = []
+    if baseline["metadata"].get("processor") != current["metadata"].get("processor") or \
+            baseline["metadata"].get("machine") != current["metadata"].get("machine"):
+        print("Warning: the baseline was recorded on a different machine.", file=out)
+
+    for name in sorted(set(baseline["results"]) | set(current["results"])):
+        if name not in baseline["results"] or name not in current["results"]:
+            print(f"{name:<45} {'only in ' + ('current' if name in current['results'] else 'baseline'):>32}", file=out)
+            continue
+
+        old = baseline["results"][name]["median"]
+        new = current["results"][name]["median"]
+        ratio = new / old if old > 0 else float("inf")
+        if ratio > 1 + threshold:
+            status = "REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            status = "faster"
+        else:
+            status = ""
+        print(f"{name:<45} {old * 1000:10.4f} -> {new * 1000:10.4f} ms {ratio:6.2f}x {status}", file=out)
+
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks the boid simulation and quad tree.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmarks and save the results")
+    run_parser.add_argument("--output", default="benchmark_results.json", help="Where to save the JSON results")
+    run_parser.add_argument("--engines", nargs="+", choices=["objects", "numpy", "parallel", "jit", "morton"],
+                            default=["objects", "numpy"],
+                            help="morton is the numpy engine finding neighbors with a linear quad tree")
+    run_parser.add_argument("--workers", type=int, default=None,
+                            help="Processes for the parallel engine (defaults to the number of CPUs)")
+    run_parser.add_argument("--sizes", nargs="+", type=int, default=[100, 1000, 5000, 10000, 50000],
+                            help="Boid counts to time simulation.simulate at")
+    run_parser.add_argument("--max-object-boids", type=int, default=50000,
+                            help="Skip the objects engine above this many boids")
+    run_parser.add_argument("--simulate-index", choices=["quadtree", "grid"], default="quadtree",
+                            help="The spatial index the objects engine uses")
+    run_parser.add_argument("--skin", type=float, default=0,
+                            help="Give the objects engine a neighbor list that looks this far past the sight radius")
+    run_parser.add_argument("--indexes", nargs="+", choices=["quadtree", "grid"], default=["quadtree"],
+                            help="Spatial indexes to microbenchmark")
+    run_parser.add_argument("--index-sizes", nargs="+", type=int, default=[1000, 5000])
+    run_parser.add_argument("--distributions", nargs="+", choices=list(DISTRIBUTIONS), default=list(DISTRIBUTIONS))
+    run_parser.add_argument("--budget", type=float, default=1.0, help="Seconds to spend repeating each benchmark")
+    run_parser.add_argument("--quick", action="store_true", help="Only run small sizes")
+
+    compare_parser = commands.add_parser("compare", help="Compare results against a baseline")
+    compare_parser.add_argument("baseline", help="Stored results to compare against")
+    compare_parser.add_argument("current", help="New results")
+    compare_parser.add_argument("--threshold", type=float, default=0.1,
+                                help="Fraction slower than the baseline that counts as a regression")
+
+    memory_parser = commands.add_parser("memory", help="Measure how much memory the spatial indexes take")
+    memory_parser.add_argument("--indexes", nargs="+", choices=["quadtree", "grid"], default=["quadtree", "grid"])
+    memory_parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000])
+    memory_parser.add_argument("--distributions", nargs="+", choices=list(DISTRIBUTIONS), default=["uniform"])
+
+    args = parser.parse_args(argv)
+    if args.command == "memory":
+        for index in args.indexes:
+            for distribution in args.distributions:
+                for count in args.sizes:
+                    result = measure_memory(index, count, distribution)
+                    details = "".join(f", {value:.0f} {name}" if isinstance(value, float) else f", {value} {name}"
+                                      for name, value in result.items() if name not in ("bytes", "bytes per boid"))
+                    print(f"memory/{index}/{distribution}/{count:<8} {result['bytes per boid']:8.1f} bytes per boid"
+                          f"{details}")
+        return 0
+
+    if args.command == "compare":
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        with open(args.current) as file:
+            current = json.load(file)
+
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}.")
+            return 1
+        return 0
+
+    if args.quick:
+        args.sizes = [size for size in args.sizes if size <= 1000]
+        args.index_sizes = [size for size in args.index_sizes if size <= 1000]
+        args.budget = min(args.budget, 0.2)
+
+    results = {"metadata": get_metadata(), "results": run_benchmarks(args)}
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Saved results to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
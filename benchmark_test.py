@@ -0,0 +1,53 @@
+import unittest
+import contextlib
+import io
+import json
+import os
+import tempfile
+import benchmark
+
+
+class TestBenchmarkMethods(unittest.TestCase):
+    def setUp(self):
+        """Sets up a folder for the results before every test."""
+
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+        self.output = os.path.join(self.folder.name, "results.json")
+
+    def run_main(self, *argv):
+        """Runs the benchmark script with the arguments, returning its exit code and printed text."""
+
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            code = benchmark.main(list(argv))
+        return code, out.getvalue()
+
+    def test_1_run_and_compare(self):
+        """Test that a short run saves every benchmark and compares against itself without regressions."""
+
+        code, _ = self.run_main("run", "--output", self.output, "--engines", "objects", "numpy", "--sizes", "50",
+                                "--index-sizes", "50", "--distributions", "uniform", "--budget", "0")
+        with open(self.output) as file:
+            results = json.load(file)
+        with self.subTest("Run failed."):
+            self.assertEqual(code, 0)
+        with self.subTest("Missing benchmarks."):
+            self.assertIn("simulate/objects/quadtree/uniform/50", results["results"])
+            self.assertIn("simulate/numpy/grid/uniform/50", results["results"])
+            for operation in ("insert", "insert_bulk", "remove", "remove_bulk", "adjust", "query"):
+                self.assertIn(f"index/quadtree/{operation}/uniform/50", results["results"])
+        with self.subTest("Regressed against itself."):
+            self.assertEqual(self.run_main("compare", self.output, self.output)[0], 0)
+
+    def test_2_memory(self):
+        """Test that the memory command measures both indexes."""
+
+        code, text = self.run_main("memory", "--sizes", "50")
+        self.assertEqual(code, 0)
+        self.assertIn("memory/quadtree/uniform/50", text)
+        self.assertIn("memory/grid/uniform/50", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
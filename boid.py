@@ -7,4 +7,5 @@ class Boid:
         self.settings = settings
         self.position = position
         self.velocity = velocity
-        self.color = color
\ No newline at end of file
+        self.color = color
+        self.previous_position = Vector(position) # Where it was before the last step, for smooth drawing
\ No newline at end of file
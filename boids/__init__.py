@@ -0,0 +1,9 @@
+"""The parts of the boid simulation that don't need pygame: the boid arrays,
+the grid and linear quad tree used to find neighbors, and the step function that moves the flock."""
+
+from boids.flock import Flock
+from boids.grid import NeighborGrid
+from boids.morton import LinearQuadTree
+from boids.engine import step, compute_velocities, Zone
+from boids.settings import DEFAULT_SETTINGS, create_settings
+from boids.params import SimulationParams
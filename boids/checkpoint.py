@@ -0,0 +1,121 @@
+import json
+import os
+import threading
+import time
+import numpy as np
+from boids.engine import Zone
+from boids.settings import DEFAULT_SETTINGS
+
+VERSION = 1
+
+
+def save(path, positions, velocities, colors, settings, zones=(), step=0, rng_state=None, random_state=None,
+         tree_layout=None):
+    """Writes the whole state of a simulation to a NumPy .npz file. The settings are the
+    sidebar settings dict, the zones anything with a position and radius, the rng_state the
+    state of a NumPy Generator's bit generator and the random_state from random.getstate.
+    A tree layout from QuadTree.get_layout lets the tree be rebuilt without inserting every boid.
+    It's written to a temporary file first so a crash while writing never leaves a broken checkpoint."""
+
+    info = {
+        "settings": {name: setting["value"] for name, setting in settings.items()},
+        "rng_state": rng_state,
+        "random_state": random_state
+    }
+    arrays = {
+        "version": np.array(VERSION),
+        "step": np.array(step),
+        "positions": np.asarray(positions, dtype=np.float64).reshape(-1, 2),
+        "velocities": np.asarray(velocities, dtype=np.float64).reshape(-1, 2),
+        "colors": np.asarray(colors, dtype=np.uint8).reshape(-1, 3),
+        "zones": np.array([(*zone.position, zone.radius) for zone in zones], dtype=np.float64).reshape(-1, 3),
+        "info": np.frombuffer(json.dumps(info).encode(), dtype=np.uint8)
+    }
+    if tree_layout is not None:
+        arrays.update({f"tree_{name}": np.asarray(value) for name, value in tree_layout.items()})
+
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as file:
+        np.savez(file, **arrays)
+    os.replace(temporary_path, path)
+
+
+def load(path):
+    """Reads a checkpoint written by save into a dict with the same names save takes,
+    except the settings only map each setting's name to its value. Settings that
+    no longer exist are left out, so they can all be set on a SimulationParams."""
+
+    with np.load(path) as data:
+        if int(data["version"]) != VERSION:
+            raise ValueError(f"Unsupported checkpoint version {int(data['version'])}.")
+
+        info = json.loads(data["info"].tobytes().decode())
+        random_state = info["random_state"]
+        if random_state is not None:
+            version, internal_state, gauss_next = random_state
+            random_state = (version, tuple(internal_state), gauss_next) # JSON turned the tuples into lists
+
+        tree_layout = {name[len("tree_"):]: data[name] for name in data.files if name.startswith("tree_")}
+        return {
+            "step": int(data["step"]),
+            "positions": data["positions"],
+            "velocities": data["velocities"],
+            "colors": data["colors"],
+            "zones": data["zones"],
+            "settings": {name: value for name, value in info["settings"].items() if name in DEFAULT_SETTINGS},
+            "rng_state": info["rng_state"],
+            "random_state": random_state,
+            "tree_layout": tree_layout or None
+        }
+
+
+class CheckpointWriter:
+    """Saves checkpoints every interval seconds on a background thread, so the
+    main loop only pays for taking a copy of the state. A checkpoint that comes
+    due while the last one is still being written waits for the next chance."""
+
+    def __init__(self, path, interval=5):
+        self.path = path
+        self.interval = interval
+        self.last_write = time.perf_counter()
+        self.thread = None
+        self.error = None
+
+    def is_due(self):
+        """Whether it's time to write another checkpoint and the last one is done."""
+
+        if self.thread is not None and self.thread.is_alive():
+            return False
+
+        return time.perf_counter() - self.last_write >= self.interval
+
+    def write(self, wait=False, **state):
+        """Copies the state, then saves it on a background thread, or before returning
+        if wait is set. The state is the arguments save takes after the path."""
+
+        self.close() # Never have two writes of the same file at once
+        # Take copies of anything the main loop might change while it's being written
+        state = {name: np.array(value) if isinstance(value, np.ndarray) else value for name, value in state.items()}
+        state["settings"] = {name: dict(setting) for name, setting in state["settings"].items()}
+        state["zones"] = [Zone(tuple(zone.position), zone.radius) for zone in state.get("zones", ())]
+        self.last_write = time.perf_counter()
+        self.thread = threading.Thread(target=self.save, args=(state,), daemon=True)
+        self.thread.start()
+        if wait:
+            self.close()
+
+    def save(self, state):
+        try:
+            save(self.path, **state)
+        except Exception as error:
+            self.error = error # Raised on the main thread by close
+
+    def close(self):
+        """Waits for the checkpoint being written and raises any error writing it."""
+
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise RuntimeError(f"Unable to write checkpoint '{self.path}'.") from error
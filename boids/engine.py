@@ -0,0 +1,114 @@
+import collections
+from boids.grid import NeighborGrid
+import numpy as np
+
+# A NoGoZone without the drawing, for when there is no screen or the zone has to be sent to another process
+Zone = collections.namedtuple("Zone", ["position", "radius"])
+
+
+def compute_velocities(positions, velocities, grid, values, zones, active_area, start=0, stop=None, out=None):
+    """Computes the new velocities of boids [start, stop) from the current positions
+    and velocities of the whole flock. The values are in the order returned by
+    SimulationParams.steering_values. The velocities are written into out if it's given,
+    which must not be the velocities array itself."""
+
+    view_distance, separation_distance, centering_factor, \
+        matching_factor, avoid_factor, avoid_zone_factor, turn_factor, \
+        min_speed, max_speed, neighbor_count = values
+    if stop is None:
+        stop = len(positions)
+
+    count = stop - start
+    position = positions[start:stop]
+    if out is None:
+        velocity = velocities[start:stop].copy()
+    else:
+        velocity = out
+        velocity[:] = velocities[start:stop]
+
+    i, j = grid.pairs(start, stop)
+    offsets = positions[i] - positions[j]
+    squared_distances = offsets[:, 0] * offsets[:, 0] + offsets[:, 1] * offsets[:, 1]
+    if neighbor_count:
+        # Only keep the closest boids within sight of each boid, closest first
+        sight_radius = max(view_distance, separation_distance)
+        in_sight = squared_distances <= sight_radius * sight_radius
+        i, j, offsets, squared_distances = i[in_sight], j[in_sight], offsets[in_sight], squared_distances[in_sight]
+        by_distance = np.lexsort((squared_distances, i))
+        i, j, offsets, squared_distances = i[by_distance], j[by_distance], offsets[by_distance], \
+            squared_distances[by_distance]
+        rank = np.arange(len(i)) - np.searchsorted(i, i, "left") # Position within each boid's pairs
+        nearest = rank < neighbor_count
+        i, j, offsets, squared_distances = i[nearest], j[nearest], offsets[nearest], squared_distances[nearest]
+
+    too_close = squared_distances < separation_distance * separation_distance
+    in_view = ~too_close & (squared_distances < view_distance * view_distance)
+    i -= start # Index into the [start, stop) slice
+
+    # Adding all the close boids results in the vector pointing away from all
+    close_i = i[too_close]
+    avoid_vector = np.column_stack((np.bincount(close_i, offsets[too_close, 0], count),
+                                    np.bincount(close_i, offsets[too_close, 1], count)))
+
+    view_i = i[in_view]
+    view_j = j[in_view]
+    neighboring_boids = np.bincount(view_i, minlength=count)
+    has_neighbors = neighboring_boids > 0
+    if has_neighbors.any():
+        average_pos = np.column_stack((np.bincount(view_i, positions[view_j, 0], count),
+                                       np.bincount(view_i, positions[view_j, 1], count)))
+        average_vel = np.column_stack((np.bincount(view_i, velocities[view_j, 0], count),
+                                       np.bincount(view_i, velocities[view_j, 1], count)))
+        divisor = neighboring_boids[has_neighbors, None]
+        position_average = average_pos[has_neighbors] / divisor
+        velocity_average = average_vel[has_neighbors] / divisor
+        velocity[has_neighbors] += ((position_average - position[has_neighbors]) * centering_factor +
+                                    (velocity_average - velocity[has_neighbors]) * matching_factor)
+
+    avoid_zone_vector = np.zeros((count, 2))
+    for zone in zones:
+        distance_to_zone = position - tuple(zone.position)
+        inside = (distance_to_zone * distance_to_zone).sum(axis=1) < zone.radius * zone.radius
+        avoid_zone_vector[inside] += distance_to_zone[inside]
+
+    # Push away from avoidences
+    velocity += avoid_vector * avoid_factor
+    velocity += avoid_zone_vector * avoid_zone_factor
+
+    speed = np.hypot(velocity[:, 0], velocity[:, 1])
+    speed[speed == 0] = 0.0001 # Don't want a vector of 0
+    # Clamp speed
+    too_fast = speed > max_speed
+    velocity[too_fast] *= (max_speed / speed[too_fast])[:, None]
+    too_slow = speed < min_speed
+    velocity[too_slow] *= (min_speed / speed[too_slow])[:, None]
+
+    margin_pos_x, margin_pos_y = active_area[0]
+    arena_width, arena_height = active_area[1]
+    # Turn around when outside active area
+    velocity[position[:, 1] < margin_pos_y, 1] += turn_factor
+    velocity[position[:, 0] < margin_pos_x, 0] += turn_factor
+    velocity[position[:, 1] > margin_pos_y + arena_height, 1] -= turn_factor
+    velocity[position[:, 0] > margin_pos_x + arena_width, 0] -= turn_factor
+
+    return velocity
+
+def move(flock, dt):
+    """Writes the next positions from the next velocities, then swaps the flock's buffers."""
+
+    next_positions, next_velocities = flock.get_next_buffers()
+    np.multiply(next_velocities, dt * 60, out=next_positions)
+    next_positions += flock.positions
+    flock.swap()
+
+def step(flock, active_area, params, zones, dt, compute=compute_velocities, index=NeighborGrid):
+    """Advances the whole flock by one frame with batched array operations.
+    Only the current state is read, so the order of the boids doesn't matter.
+    Compute is the function that steers the boids, such as jit.compute_velocities,
+    and index is the class that finds the pairs of boids near each other."""
+
+    values = params.steering_values()
+    grid = index(flock.positions, params.sight_radius)
+    next_velocities = flock.get_next_buffers()[1]
+    compute(flock.positions, flock.velocities, grid, values, zones, active_area, out=next_velocities)
+    move(flock, dt)
@@ -0,0 +1,90 @@
+import numpy as np
+
+
+class Flock:
+    """Holds every boid's position, velocity, and color in contiguous NumPy arrays
+    instead of separate Boid objects. Row i of each array belongs to the same boid.
+
+    The positions and velocities are double buffered: a step reads only the current
+    arrays and writes into the next arrays, then the two are swapped."""
+
+    def __init__(self, positions=(), velocities=(), colors=()):
+        self.positions = np.array(positions, dtype=np.float64).reshape(-1, 2)
+        self.velocities = np.array(velocities, dtype=np.float64).reshape(-1, 2)
+        self.colors = np.array(colors, dtype=np.uint8).reshape(-1, 3)
+        if not len(self.positions) == len(self.velocities) == len(self.colors):
+            raise ValueError("Positions, velocities, and colors must have the same length.")
+        # After a swap these hold the previous state until they are written over
+        self.next_positions = None
+        self.next_velocities = None
+
+    def __len__(self):
+        return len(self.positions)
+
+    def get_next_buffers(self):
+        """Returns the (positions, velocities) arrays the next state should be written into.
+        They are only remade when the number of boids changed."""
+
+        if self.next_positions is None or self.next_velocities is None or len(self.next_positions) != len(self):
+            self.next_positions = np.empty_like(self.positions)
+            self.next_velocities = np.empty_like(self.velocities)
+
+        return self.next_positions, self.next_velocities
+
+    def swap(self):
+        """Makes the next state the current one. The old arrays become the next buffers."""
+
+        self.positions, self.next_positions = self.next_positions, self.positions
+        self.velocities, self.next_velocities = self.next_velocities, self.velocities
+
+    def copy_to(self, other, previous=False):
+        """Copies the boids into another Flock, reusing its arrays when they're already the right size.
+        If previous is set, the positions from before the last step are copied into its next
+        positions too, so it can be drawn between the two."""
+
+        names = ["positions", "velocities", "colors"]
+        if previous and self.next_positions is not None:
+            names.append("next_positions")
+        for name in names:
+            source = getattr(self, name)
+            target = getattr(other, name)
+            if target is not None and target.shape == source.shape:
+                target[:] = source
+            else:
+                setattr(other, name, source.copy())
+        if "next_positions" not in names:
+            other.next_positions = None # It only has the one state
+        other.next_velocities = None # Drawing between steps only needs the positions
+
+    def add(self, positions, velocities, colors):
+        """Appends new boids to the end of the arrays."""
+
+        self.positions = np.concatenate((self.positions, np.reshape(positions, (-1, 2))))
+        self.velocities = np.concatenate((self.velocities, np.reshape(velocities, (-1, 2))))
+        self.colors = np.concatenate((self.colors, np.reshape(colors, (-1, 3)).astype(np.uint8)))
+        self.next_positions = self.next_velocities = None # The rows no longer line up with the boids
+
+    def spawn(self, count, width, height, min_speed, max_speed, color, rng):
+        """Adds boids at random positions within the width and height, with random
+        directions and speeds between the minimum and maximum speed."""
+
+        positions = rng.integers(0, [width + 1, height + 1], size=(count, 2)).astype(np.float64)
+        # Same biased direction as main.get_random_direction
+        directions = rng.uniform(-2, 2, size=(count, 2))
+        lengths = np.hypot(directions[:, 0], directions[:, 1])
+        directions[lengths == 0] = (1, 0)
+        lengths[lengths == 0] = 1
+        directions /= lengths[:, None]
+        speeds = min_speed + (max_speed - min_speed) * rng.random(count) # Randomize the speed
+        self.add(positions, directions * speeds[:, None], np.tile(color, (count, 1)))
+
+    def remove_random(self, count, rng):
+        """Deletes the given amount of randomly chosen boids."""
+
+        count = min(count, len(self)) # Make sure it's possible to delete that many
+        keep = np.ones(len(self), dtype=bool)
+        keep[rng.choice(len(self), size=count, replace=False)] = False
+        self.positions = self.positions[keep]
+        self.velocities = self.velocities[keep]
+        self.colors = self.colors[keep]
+        self.next_positions = self.next_velocities = None # The rows no longer line up with the boids
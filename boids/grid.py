@@ -0,0 +1,61 @@
+import numpy as np
+
+
+class NeighborGrid:
+    """Buckets positions into square cells the size of the search radius, so the
+    neighbors of a boid can only be in its own cell or the 8 surrounding ones.
+    The cells are stored as a sorted array of cell keys rather than a dict of lists."""
+
+    def __init__(self, positions, cell_size):
+        self.cell_size = max(cell_size, 1) # A radius of 0 would make infinitely many cells
+        cells = np.floor(positions / self.cell_size).astype(np.int64)
+        if len(cells):
+            # Shift so there is an empty column/row on each side and neighbor keys never wrap around
+            cells -= cells.min(axis=0) - 1
+            self.columns = int(cells[:, 1].max()) + 2
+        else:
+            self.columns = 1
+
+        self.keys = cells[:, 0] * self.columns + cells[:, 1]
+        self.order = np.argsort(self.keys, kind="stable") # Boid indices grouped by cell
+        self.sorted_keys = self.keys[self.order]
+
+    @classmethod
+    def from_arrays(cls, keys, order, sorted_keys, columns, cell_size):
+        """Recreates a grid from arrays that were already calculated, such as
+        ones a worker process reads out of shared memory."""
+
+        grid = cls.__new__(cls)
+        grid.keys = keys
+        grid.order = order
+        grid.sorted_keys = sorted_keys
+        grid.columns = columns
+        grid.cell_size = cell_size
+        return grid
+
+    def pairs(self, start=0, stop=None):
+        """Returns index arrays (i, j) pairing every boid i in [start, stop) with every
+        other boid j in the cells around it. The pairs still need an exact distance check."""
+
+        if stop is None:
+            stop = len(self.keys)
+
+        rows = np.arange(start, stop)
+        keys = self.keys[start:stop]
+        found_i = []
+        found_j = []
+        for dx in (-1, 0, 1):
+            # The three cells of a column are consecutive keys, so one range covers them
+            column_keys = keys + dx * self.columns
+            low = np.searchsorted(self.sorted_keys, column_keys - 1, "left")
+            high = np.searchsorted(self.sorted_keys, column_keys + 1, "right")
+            counts = high - low
+            # Expand each boid's [low, high) range into one entry per candidate
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            found_i.append(np.repeat(rows, counts))
+            found_j.append(self.order[np.repeat(low, counts) + offsets])
+
+        i = np.concatenate(found_i)
+        j = np.concatenate(found_j)
+        not_self = i != j
+        return i[not_self], j[not_self]
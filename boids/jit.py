@@ -0,0 +1,183 @@
+import numpy as np
+from boids import engine
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Whether the compiled kernel can be used. Without Numba everything here falls back to the numpy engine
+AVAILABLE = numba is not None
+
+if AVAILABLE:
+    # The TBB threading layer keeps the program from exiting once it has run on
+    # a SimulationThread, so only use it when neither of the others is available
+    numba.config.THREADING_LAYER_PRIORITY = ["omp", "workqueue", "tbb"]
+
+
+def compile_kernel(function):
+    """Compiles the function to run its prange loops across every core, if Numba is installed."""
+
+    if not AVAILABLE:
+        return function
+
+    return numba.njit(parallel=True, cache=True)(function)
+
+
+prange = numba.prange if AVAILABLE else range
+
+
+@compile_kernel
+def steer_range(positions, velocities, keys, order, sorted_keys, columns, values, zones, active_area, start, stop,
+                out):
+    """The same steering as engine.compute_velocities, but one boid at a time straight off
+    the grid's sorted cell keys, so no arrays of neighbor pairs are ever created."""
+
+    view_distance, separation_distance, centering_factor, matching_factor, avoid_factor, \
+        avoid_zone_factor, turn_factor, min_speed, max_speed, neighbor_count = values
+    squared_view = view_distance * view_distance
+    squared_separation = separation_distance * separation_distance
+    squared_sight = max(squared_view, squared_separation)
+    k = int(neighbor_count)
+    margin_pos_x, margin_pos_y, arena_width, arena_height = active_area
+
+    for row in prange(stop - start):
+        boid = start + row
+        x = positions[boid, 0]
+        y = positions[boid, 1]
+        velocity_x = velocities[boid, 0]
+        velocity_y = velocities[boid, 1]
+        avoid_x = avoid_y = 0.0
+        position_x = position_y = 0.0
+        matching_x = matching_y = 0.0
+        neighboring_boids = 0
+        if k > 0:
+            # Keep the k closest boids within sight, sorted closest first
+            nearest_distances = np.empty(k)
+            nearest = np.empty(k, np.int64)
+            found = 0
+        for dx in range(-1, 2):
+            # The three cells of a column are consecutive keys, so one range covers them
+            column_key = keys[boid] + dx * columns
+            low = np.searchsorted(sorted_keys, column_key - 1, "left")
+            high = np.searchsorted(sorted_keys, column_key + 1, "right")
+            for index in range(low, high):
+                other = order[index]
+                if other == boid:
+                    continue
+
+                offset_x = x - positions[other, 0]
+                offset_y = y - positions[other, 1]
+                squared_distance = offset_x * offset_x + offset_y * offset_y
+                if k > 0:
+                    if squared_distance > squared_sight or (found == k and
+                                                            squared_distance >= nearest_distances[k - 1]):
+                        continue
+
+                    slot = found if found < k else k - 1
+                    found = min(found + 1, k)
+                    while slot > 0 and nearest_distances[slot - 1] > squared_distance:
+                        nearest_distances[slot] = nearest_distances[slot - 1]
+                        nearest[slot] = nearest[slot - 1]
+                        slot -= 1
+                    nearest_distances[slot] = squared_distance
+                    nearest[slot] = other
+                elif squared_distance < squared_separation:
+                    avoid_x += offset_x
+                    avoid_y += offset_y
+                elif squared_distance < squared_view:
+                    position_x += positions[other, 0]
+                    position_y += positions[other, 1]
+                    matching_x += velocities[other, 0]
+                    matching_y += velocities[other, 1]
+                    neighboring_boids += 1
+
+        if k > 0:
+            for slot in range(found):
+                other = nearest[slot]
+                if nearest_distances[slot] < squared_separation:
+                    avoid_x += x - positions[other, 0]
+                    avoid_y += y - positions[other, 1]
+                elif nearest_distances[slot] < squared_view:
+                    position_x += positions[other, 0]
+                    position_y += positions[other, 1]
+                    matching_x += velocities[other, 0]
+                    matching_y += velocities[other, 1]
+                    neighboring_boids += 1
+
+        if neighboring_boids > 0:
+            velocity_x += ((position_x / neighboring_boids - x) * centering_factor +
+                           (matching_x / neighboring_boids - velocities[boid, 0]) * matching_factor)
+            velocity_y += ((position_y / neighboring_boids - y) * centering_factor +
+                           (matching_y / neighboring_boids - velocities[boid, 1]) * matching_factor)
+
+        avoid_zone_x = avoid_zone_y = 0.0
+        for zone in range(zones.shape[0]):
+            distance_x = x - zones[zone, 0]
+            distance_y = y - zones[zone, 1]
+            if distance_x * distance_x + distance_y * distance_y < zones[zone, 2] * zones[zone, 2]:
+                avoid_zone_x += distance_x
+                avoid_zone_y += distance_y
+
+        velocity_x += avoid_x * avoid_factor
+        velocity_y += avoid_y * avoid_factor
+        velocity_x += avoid_zone_x * avoid_zone_factor
+        velocity_y += avoid_zone_y * avoid_zone_factor
+
+        speed = np.hypot(velocity_x, velocity_y)
+        if speed == 0:
+            speed = 0.0001
+        if speed > max_speed:
+            velocity_x *= max_speed / speed
+            velocity_y *= max_speed / speed
+        if speed < min_speed: # Checked against the same speed even when slowed down, like the numpy engine
+            velocity_x *= min_speed / speed
+            velocity_y *= min_speed / speed
+
+        if y < margin_pos_y:
+            velocity_y += turn_factor
+        if x < margin_pos_x:
+            velocity_x += turn_factor
+        if y > margin_pos_y + arena_height:
+            velocity_y -= turn_factor
+        if x > margin_pos_x + arena_width:
+            velocity_x -= turn_factor
+
+        out[row, 0] = velocity_x
+        out[row, 1] = velocity_y
+
+
+def compute_velocities(positions, velocities, grid, values, zones, active_area, start=0, stop=None, out=None):
+    """A drop in replacement for engine.compute_velocities that runs the compiled
+    kernel, or engine.compute_velocities itself when Numba isn't installed."""
+
+    if not AVAILABLE:
+        return engine.compute_velocities(positions, velocities, grid, values, zones, active_area, start, stop, out)
+
+    if stop is None:
+        stop = len(positions)
+    if out is None:
+        out = np.empty((stop - start, 2))
+
+    zone_array = np.array([(*zone.position, zone.radius) for zone in zones], dtype=np.float64).reshape(-1, 3)
+    (margin_pos_x, margin_pos_y), (arena_width, arena_height) = active_area
+    steer_range(positions, velocities, grid.keys, grid.order, grid.sorted_keys, grid.columns,
+                np.array(values, dtype=np.float64), zone_array,
+                np.array((margin_pos_x, margin_pos_y, arena_width, arena_height), dtype=np.float64),
+                start, stop, out)
+    return out
+
+
+class JitStepper:
+    """Steps a Flock with the compiled kernel. It's compiled the first time it's used,
+    or loaded from Numba's cache, so the first step can take a few seconds."""
+
+    def step(self, flock, active_area, params, zones, dt):
+        """Advances the flock by one frame the same way engine.step does."""
+
+        engine.step(flock, active_area, params, zones, dt, compute_velocities)
+
+    def close(self):
+        """Nothing to free, but matches ParallelStepper."""
+
+        pass
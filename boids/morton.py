@@ -0,0 +1,226 @@
+import math
+import numpy as np
+from boids import engine
+
+# Masks that spread the bits of a 32 bit number out to every other bit, from the widest step to the narrowest
+SPREAD_STEPS = ((16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF), (4, 0x0F0F0F0F0F0F0F0F),
+                (2, 0x3333333333333333), (1, 0x5555555555555555))
+# The 9 cells around a cell, including itself
+NEIGHBOR_CELLS = tuple((dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1))
+
+
+def spread_bits(values):
+    """Moves every bit of each value to twice its position, leaving a 0 between them."""
+
+    values = np.asarray(values, dtype=np.uint64) & np.uint64(0xFFFFFFFF)
+    for shift, mask in SPREAD_STEPS:
+        values = (values | (values << np.uint64(shift))) & np.uint64(mask)
+    return values
+
+
+def compact_bits(values):
+    """Undoes spread_bits, taking every other bit."""
+
+    values = np.asarray(values, dtype=np.uint64) & np.uint64(SPREAD_STEPS[-1][1])
+    masks = [mask for _, mask in reversed(SPREAD_STEPS[:-1])] + [0xFFFFFFFF]
+    for shift, mask in zip((1, 2, 4, 8, 16), masks):
+        values = (values | (values >> np.uint64(shift))) & np.uint64(mask)
+    return values
+
+
+def interleave(columns, rows):
+    """Returns the Morton code of every cell, which orders the cells along a Z shaped curve
+    so the cells of any quad of a quad tree are next to each other."""
+
+    return spread_bits(columns) | (spread_bits(rows) << np.uint64(1))
+
+
+def expand_ranges(rows, low, high):
+    """Pairs every row with each index in its [low, high) range, as (rows, indices) arrays."""
+
+    counts = high - low
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(rows, counts), np.repeat(low, counts) + offsets
+
+
+class LinearQuadTree:
+    """A quad tree stored as the boids sorted by the Morton codes of the cells they're in,
+    rebuilt from scratch every step instead of updated as the boids move. Every quad of the
+    tree is a contiguous range of the sorted codes, so the leaves are found by splitting
+    ranges until they hold at most max_per_leaf boids, and every leaf is a range of the
+    sorted boids. The smallest leaves are cells the size of the search radius, so the
+    neighbors of a boid are in the few leaves that cover the cells around it and a query
+    scans their ranges. Sparse areas end up in a few big leaves instead of many cells."""
+
+    def __init__(self, positions, cell_size, max_per_leaf=16):
+        self.positions = positions
+        self.cell_size = max(cell_size, 1) # A radius of 0 would make infinitely many cells
+        self.max_per_leaf = max_per_leaf
+        if len(positions):
+            # Line the cells up with NeighborGrid's and leave an empty column/row
+            # before the first one so the cells around every boid are positive
+            self.origin = (np.floor(positions.min(axis=0) / self.cell_size) - 1) * self.cell_size
+            self.cells = np.floor((positions - self.origin) / self.cell_size).astype(np.int64)
+            self.depth = max(int(self.cells.max()) + 1, 1).bit_length() # Levels below the root
+        else:
+            self.origin = np.zeros(2)
+            self.cells = np.zeros((0, 2), dtype=np.int64)
+            self.depth = 0
+
+        self.codes = interleave(self.cells[:, 0], self.cells[:, 1])
+        self.order = np.argsort(self.codes, kind="stable") # Boid indices along the curve
+        self.sorted_codes = self.codes[self.order]
+        self.find_leaves()
+
+    def get_range(self, prefixes, level):
+        """Returns the [start, stop) ranges of the sorted boids in the quads with the given
+        Morton code prefixes, where level 0 is the root and depth is the single cells."""
+
+        shift = np.uint64(2 * (self.depth - level))
+        prefixes = np.asarray(prefixes, dtype=np.uint64)
+        return (np.searchsorted(self.sorted_codes, prefixes << shift, "left"),
+                np.searchsorted(self.sorted_codes, (prefixes + np.uint64(1)) << shift, "left"))
+
+    def find_leaves(self):
+        """Splits the root a level at a time into the quads that hold at most max_per_leaf
+        boids, or are single cells. Each level is done with one search of the sorted codes.
+        Quads without any boids are left out, so not every cell is in a leaf."""
+
+        levels, prefixes, starts, stops = [], [], [], []
+        quads = np.zeros(1, dtype=np.uint64)
+        for level in range(self.depth + 1):
+            start, stop = self.get_range(quads, level)
+            holding = stop > start
+            quads, start, stop = quads[holding], start[holding], stop[holding]
+            is_leaf = (stop - start <= self.max_per_leaf) | (level == self.depth)
+            levels.append(np.full(is_leaf.sum(), level))
+            prefixes.append(quads[is_leaf])
+            starts.append(start[is_leaf])
+            stops.append(stop[is_leaf])
+            # The 4 children of every quad that is too full
+            quads = (quads[~is_leaf, None] * np.uint64(4) + np.arange(4, dtype=np.uint64)).ravel()
+            if not len(quads):
+                break
+
+        by_start = np.argsort(np.concatenate(starts))
+        self.leaf_levels = np.concatenate(levels)[by_start]
+        self.leaf_prefixes = np.concatenate(prefixes)[by_start]
+        self.leaf_starts = np.concatenate(starts)[by_start]
+        self.leaf_stops = np.concatenate(stops)[by_start]
+        # The leaves don't overlap, so their first and end codes are both sorted
+        shifts = (2 * (self.depth - self.leaf_levels)).astype(np.uint64)
+        self.leaf_first_codes = self.leaf_prefixes << shifts
+        self.leaf_end_codes = (self.leaf_prefixes + np.uint64(1)) << shifts
+        self.leaf_rects = self.get_leaf_rects()
+
+    def get_leaf_rects(self):
+        """Returns the (left, top, size) of every leaf."""
+
+        sizes = 2 ** (self.depth - self.leaf_levels)
+        columns = compact_bits(self.leaf_prefixes).astype(np.int64) * sizes
+        rows = compact_bits(self.leaf_prefixes >> np.uint64(1)).astype(np.int64) * sizes
+        return (self.origin[0] + columns * self.cell_size, self.origin[1] + rows * self.cell_size,
+                sizes * self.cell_size)
+
+    def find_leaf(self, codes):
+        """Returns the leaf holding the cell with each Morton code, or -1 for cells in no leaf."""
+
+        leaves = np.searchsorted(self.leaf_first_codes, codes, "right") - 1
+        inside = (leaves >= 0) & (codes < self.leaf_end_codes[leaves])
+        return np.where(inside, leaves, -1)
+
+    def reaches(self, leaves, positions, radius):
+        """Whether any of each leaf's square is within the radius of each position."""
+
+        left, top, size = (values[leaves] for values in self.leaf_rects)
+        dx = np.maximum(np.maximum(left - positions[..., 0], positions[..., 0] - left - size), 0)
+        dy = np.maximum(np.maximum(top - positions[..., 1], positions[..., 1] - top - size), 0)
+        return dx * dx + dy * dy <= radius * radius
+
+    def query_ranges(self, position, radius):
+        """Returns the [low, high) ranges of the sorted boids in the leaves that reach within
+        the radius of the position. The leaves are found through the quads that overlap the
+        square around the circle, using quads at least as big as the radius so there are
+        never more than 9 of them."""
+
+        if not len(self.leaf_starts):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        shift = max(math.ceil(math.log2(radius / self.cell_size)), 0) if radius > self.cell_size else 0
+        level = max(self.depth - shift, 0)
+        size = self.cell_size * 2 ** (self.depth - level)
+        x, y = position
+        first_column = max(math.floor((x - radius - self.origin[0]) / size), 0)
+        first_row = max(math.floor((y - radius - self.origin[1]) / size), 0)
+        last_column = math.floor((x + radius - self.origin[0]) / size)
+        last_row = math.floor((y + radius - self.origin[1]) / size)
+        if last_column < first_column or last_row < first_row:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        columns, rows = np.meshgrid(np.arange(first_column, last_column + 1), np.arange(first_row, last_row + 1))
+        quads = interleave(columns.ravel(), rows.ravel())
+        shift = np.uint64(2 * (self.depth - level))
+        # The leaves overlapping a quad are the ones ending after it starts and starting before it ends
+        low = np.searchsorted(self.leaf_end_codes, quads << shift, "right")
+        high = np.searchsorted(self.leaf_first_codes, (quads + np.uint64(1)) << shift, "left")
+        leaves = np.unique(expand_ranges(np.zeros(len(low), dtype=np.int64), low, high)[1])
+        leaves = leaves[self.reaches(leaves, np.asarray(position, dtype=np.float64), radius)]
+        return self.leaf_starts[leaves], self.leaf_stops[leaves]
+
+    def query_radius(self, position, radius):
+        """Returns the indices of the positions within the radius of the position."""
+
+        low, high = self.query_ranges(position, radius)
+        candidates = self.order[np.concatenate([np.arange(start, stop) for start, stop in zip(low, high)])] \
+            if len(low) else np.zeros(0, dtype=np.int64)
+        offsets = self.positions[candidates] - position
+        return candidates[(offsets * offsets).sum(axis=1) <= radius * radius]
+
+    def pairs(self, start=0, stop=None):
+        """Returns index arrays (i, j) pairing every boid i in [start, stop) with every
+        other boid j in the leaves that reach within a cell of it, like NeighborGrid.pairs.
+        The pairs still need an exact distance check."""
+
+        if stop is None:
+            stop = len(self.codes)
+
+        rows = np.arange(start, stop)
+        if not len(rows):
+            return rows, rows.copy()
+
+        # Boids share the leaves around their cell, so only look them up once for each cell in use
+        first_in_cell = np.ones(len(self.sorted_codes), dtype=bool)
+        first_in_cell[1:] = self.sorted_codes[1:] != self.sorted_codes[:-1]
+        used_codes = self.sorted_codes[first_in_cell]
+        used_cells = np.column_stack((compact_bits(used_codes), compact_bits(used_codes >> np.uint64(1)))).astype(np.int64)
+        boid_cells = np.empty(len(self.order), dtype=np.int64)
+        boid_cells[self.order] = np.cumsum(first_in_cell) - 1 # Which used cell each boid is in
+        boid_cells = boid_cells[start:stop]
+        leaves = np.column_stack([self.find_leaf(interleave(used_cells[:, 0] + dx, used_cells[:, 1] + dy))
+                                  for dx, dy in NEIGHBOR_CELLS])
+        # A big leaf can cover several of the cells around a cell, but must only be searched once
+        leaves.sort(axis=1)
+        leaves[:, 1:][leaves[:, 1:] == leaves[:, :-1]] = -1
+
+        boid_leaves = leaves[boid_cells]
+        near = boid_leaves >= 0
+        near[near] = self.reaches(boid_leaves[near], self.positions[np.nonzero(near)[0] + start], self.cell_size)
+        i, sorted_j = expand_ranges(np.repeat(rows, len(NEIGHBOR_CELLS))[near.ravel()],
+                                    self.leaf_starts[boid_leaves[near]], self.leaf_stops[boid_leaves[near]])
+        j = self.order[sorted_j]
+        not_self = i != j
+        return i[not_self], j[not_self]
+
+
+class MortonStepper:
+    """Steps a Flock like engine.step, but finds the neighbors with a LinearQuadTree."""
+
+    def step(self, flock, active_area, params, zones, dt):
+        """Advances the flock by one frame the same way engine.step does."""
+
+        engine.step(flock, active_area, params, zones, dt, index=LinearQuadTree)
+
+    def close(self):
+        """Nothing to free, but matches ParallelStepper."""
+
+        pass
@@ -0,0 +1,137 @@
+import math
+import multiprocessing
+import os
+import weakref
+from multiprocessing import shared_memory
+import numpy as np
+from boids.engine import compute_velocities, move, Zone
+from boids.grid import NeighborGrid
+
+# The arrays that live in shared memory, with their dtype and columns per boid
+BUFFERS = {
+    "positions": (np.float64, 2),
+    "velocities": (np.float64, 2),
+    "new_velocities": (np.float64, 2),
+    "keys": (np.int64, 1),
+    "order": (np.int64, 1),
+    "sorted_keys": (np.int64, 1)
+}
+
+# Shared memory blocks each worker process has already opened, by name
+_attached = {}
+
+
+def get_array(memory, name, count):
+    """Returns an array of the first count boids viewing into a shared memory block."""
+
+    dtype, columns = BUFFERS[name]
+    shape = (count, columns) if columns > 1 else (count,)
+    return np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+
+def attach(names):
+    """Opens the shared memory blocks in a worker, closing any old blocks
+    that were replaced when the buffers grew."""
+
+    for block_name in list(_attached):
+        if block_name not in names.values():
+            _attached.pop(block_name).close()
+
+    for block_name in names.values():
+        if block_name not in _attached:
+            _attached[block_name] = shared_memory.SharedMemory(name=block_name)
+
+    return {name: _attached[block_name] for name, block_name in names.items()}
+
+def compute_chunk(task):
+    """Runs in a worker process. Reads the flock and grid out of shared memory and writes
+    the new velocities of boids [start, stop) into the shared new velocities."""
+
+    names, count, columns, cell_size, values, zones, active_area, start, stop = task
+    memory = attach(names)
+    arrays = {name: get_array(memory[name], name, count) for name in names}
+    grid = NeighborGrid.from_arrays(arrays["keys"], arrays["order"], arrays["sorted_keys"], columns, cell_size)
+    compute_velocities(arrays["positions"], arrays["velocities"], grid, values, [Zone(*zone) for zone in zones],
+                       active_area, start, stop, out=arrays["new_velocities"][start:stop])
+
+def release(pool, memories):
+    """Stops the workers and frees the shared memory. Called when the stepper is closed or garbage collected."""
+
+    pool.terminate()
+    pool.join()
+    for memory in memories.values():
+        memory.close()
+        memory.unlink()
+
+
+class ParallelStepper:
+    """Steps a Flock with the steering forces computed by a pool of worker processes.
+    The flock and the neighbor grid are copied into shared memory each step, so workers
+    read them directly instead of having them pickled. The main process builds the grid
+    and moves the boids, and each worker computes the velocities of one chunk of boids."""
+
+    def __init__(self, workers=None, chunks_per_worker=2, min_parallel_boids=2000):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunks = self.workers * chunks_per_worker # More chunks than workers evens out the load
+        self.min_parallel_boids = min_parallel_boids # Below this the overhead is more than the work
+        # Spawn rather than fork so workers don't inherit threads from the main process. Spawned
+        # workers import the main script again, so it must keep its setup under a __main__ guard
+        self.pool = multiprocessing.get_context("spawn").Pool(self.workers)
+        self.capacity = 0
+        self.memories = {}
+        self.finalizer = weakref.finalize(self, release, self.pool, self.memories)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Stops the workers and frees the shared memory."""
+
+        self.finalizer()
+
+    def reserve(self, count):
+        """Makes sure the shared buffers have room for the given number of boids."""
+
+        if count <= self.capacity:
+            return
+
+        capacity = max(count, self.capacity * 2, 1024) # Grow ahead so buffers aren't remade every spawn
+        for memory in self.memories.values():
+            memory.close()
+            memory.unlink()
+
+        for name, (dtype, columns) in BUFFERS.items():
+            size = capacity * columns * np.dtype(dtype).itemsize
+            self.memories[name] = shared_memory.SharedMemory(create=True, size=size)
+        self.capacity = capacity
+
+    def step(self, flock, active_area, params, zones, dt):
+        """Advances the whole flock by one frame, the same as engine.step."""
+
+        count = len(flock)
+        values = params.steering_values()
+        grid = NeighborGrid(flock.positions, params.sight_radius)
+        next_velocities = flock.get_next_buffers()[1]
+        if count < self.min_parallel_boids:
+            compute_velocities(flock.positions, flock.velocities, grid, values, zones, active_area, out=next_velocities)
+        else:
+            self.reserve(count)
+            arrays = {name: get_array(memory, name, count) for name, memory in self.memories.items()}
+            arrays["positions"][:] = flock.positions
+            arrays["velocities"][:] = flock.velocities
+            arrays["keys"][:] = grid.keys
+            arrays["order"][:] = grid.order
+            arrays["sorted_keys"][:] = grid.sorted_keys
+
+            names = {name: memory.name for name, memory in self.memories.items()}
+            zones = [(tuple(zone.position), zone.radius) for zone in zones]
+            chunk_size = math.ceil(count / self.chunks)
+            tasks = [(names, count, grid.columns, grid.cell_size, list(values), zones, active_area,
+                      start, min(start + chunk_size, count))
+                     for start in range(0, count, chunk_size)]
+            self.pool.map(compute_chunk, tasks)
+            next_velocities[:] = arrays["new_velocities"]
+
+        move(flock, dt)
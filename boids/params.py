@@ -0,0 +1,78 @@
+from boids.settings import DEFAULT_SETTINGS
+
+# Settings that only make sense as whole numbers
+INTEGER_SETTINGS = {"boids", "neighbor count", "min per node", "max per node"}
+
+
+def get_attribute_name(name):
+    """Turns a setting name like "view distance" into its attribute name "view_distance"."""
+
+    return name.replace(" ", "_")
+
+
+class SimulationParams:
+    """The current value of every setting as a plain attribute, so the simulation can
+    read them without looking through the nested settings dict. Changes must go through
+    set, which keeps the settings dict up to date and tells every listener which setting
+    changed, so things like the spatial index only react to the settings they care about."""
+
+    __slots__ = tuple(get_attribute_name(name) for name in DEFAULT_SETTINGS) + ("settings", "listeners")
+
+    def __init__(self, settings):
+        self.settings = settings # The sidebar still uses the dict for each setting's min and max
+        self.listeners = []
+        for name, setting in settings.items():
+            setattr(self, get_attribute_name(name), self.convert(name, setting["value"]))
+
+    @staticmethod
+    def convert(name, value):
+        """Returns the value as the type the setting is stored as."""
+
+        return int(value) if name in INTEGER_SETTINGS else float(value)
+
+    def get(self, name):
+        """Returns the value of a setting by its sidebar name."""
+
+        return getattr(self, get_attribute_name(name))
+
+    def set(self, name, value):
+        """Changes a setting by its sidebar name and notifies the listeners if its value changed."""
+
+        self.settings[name]["value"] = value
+        value = self.convert(name, value)
+        if value == self.get(name):
+            return
+
+        setattr(self, get_attribute_name(name), value)
+        for listener in list(self.listeners):
+            listener(name, self)
+
+    def add_listener(self, listener):
+        """Registers a function that is called with (name, params) whenever a setting changes."""
+
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """Stops calling a function that was registered with add_listener."""
+
+        self.listeners.remove(listener)
+
+    @property
+    def sight_radius(self):
+        """The furthest distance a boid needs to look for other boids."""
+
+        return max(self.view_distance, self.separation_distance)
+
+    def steering_values(self):
+        """The values that steer the boids, in the order engine.compute_velocities expects."""
+
+        return (self.view_distance,
+                self.separation_distance,
+                self.centering_factor,
+                self.matching_factor,
+                self.avoid_factor,
+                self.avoid_zone_factor,
+                self.turn_factor,
+                self.minimum_speed,
+                self.maximum_speed,
+                self.neighbor_count)
@@ -0,0 +1,122 @@
+import collections
+import threading
+import time
+from boids.flock import Flock
+from boids import engine
+
+
+class TripleBuffer:
+    """Hands finished frames from one producer thread to one consumer thread. The producer
+    always has its own frame to write into and the consumer always has its own frame to read,
+    so neither ever waits for the other to finish. The third frame is the newest finished one.
+
+    Python has no atomic swap, so the index of the third frame waits in a deque, whose appends
+    and pops are atomic. Each thread swaps by appending its frame and then popping the oldest
+    one. Both append before they pop, so the deque is never empty and no frame is ever held by
+    both threads, without taking a lock. Rarely the consumer gets its own older frame back,
+    which only means the newest frame is drawn a call later."""
+
+    def __init__(self, create_frame):
+        self.frames = [create_frame() for _ in range(3)]
+        self.back = 0 # Being written by the producer
+        self.front = 2 # Being read by the consumer
+        self.front_time = None # When the front frame was published
+        # The newest finished frame's index and when it was published
+        self.ready = collections.deque([(1, None)])
+
+    def exchange(self, index, published):
+        """Swaps a frame for the one waiting between the threads and returns its index and publish time."""
+
+        self.ready.append((index, published))
+        return self.ready.popleft()
+
+    def get_back(self):
+        """The frame the producer should write the next finished frame into."""
+
+        return self.frames[self.back]
+
+    def publish(self):
+        """Called by the producer once the back frame is finished."""
+
+        self.back = self.exchange(self.back, time.perf_counter())[0]
+
+    def get_latest(self):
+        """Returns the newest finished frame for the consumer. It stays the
+        consumer's to read until the next call."""
+
+        published = self.ready[0][1]
+        if published is not None and (self.front_time is None or published > self.front_time):
+            self.front, self.front_time = self.exchange(self.front, self.front_time)
+
+        return self.frames[self.front]
+
+
+class SimulationThread(threading.Thread):
+    """Steps a Flock on its own thread at a fixed rate and publishes a copy of the flock
+    after every step into a TripleBuffer, so drawing and simulating overlap. The zones
+    are read through get_zones every step since they can be changed from the main thread,
+    so it should return a copy of them."""
+
+    def __init__(self, flock, params, active_area, get_zones, adjust_population=None, step=engine.step,
+                 step_size=1 / 60, after_step=None):
+        super().__init__(daemon=True) # Don't keep the program open after the window closes
+        self.flock = flock
+        self.params = params
+        self.active_area = active_area
+        self.get_zones = get_zones
+        self.adjust_population = adjust_population # Called with the flock before every step
+        self.step = step
+        self.step_size = step_size
+        self.after_step = after_step # Called with the flock after every step, such as to record it
+        self.fast_forward_steps = 0 # When above 0, run this many steps per frame without waiting
+        self.buffer = TripleBuffer(Flock)
+        self.steps = 0
+        self.error = None
+        self.stopped = threading.Event()
+        self.flock.copy_to(self.buffer.get_back())
+        self.buffer.publish()
+
+    def run(self):
+        next_step = time.perf_counter()
+        try:
+            while not self.stopped.is_set():
+                if self.adjust_population:
+                    self.adjust_population(self.flock)
+
+                steps = self.fast_forward_steps or 1
+                for _ in range(steps):
+                    self.step(self.flock, self.active_area, self.params, self.get_zones(), self.step_size)
+                    if self.after_step:
+                        self.after_step(self.flock)
+                self.steps += steps
+
+                self.flock.copy_to(self.buffer.get_back(), previous=True)
+                self.buffer.publish()
+
+                next_step += self.step_size
+                delay = next_step - time.perf_counter()
+                if self.fast_forward_steps or delay <= 0:
+                    next_step = time.perf_counter() # Don't try to catch up on lost time
+                else:
+                    self.stopped.wait(delay)
+        except Exception as error:
+            self.error = error # Raised on the main thread by check
+
+    def get_latest(self):
+        """Returns the newest finished step and how far to draw it from the positions
+        before the step, going from 0 when it was published to 1 a step later."""
+
+        frame = self.buffer.get_latest()
+        return frame, min((time.perf_counter() - self.buffer.front_time) / self.step_size, 1)
+
+    def check(self):
+        """Raises any error that stopped the simulation thread."""
+
+        if self.error is not None:
+            raise RuntimeError("The simulation thread stopped.") from self.error
+
+    def stop(self):
+        """Stops the thread after its current step."""
+
+        self.stopped.set()
+        self.join()
@@ -0,0 +1,192 @@
+"""Runs the simulation without a window, for example:
+
+    python -m boids.run --boids 5000 --steps 10000 --seed 1 --dump final.npz
+"""
+
+import argparse
+import sys
+import time
+import numpy as np
+from boids.flock import Flock
+from boids.engine import step, Zone
+from boids.settings import create_settings, DEFAULT_SETTINGS
+from boids.params import SimulationParams
+from boids.parallel import ParallelStepper
+from boids.jit import JitStepper
+from boids.trajectory import TrajectoryWriter
+from boids import checkpoint
+from boids.checkpoint import CheckpointWriter
+
+
+def parse_setting(text):
+    """Turns "name=value" into a (name, value) pair, where the name is a sidebar
+    setting's name and may be written with underscores instead of spaces."""
+
+    name, _, value = text.partition("=")
+    if not value:
+        raise argparse.ArgumentTypeError(f"Expected name=value but got '{text}'.")
+
+    name = name.strip().replace("_", " ")
+    if name not in DEFAULT_SETTINGS:
+        raise argparse.ArgumentTypeError(f"Unknown setting '{name}', expected one of: {', '.join(DEFAULT_SETTINGS)}.")
+
+    return name, check_setting(name, float(value))
+
+def parse_boids(text):
+    """Turns the number of boids into an int within the sidebar's range for it."""
+
+    try:
+        boids = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected a whole number of boids but got '{text}'.")
+
+    return check_setting("boids", boids)
+
+def check_setting(name, value):
+    """Returns the value if it's within the sidebar's range for the setting."""
+
+    setting = DEFAULT_SETTINGS[name]
+    if not setting["min"] <= value <= setting["max"]:
+        raise argparse.ArgumentTypeError(f"{name} must be from {setting['min']:g} to {setting['max']:g}, not {value:g}.")
+
+    return value
+
+def parse_zone(text):
+    """Turns "x,y,radius" into a Zone."""
+
+    try:
+        x, y, radius = (float(value) for value in text.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected x,y,radius but got '{text}'.")
+
+    return Zone((x, y), radius)
+
+def get_active_area(width, height, margin=100):
+    """The area the boids try to stay within, the same as the Canvas without a sidebar."""
+
+    return ((margin, margin), (width - margin * 2, height - margin * 2))
+
+def get_checkpoint_state(flock, params, zones, rng, step):
+    """Collects everything a checkpoint saves about a headless run."""
+
+    return {
+        "positions": flock.positions,
+        "velocities": flock.velocities,
+        "colors": flock.colors,
+        "settings": params.settings,
+        "zones": zones,
+        "step": step,
+        "rng_state": rng.bit_generator.state if rng is not None else None
+    }
+
+def run(flock, params, active_area, zones, steps, dt=1 / 60, report_every=0, out=sys.stdout, stepper=None,
+        recorder=None, checkpointer=None, rng=None, first_step=0):
+    """Steps the flock the given number of times and returns the steps per second.
+    A TrajectoryWriter recorder is given the flock after every step. A CheckpointWriter
+    checkpointer saves the state whenever it's due, counting the steps from first_step,
+    and once more at the end with the last step that finished, even if the run is stopped early."""
+
+    step_flock = stepper.step if stepper else step
+    completed = 0
+    start = time.perf_counter()
+    try:
+        for step_number in range(1, steps + 1):
+            step_flock(flock, active_area, params, zones, dt)
+            completed = step_number
+            if recorder:
+                recorder.append(flock.positions, flock.velocities, flock.colors)
+            if checkpointer and checkpointer.is_due():
+                checkpointer.write(**get_checkpoint_state(flock, params, zones, rng, first_step + step_number))
+            if report_every and step_number % report_every == 0:
+                elapsed = time.perf_counter() - start
+                print(f"step {step_number}/{steps}: {step_number / elapsed:.1f} steps/sec", file=out)
+    finally:
+        if checkpointer:
+            checkpointer.write(wait=True, **get_checkpoint_state(flock, params, zones, rng, first_step + completed))
+
+    elapsed = time.perf_counter() - start
+    return steps / elapsed if elapsed > 0 else float("inf")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Runs the boid simulation without a window.")
+    parser.add_argument("--boids", type=parse_boids, default=None,
+                        help=f"Number of boids, up to {DEFAULT_SETTINGS['boids']['max']} like the sidebar "
+                             "(defaults to the sidebar default)")
+    parser.add_argument("--steps", type=int, default=1000, help="Number of simulation steps to run")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the random starting positions")
+    parser.add_argument("--width", type=int, default=1280, help="Width of the simulated area")
+    parser.add_argument("--height", type=int, default=720, help="Height of the simulated area")
+    parser.add_argument("--set", type=parse_setting, action="append", default=[], metavar="NAME=VALUE",
+                        help="Change a setting, e.g. --set 'view distance=60'")
+    parser.add_argument("--zone", type=parse_zone, action="append", default=[], metavar="X,Y,RADIUS",
+                        help="Add a NoGoZone the boids avoid")
+    parser.add_argument("--report-every", type=int, default=0, metavar="STEPS",
+                        help="Print the speed every this many steps")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Number of processes to compute steering in (0 to not use any)")
+    parser.add_argument("--jit", action="store_true",
+                        help="Steer with the compiled kernel across every core (needs Numba, otherwise the same as numpy)")
+    parser.add_argument("--record", default=None, metavar="PATH",
+                        help="Save the flock after every step to a trajectory file, which main.py --play shows")
+    parser.add_argument("--checkpoint", default=None, metavar="PATH",
+                        help="Save the whole state every few seconds and at the end, to continue with --restore")
+    parser.add_argument("--checkpoint-every", type=float, default=5, metavar="SECONDS",
+                        help="Seconds between checkpoints")
+    parser.add_argument("--restore", default=None, metavar="PATH",
+                        help="Continue from a checkpoint instead of random starting positions")
+    parser.add_argument("--dump", default=None, metavar="PATH",
+                        help="Save the final positions, velocities, and colors to a .npz file")
+    args = parser.parse_args(argv)
+    if args.restore and args.boids is not None:
+        parser.error("--boids can't be used with --restore, which continues with the checkpoint's boids")
+    if args.jit and args.workers:
+        parser.error("--workers can't be used with --jit, which already steers on every core")
+
+    params = SimulationParams(create_settings())
+    rng = np.random.default_rng(args.seed)
+    zones = args.zone
+    first_step = 0
+    if args.restore:
+        state = checkpoint.load(args.restore)
+        for name, value in state["settings"].items():
+            params.set(name, value)
+        flock = Flock(state["positions"], state["velocities"], state["colors"])
+        zones = [Zone((x, y), radius) for x, y, radius in state["zones"].tolist()] + zones
+        if state["rng_state"] is not None:
+            rng.bit_generator.state = state["rng_state"]
+        first_step = state["step"]
+    for name, value in args.set:
+        params.set(name, value)
+
+    if not args.restore:
+        if args.boids is not None:
+            params.set("boids", args.boids)
+        flock = Flock()
+        flock.spawn(params.boids, args.width, args.height, params.minimum_speed, params.maximum_speed,
+                    (227, 220, 194), rng)
+
+    if args.jit:
+        stepper = JitStepper()
+    else:
+        stepper = ParallelStepper(args.workers) if args.workers else None
+    recorder = TrajectoryWriter(args.record, 1 / 60) if args.record else None
+    checkpointer = CheckpointWriter(args.checkpoint, args.checkpoint_every) if args.checkpoint else None
+    try:
+        steps_per_second = run(flock, params, get_active_area(args.width, args.height), zones,
+                               args.steps, report_every=args.report_every, stepper=stepper, recorder=recorder,
+                               checkpointer=checkpointer, rng=rng, first_step=first_step)
+    finally:
+        if stepper:
+            stepper.close()
+        if recorder:
+            recorder.close()
+    print(f"{len(flock)} boids, {args.steps} steps: {steps_per_second:.1f} steps/sec")
+
+    if args.dump:
+        np.savez(args.dump, positions=flock.positions, velocities=flock.velocities,
+                 colors=flock.colors, steps=args.steps)
+        print(f"Saved final state to {args.dump}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import copy
+
+# Settings that appear on the sidebar
+DEFAULT_SETTINGS = {
+    "boids": {
+        "value": 100,
+        "min": 1,
+        "max": 5000
+    },
+    "view distance": {
+        "value": 50,
+        "min": 0,
+        "max": 100
+    },
+    "separation distance": {
+        "value": 15,
+        "min": 0,
+        "max": 100
+    },
+    "neighbor count": {
+        "value": 0,
+        "min": 0,
+        "max": 50
+    },
+    "minimum speed": {
+        "value": 3,
+        "min": 0.1,
+        "max": 20
+    },
+    "maximum speed": {
+        "value": 6,
+        "min": 0.1,
+        "max": 20
+    },
+    "centering factor": {
+        "value": 0.0005,
+        "min": 0,
+        "max": 0.01
+    },
+    "matching factor": {
+        "value": 0.05,
+        "min": 0,
+        "max": 0.5
+    },
+    "avoid factor": {
+        "value": 0.05,
+        "min": 0,
+        "max": 0.5
+    },
+    "avoid zone factor": {
+        "value": 0.003,
+        "min": 0,
+        "max": 0.1
+    },
+    "turn factor": {
+        "value": 0.2,
+        "min": 0,
+        "max": 5
+    },
+    "boid size": {
+        "value": 8,
+        "min": 0.01,
+        "max": 30
+    },
+    "min per node": {
+        "value": 15,
+        "min": 1,
+        "max": 50
+    },
+    "max per node": {
+        "value": 20,
+        "min": 1,
+        "max": 50
+    }
+}
+
+
+def create_settings(**values):
+    """Returns a new copy of the default settings with any given values changed.
+    Underscores in the keyword names stand in for the spaces in the setting names."""
+
+    settings = copy.deepcopy(DEFAULT_SETTINGS)
+    for key, value in values.items():
+        name = key.replace("_", " ")
+        if name not in settings:
+            raise KeyError(f"There is no setting named '{name}'.")
+        
+        settings[name]["value"] = value
+    
+    return settings
@@ -0,0 +1,172 @@
+import struct
+import numpy as np
+from boids.flock import Flock
+
+# The file starts with a header, followed by chunks of frames and ends with an index of the chunks.
+# Every chunk holds frames with the same boids and colors:
+#   chunk header: first step, frame count, boid count
+#   colors: boid count * 3 uint8s, padded to a multiple of 16 bytes
+#   frames: frame count * boid count * (x, y, vx, vy) float32s
+MAGIC = b"BOIDTRAJ"
+VERSION = 1
+HEADER = struct.Struct("<8sIdIQQ") # Magic, version, step size, frames per chunk, index offset, chunk count
+HEADER_SIZE = 64
+CHUNK_HEADER = struct.Struct("<QII")
+INDEX_DTYPE = np.dtype([("offset", "<u8"), ("first_step", "<u8"), ("frames", "<u4"), ("boids", "<u4")])
+FRAME_VALUES = 4 # x, y, vx, vy
+
+
+def get_colors_size(boids):
+    """The bytes a chunk's colors take up, padded so the frames after them stay aligned."""
+
+    return -(-boids * 3 // 16) * 16
+
+
+class TrajectoryWriter:
+    """Records the state of the boids after every step into a trajectory file. Frames are kept
+    in memory until a chunk is full or the boids or their colors change, then written at once."""
+
+    def __init__(self, path, step_size, chunk_frames=256):
+        self.path = path
+        self.step_size = step_size
+        self.chunk_frames = chunk_frames
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, step_size, chunk_frames, 0, 0).ljust(HEADER_SIZE, b"\0"))
+        self.index = [] # (offset, first step, frames, boids) of every written chunk
+        self.frames = [] # Frames of the chunk that hasn't been written yet
+        self.colors = None
+        self.steps = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    def append(self, positions, velocities, colors):
+        """Adds the state after a step to the recording."""
+
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 2)
+        colors = np.asarray(colors, dtype=np.uint8).reshape(-1, 3)
+        # A chunk only stores one set of colors, so any change of color starts a new one
+        if self.frames and (len(self.frames) >= self.chunk_frames or not np.array_equal(colors, self.colors)):
+            self.flush()
+
+        frame = np.empty((len(positions), FRAME_VALUES), dtype=np.float32)
+        frame[:, :2] = positions
+        frame[:, 2:] = np.asarray(velocities, dtype=np.float32).reshape(-1, 2)
+        if not self.frames:
+            self.colors = colors.copy() # The caller's colors can change in place
+        self.frames.append(frame)
+        self.steps += 1
+
+    def flush(self):
+        """Writes the frames in memory to the file as a chunk."""
+
+        if not self.frames:
+            return
+
+        boids = len(self.colors)
+        offset = self.file.tell()
+        self.file.write(CHUNK_HEADER.pack(self.steps - len(self.frames), len(self.frames), boids))
+        self.file.write(self.colors.tobytes().ljust(get_colors_size(boids), b"\0"))
+        for frame in self.frames:
+            self.file.write(frame.tobytes())
+        self.index.append((offset, self.steps - len(self.frames), len(self.frames), boids))
+        self.frames = []
+
+    def close(self):
+        """Writes the rest of the frames and the index. Closing twice does nothing."""
+
+        if self.file.closed:
+            return
+
+        self.flush()
+        index_offset = self.file.tell()
+        self.file.write(np.array(self.index, dtype=INDEX_DTYPE).tobytes())
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, self.step_size, self.chunk_frames, index_offset,
+                                    len(self.index)))
+        self.file.close()
+
+
+class TrajectoryReader:
+    """Memory maps a trajectory file so any frame can be read without loading the
+    rest of the file. Files that weren't closed are read by walking their chunks."""
+
+    def __init__(self, path):
+        self.memory = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, version, self.step_size, self.chunk_frames, index_offset, chunk_count = \
+            HEADER.unpack_from(self.memory, 0)
+        if magic != MAGIC:
+            raise ValueError(f"'{path}' is not a trajectory file.")
+        if version != VERSION:
+            raise ValueError(f"Unsupported trajectory version {version}.")
+
+        if index_offset:
+            self.index = np.frombuffer(self.memory, dtype=INDEX_DTYPE, count=chunk_count, offset=index_offset)
+        else:
+            self.index = self.scan_chunks()
+        # The frame number each chunk starts at, for finding which chunk holds a frame
+        self.chunk_starts = np.concatenate(([0], np.cumsum(self.index["frames"], dtype=np.int64)))
+
+    def scan_chunks(self):
+        """Rebuilds the index by following the chunks from the start of the file."""
+
+        chunks = []
+        offset = HEADER_SIZE
+        while offset + CHUNK_HEADER.size <= len(self.memory):
+            first_step, frames, boids = CHUNK_HEADER.unpack_from(self.memory, offset)
+            size = CHUNK_HEADER.size + get_colors_size(boids) + frames * boids * FRAME_VALUES * 4
+            if frames == 0 or offset + size > len(self.memory): # Cut off while being written
+                break
+
+            chunks.append((offset, first_step, frames, boids))
+            offset += size
+
+        return np.array(chunks, dtype=INDEX_DTYPE)
+
+    def __len__(self):
+        return int(self.chunk_starts[-1])
+
+    @property
+    def duration(self):
+        """Seconds of simulation in the recording."""
+
+        return len(self) * self.step_size
+
+    def get_step(self, frame):
+        """Returns the simulation step a frame was recorded after."""
+
+        chunk = int(np.searchsorted(self.chunk_starts, frame, "right")) - 1
+        return int(self.index["first_step"][chunk]) + frame - int(self.chunk_starts[chunk])
+
+    def get_frame(self, frame, flock=None):
+        """Returns a Flock whose arrays are read only views of the frame in the file,
+        so nothing is copied. A given flock is reused instead of creating a new one."""
+
+        if not 0 <= frame < len(self):
+            raise IndexError(f"Frame {frame} is outside of the {len(self)} recorded frames.")
+
+        chunk = int(np.searchsorted(self.chunk_starts, frame, "right")) - 1
+        offset, _, _, boids = self.index[chunk].tolist()
+        colors_offset = offset + CHUNK_HEADER.size
+        frames_offset = colors_offset + get_colors_size(boids)
+        frame_size = boids * FRAME_VALUES * 4
+        data = np.frombuffer(self.memory, dtype=np.float32, count=boids * FRAME_VALUES,
+                             offset=frames_offset + (frame - int(self.chunk_starts[chunk])) * frame_size)
+        data = data.reshape(boids, FRAME_VALUES)
+
+        if flock is None:
+            flock = Flock()
+        flock.positions = data[:, :2]
+        flock.velocities = data[:, 2:]
+        flock.colors = np.frombuffer(self.memory, dtype=np.uint8, count=boids * 3, offset=colors_offset).reshape(-1, 3)
+        flock.next_positions = flock.next_velocities = None
+        return flock
+
+    def close(self):
+        """Lets go of the mapping, so the file is unmapped once no returned flock uses it anymore."""
+
+        self.memory = None
+        self.index = None
@@ -3,11 +3,15 @@ import sys
 from pygame.math import Vector2 as Vector
 import gui
 import repel
+from sprites import BoidSprites
+from boids.flock import Flock
+from frame_timer import FrameTimer
+from profiler import FrameProfiler
 
 class Canvas:
     """This class takes care of drawing the window, drawing the boids, and handling window events."""
 
-    def __init__(self, width, height, bg_color, settings, default_settings):
+    def __init__(self, width, height, bg_color, params, default_settings):
         pygame.display.set_caption("Boid Simulation")
         self.screen = pygame.display.set_mode((width, height)) # Create window
         self.bg_color = bg_color
@@ -22,21 +26,36 @@ class Canvas:
         self.active_area = ((margin, margin),
                     (self.width - margin * 2, self.height - margin * 2))
 
-        self.settings = settings
+        self.params = params # The SimulationParams the sidebar changes
         self.default_settings = default_settings
         self.zones = []
         self.tree = None
+        self.sprites = BoidSprites() # The boid triangle drawn ahead of time at many headings
         self.show_circles = False
         self.show_grid = False
         self.show_zones = True
         self.placing_zone = False
+        self.fast_forward = False
+        self.fast_forward_steps = 8 # Simulation steps per frame while fast forwarding
+        self.event_handlers = [] # Extra functions every window event is passed to
+        self.timer = FrameTimer() # Times the phases of every frame while its timings are shown
+        self.timing_texts = [] # Lines of the timings shown next to the info
+        self.profiler = FrameProfiler() # Profiles the next frames when P is pressed
+        self.profile_texts = [] # Lines about the profile shown below the info
+        self.info_surface = None # The info drawn once, until one of its lines changes
+        self.info_rect = None
+        self.info_surfs = None # The rendered lines the info surface was drawn from
         # Info that is displayed in the top left of the screen
         self.infos = self.create_info(["Tab - Toggle vision and separation visibility",
                                        "G - Toggle quad tree visibility",
                                        "Z - Toggle zone creation",
                                        "  > Click to place and scroll to resize",
                                        "Delete - Delete all placed zones",
-                                       "Ctrl Z - Toggle zone visibility"],
+                                       "Ctrl Z - Toggle zone visibility",
+                                       "F - Toggle fast forward",
+                                       "  > [ and ] to change its speed",
+                                       "T - Toggle frame timings",
+                                       "P - Profile the next frames"],
                                      "calibri",
                                      15,
                                      (255, 255, 255))
@@ -48,7 +67,7 @@ class Canvas:
             # Returns a darkened color that is valid
             return [max(rgb - 30, 0) for rgb in color]
         
-        self.sidebar = gui.Sidebar(self.screen, width, margins, self.settings, self.default_settings,
+        self.sidebar = gui.Sidebar(self.screen, width, margins, self.params, self.default_settings,
                                    bg_color=bg_color,
                                    scrollbar_shade=(create_accent(bg_color)),
                                    text_color=text_color,
@@ -58,18 +77,28 @@ class Canvas:
         self.active_area = ((margin, margin),
                     (self.width - width - margin * 2, self.height - margin * 2))
     
-    def create_info(self, info_texts, font_name, size, color):
+    def create_info(self, info_texts, font_name, size, color, first_line=0):
         """This creates and positions text in the top left of the window."""
 
         infos = []
-        for index, text in enumerate(info_texts):
+        for index, text in enumerate(info_texts, first_line):
             # Stacks the text
             infos.append(gui.Text(text, font_name, size, color, Vector(5, 5 + size * index)))
         
         return infos
     
-    def draw(self, boids):
-        """This draws each element of the window in order."""
+    def add_info(self, info_texts):
+        """Adds more lines of text below the info already in the top left of the window.
+        Returns the created texts so they can be changed later."""
+
+        infos = self.create_info(info_texts, "calibri", 15, (255, 255, 255), len(self.infos))
+        self.infos += infos
+        return infos
+    
+    def draw(self, boids, alpha=1):
+        """This draws each element of the window in order.
+        The boids can be a list of Boid objects or a Flock. The boids are drawn
+        alpha of the way from their previous positions to their current ones."""
 
         self.draw_background()
         if self.show_zones:
@@ -78,9 +107,14 @@ class Canvas:
         elif self.placing_zone:
             self.zones[-1].draw()
         
-        self.draw_boids(boids)
+        with self.timer.measure("boids"):
+            if isinstance(boids, Flock):
+                self.draw_flock(boids, alpha)
+            else:
+                self.draw_boids(boids, alpha)
         if self.sidebar:
-            self.sidebar.draw()
+            with self.timer.measure("sidebar"):
+                self.sidebar.draw()
         
         self.draw_info()
     
@@ -89,43 +123,96 @@ class Canvas:
         It also draws the grid of the quad tree if toggled to visible."""
 
         self.screen.fill(self.bg_color)
-        if self.show_grid:
+        if self.show_grid and self.tree is not None:
             self.tree.draw_grid(self.screen)
             pygame.draw.rect(self.screen, (200, 0, 0), pygame.Rect(self.active_area[0], self.active_area[1]), 1)
         else:
             pygame.draw.rect(self.screen, (0, 0, 0), pygame.Rect(self.active_area[0], self.active_area[1]), 1)
     
-    def draw_boids(self, boids):
-        """Draws the boid polygons."""
+    def draw_boids(self, boids, alpha=1):
+        """Draws the boids from their pre-rendered sprites, alpha of the way from
+        where they were before the last step to their position."""
 
-        size = self.settings["boid size"]["value"]
-        for boid in boids:
-            if boid.velocity.length() == 0: # It has no direction to point
-                direction = Vector(0, 1)
-            else:
-                direction = boid.velocity.normalize()
-            
-            perpendicular = Vector(direction.y, -direction.x)
-            perpendicular /= 2
-            # Calculate polygon positions
-            point_1 = boid.position + direction * size
-            point_2 = boid.position - direction * size + perpendicular * size
-            point_3 = boid.position - direction * size - perpendicular * size
-            boid_points = [list(point_1),
-                            list(point_2),
-                            list(point_3)]
-            pygame.draw.polygon(self.screen, boid.color, boid_points)
-
-            if self.show_circles:
-                # Show view range circles around the boids
-                pygame.draw.circle(self.screen, (150, 255, 150), list(boid.position), self.settings["view distance"]["value"], 1)
-                pygame.draw.circle(self.screen, (255, 150, 150), list(boid.position), self.settings["separation distance"]["value"], 1)
+        self.sprites.set_size(self.params.boid_size)
+        self.sprites.draw_boids(self.screen, boids, alpha)
+
+        if self.show_circles:
+            # Show view range circles around the boids
+            for boid in boids:
+                position = boid.position
+                if alpha < 1:
+                    position = boid.previous_position.lerp(position, alpha)
+                pygame.draw.circle(self.screen, (150, 255, 150), list(position), self.params.view_distance, 1)
+                pygame.draw.circle(self.screen, (255, 150, 150), list(position), self.params.separation_distance, 1)
+    
+    def draw_flock(self, flock, alpha=1):
+        """Draws the boids of a Flock from their pre-rendered sprites, picking every boid's sprite at once.
+        The boids are drawn alpha of the way from their previous positions to their current ones."""
+
+        positions = flock.positions
+        if alpha < 1 and flock.next_positions is not None:
+            # After a step the flock's next buffer still holds the previous positions
+            positions = flock.next_positions + (flock.positions - flock.next_positions) * alpha
+        self.sprites.set_size(self.params.boid_size)
+        self.sprites.draw_flock(self.screen, positions, flock.velocities, flock.colors)
+
+        if self.show_circles:
+            # Show view range circles around the boids
+            for position in positions.tolist():
+                pygame.draw.circle(self.screen, (150, 255, 150), position, self.params.view_distance, 1)
+                pygame.draw.circle(self.screen, (255, 150, 150), position, self.params.separation_distance, 1)
     
     def draw_info(self):
         """Draws the text in the top left of the screen."""
 
+        # Changing the text of a line renders it to a new surface
+        surfs = [info.surf for info in self.infos]
+        if surfs != self.info_surfs:
+            self.render_info()
+            self.info_surfs = surfs
+        self.screen.blit(self.info_surface, self.info_rect)
+        
+        if self.timer.visible:
+            self.draw_timings()
+        self.draw_profile()
+    
+    def render_info(self):
+        """Draws every line of the info onto one surface, so drawing it every frame is a single blit."""
+
+        self.info_rect = self.infos[0].rect.unionall([info.rect for info in self.infos])
+        self.info_surface = gui.create_layer(self.info_rect.size)
+        offset = Vector(-self.info_rect.left, -self.info_rect.top)
         for info in self.infos:
-            info.draw(self.screen)
+            info.draw(self.info_surface, offset)
+    
+    def draw_timings(self):
+        """Draws the frame timings to the right of the info. The text is only
+        rendered again every half second so it can be read and costs little."""
+
+        if not self.timing_texts or self.timer.frames % 30 == 0:
+            left = max(info.rect.right for info in self.infos) + 30
+            lines = self.timer.get_summary()
+            if len(lines) != len(self.timing_texts):
+                self.timing_texts = [gui.Text("", "consolas", 15, (255, 255, 255), Vector(left, 5 + 15 * index))
+                                     for index in range(len(lines))]
+            for text, line in zip(self.timing_texts, lines):
+                text.set_text(line)
+        
+        for text in self.timing_texts:
+            text.draw(self.screen)
+    
+    def draw_profile(self):
+        """Draws the profiler's progress or summary below the info, rendering only the lines that changed."""
+
+        lines = self.profiler.get_lines()
+        if len(lines) != len(self.profile_texts):
+            top = self.infos[-1].rect.bottom + 10
+            self.profile_texts = [gui.Text("", "consolas", 15, (255, 255, 255), Vector(5, top + 15 * index))
+                                  for index in range(len(lines))]
+        for text, line in zip(self.profile_texts, lines):
+            if text.text != line:
+                text.set_text(line)
+            text.draw(self.screen)
     
     def get_events(self):
         """Check every window event."""
@@ -169,6 +256,17 @@ class Canvas:
                     else:
                         self.placing_zone = False
                         self.zones.pop()
+                elif event.key == pygame.K_t:
+                    self.timer.toggle()
+                elif event.key == pygame.K_p:
+                    self.profiler.request()
+                elif event.key == pygame.K_f:
+                    # Run several simulation steps for every frame that is drawn
+                    self.fast_forward = not self.fast_forward
+                elif event.key == pygame.K_RIGHTBRACKET:
+                    self.fast_forward_steps = min(self.fast_forward_steps * 2, 256)
+                elif event.key == pygame.K_LEFTBRACKET:
+                    self.fast_forward_steps = max(self.fast_forward_steps // 2, 2)
                 elif event.key == pygame.K_DELETE:
                     if self.placing_zone:
                         self.zones = [self.zones[-1]]
@@ -176,4 +274,6 @@ class Canvas:
                         self.zones = []
             
             # Check for events that apply to the UI elements
-            self.sidebar.check_event(event)
\ No newline at end of file
+            self.sidebar.check_event(event)
+            for handler in self.event_handlers:
+                handler(event)
\ No newline at end of file
@@ -0,0 +1,73 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+from boids.flock import Flock
+from boids.settings import create_settings
+from boids.params import SimulationParams
+from boids.engine import Zone
+from boids import checkpoint
+import simulation
+
+
+class TestCheckpointMethods(unittest.TestCase):
+    def setUp(self):
+        """Sets up a random flock before every test."""
+
+        self.rng = np.random.default_rng(1)
+        self.flock = Flock()
+        self.flock.spawn(300, 400, 300, 3, 6, (227, 220, 194), self.rng)
+        self.active_area = ((100, 100), (200, 100))
+
+    def test_1_checkpoint(self):
+        """Test that continuing from a checkpoint gives exactly the same steps as never stopping."""
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "state.npz")
+        settings = create_settings()
+        settings["neighbor count"]["value"] = 7
+        zones = [Zone((200, 150), 40)]
+        checkpoint.save(path, self.flock.positions, self.flock.velocities, self.flock.colors, settings, zones,
+                        step=12, rng_state=self.rng.bit_generator.state)
+
+        state = checkpoint.load(path)
+        with self.subTest("Saved values."):
+            self.assertEqual(state["step"], 12)
+            self.assertEqual(state["settings"]["neighbor count"], 7)
+            self.assertEqual(state["zones"].tolist(), [[200, 150, 40]])
+            self.assertEqual(state["tree_layout"], None)
+
+        restored = Flock(state["positions"], state["velocities"], state["colors"])
+        rng = np.random.default_rng()
+        rng.bit_generator.state = state["rng_state"]
+        params = SimulationParams(settings)
+        for flock in (self.flock, restored):
+            for _ in range(5):
+                simulation.simulate(flock, self.active_area, params, None, zones, 1 / 60)
+        with self.subTest("Different steps after restoring."):
+            self.assertTrue(np.array_equal(self.flock.positions, restored.positions))
+            self.assertEqual(rng.random(), self.rng.random())
+
+    def test_2_unknown_setting(self):
+        """Test that a setting the checkpoint has but the sidebar doesn't any more is left out."""
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "state.npz")
+        settings = create_settings()
+        settings["old setting"] = {"value": 3, "min": 0, "max": 5}
+        checkpoint.save(path, self.flock.positions, self.flock.velocities, self.flock.colors, settings)
+
+        state = checkpoint.load(path)
+        with self.subTest("Unknown setting kept."):
+            self.assertNotIn("old setting", state["settings"])
+            self.assertIn("neighbor count", state["settings"])
+
+        params = SimulationParams(create_settings())
+        for name, value in state["settings"].items():
+            params.set(name, value)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import numpy as np
+from boids.flock import Flock
+from boids.settings import create_settings
+from boids.params import SimulationParams
+import simulation
+import quad_tree as qt
+from pygame.math import Vector2 as Vector
+from boid import Boid
+
+
+def create_object_boids(flock, settings):
+    """Copies the flock into Boid objects stored in a QuadTree, for comparing with the object engine."""
+
+    tree = qt.QuadTree(Vector(-1000, -1000), Vector(1000, 1000), nodes=[], max_nodes=10, min_nodes=5)
+    boids = []
+    for position, velocity in zip(flock.positions, flock.velocities):
+        boid = Boid(settings, Vector(*position), Vector(*velocity))
+        tree.insert_boid(boid)
+        boids.append(boid)
+
+    return tree, boids
+
+
+class TestEngineMethods(unittest.TestCase):
+    def setUp(self):
+        """Sets up a random flock before every test."""
+
+        self.rng = np.random.default_rng(1)
+        self.flock = Flock()
+        self.flock.spawn(300, 400, 300, 3, 6, (227, 220, 194), self.rng)
+        self.active_area = ((100, 100), (200, 100))
+
+    def test_1_matches_object_engine(self):
+        """Test that the first boid gets the same velocity as in the object engine,
+        since it is the only boid the object engine updates before any others moved."""
+
+        for neighbor_count in (0, 5):
+            params = SimulationParams(create_settings(neighbor_count=neighbor_count))
+            tree, boids = create_object_boids(self.flock, params.settings)
+
+            flock = Flock(self.flock.positions, self.flock.velocities, self.flock.colors)
+            first = boids[0]
+            simulation.simulate(boids, self.active_area, params, tree, [], 1 / 60)
+            simulation.simulate(flock, self.active_area, params, None, [], 1 / 60)
+            with self.subTest(neighbor_count=neighbor_count):
+                self.assertTrue(np.allclose(flock.velocities[0], tuple(first.velocity)) and
+                                np.allclose(flock.positions[0], tuple(first.position)),
+                                "Vectorized engine disagrees with the object engine.")
+
+    def test_2_synchronous_matches_object_engine(self):
+        """Test that every boid matches the object engine when it reads only last frame's state,
+        and that the order of the boids doesn't change the result."""
+
+        params = SimulationParams(create_settings())
+        results = []
+        for reverse in (False, True):
+            tree, boids = create_object_boids(self.flock, params.settings)
+
+            ordered = boids[::-1] if reverse else list(boids)
+            simulation.simulate(ordered, self.active_area, params, tree, [], 1 / 60, synchronous=True)
+            results.append(np.array([tuple(boid.position) + tuple(boid.velocity) for boid in boids]))
+
+        simulation.simulate(self.flock, self.active_area, params, None, [], 1 / 60)
+        expected = np.column_stack((self.flock.positions, self.flock.velocities))
+        with self.subTest("Order of boids changed the result."):
+            self.assertTrue(np.array_equal(results[0], results[1]))
+
+        with self.subTest("Vectorized engine disagrees with the synchronous object engine."):
+            self.assertTrue(np.allclose(results[0], expected))
+
+    def test_3_speed_clamped(self):
+        """Test that every boid ends up within the speed limits when inside the active area."""
+
+        params = SimulationParams(create_settings(turn_factor=0))
+        self.flock.velocities *= 10
+        simulation.simulate(self.flock, self.active_area, params, None, [], 1 / 60)
+        speeds = np.hypot(self.flock.velocities[:, 0], self.flock.velocities[:, 1])
+        self.assertTrue(np.all((speeds >= 3 - 1e-9) & (speeds <= 6 + 1e-9)))
+
+
+if __name__ == "__main__":
+    unittest.main()
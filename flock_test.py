@@ -0,0 +1,47 @@
+import unittest
+import numpy as np
+from boids.flock import Flock
+from boids.settings import create_settings
+from boids.params import SimulationParams
+import simulation
+
+
+class TestFlockMethods(unittest.TestCase):
+    def setUp(self):
+        """Sets up a random flock before every test."""
+
+        self.rng = np.random.default_rng(1)
+        self.flock = Flock()
+        self.flock.spawn(300, 400, 300, 3, 6, (227, 220, 194), self.rng)
+        self.active_area = ((100, 100), (200, 100))
+
+    def test_1_spawn_and_remove(self):
+        """Test that spawning and removing keeps the arrays the same length."""
+
+        with self.subTest("Spawn count wrong."):
+            self.assertEqual(len(self.flock), 300)
+
+        with self.subTest("Speeds outside of range."):
+            speeds = np.hypot(self.flock.velocities[:, 0], self.flock.velocities[:, 1])
+            self.assertTrue(np.all((speeds >= 3 - 1e-9) & (speeds <= 6 + 1e-9)))
+
+        self.flock.remove_random(120, self.rng)
+        with self.subTest("Removed wrong number of boids."):
+            self.assertTrue(len(self.flock) == len(self.flock.velocities) == len(self.flock.colors) == 180)
+
+    def test_2_double_buffer(self):
+        """Test that a step swaps the buffers so the previous state is kept."""
+
+        previous = self.flock.positions.copy()
+        simulation.simulate(self.flock, self.active_area, SimulationParams(create_settings()), None, [], 1 / 60)
+        with self.subTest("Previous positions not kept."):
+            self.assertTrue(np.array_equal(self.flock.next_positions, previous))
+
+        buffers = (self.flock.positions, self.flock.next_positions)
+        simulation.simulate(self.flock, self.active_area, SimulationParams(create_settings()), None, [], 1 / 60)
+        with self.subTest("Buffers were reallocated."):
+            self.assertTrue(self.flock.positions is buffers[1] and self.flock.next_positions is buffers[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+import contextlib
+import csv
+import time
+from collections import deque
+import numpy as np
+
+# The timed parts of a frame, in the order they happen
+PHASES = ("events", "tree size", "population", "queries", "forces", "tree updates", "boids", "sidebar", "flip")
+# Columns of every recorded frame, where other is the time that isn't in any phase
+COLUMNS = PHASES + ("other", "total")
+NOT_TIMED = contextlib.nullcontext() # What measure returns while disabled
+
+
+class Measurement:
+    """Times the code inside a with block as one of the phases."""
+
+    def __init__(self, timer, phase):
+        self.timer = timer
+        self.phase = phase
+
+    def __enter__(self):
+        self.timer.start()
+
+    def __exit__(self, *exception):
+        self.timer.stop(self.phase)
+
+
+class FrameTimer:
+    """Adds up how long each phase of a frame takes and keeps the totals of the last
+    frames for averages and percentiles. Phases can be nested, in which case the inner
+    phase's time is taken out of the outer one. While it's neither shown, saving to a CSV
+    file nor kept on for something that reads the times, timing a phase costs no more
+    than checking whether it's enabled."""
+
+    def __init__(self, history=300):
+        self.visible = False # Whether the timings are shown on screen
+        self.enabled = False
+        self.times = dict.fromkeys(PHASES, 0.0) # Seconds spent in every phase this frame
+        self.history = deque(maxlen=history) # Milliseconds of every column for the last frames
+        self.running = [] # [start time, time spent in inner phases] of the phases being timed
+        self.frame_start = None
+        self.frames = 0 # Frames timed so far
+        self.csv_file = None
+        self.csv_writer = None
+        self.kept_on = False # Whether something else reads the times, like the tree tuner
+
+    def toggle(self):
+        """Shows or hides the timings, starting the averages over when shown."""
+
+        self.visible = not self.visible
+        if self.visible:
+            self.history.clear()
+        self.update_enabled()
+
+    def update_enabled(self):
+        """Only times anything while it's needed."""
+
+        self.enabled = self.visible or self.csv_file is not None or self.kept_on
+        if not self.enabled:
+            self.frame_start = None
+
+    def keep_on(self):
+        """Times every phase from now on, even while hidden and not saving to a CSV file."""
+
+        self.kept_on = True
+        self.update_enabled()
+
+    def get_time(self, *phases):
+        """Returns the seconds spent in the phases so far this frame."""
+
+        return sum(self.times[phase] for phase in phases)
+
+    def start_csv(self, path):
+        """Writes the time of every phase of every frame to a CSV file, in milliseconds."""
+
+        self.csv_file = open(path, "w", newline="")
+        self.csv_writer = csv.writer(self.csv_file)
+        self.csv_writer.writerow(("frame",) + COLUMNS)
+        self.update_enabled()
+
+    def close(self):
+        """Finishes the CSV file, if there is one."""
+
+        if self.csv_file is not None:
+            self.csv_file.close()
+            self.csv_file = self.csv_writer = None
+            self.update_enabled()
+
+    def measure(self, phase):
+        """Returns a context manager that adds the time spent inside it to the phase."""
+
+        if not self.enabled:
+            return NOT_TIMED
+
+        return Measurement(self, phase)
+
+    def wrap(self, phase, function):
+        """Returns the function with the time spent in every call added to the phase."""
+
+        def timed(*args):
+            if not self.enabled:
+                return function(*args)
+
+            self.start()
+            try:
+                return function(*args)
+            finally:
+                self.stop(phase)
+
+        return timed
+
+    def start(self):
+        self.running.append([time.perf_counter(), 0.0])
+
+    def stop(self, phase):
+        start, inner_time = self.running.pop()
+        elapsed = time.perf_counter() - start
+        self.times[phase] += elapsed - inner_time
+        if self.running:
+            self.running[-1][1] += elapsed # Don't count it twice in the outer phase
+
+    def start_frame(self):
+        """Called at the start of every frame."""
+
+        for phase in PHASES:
+            self.times[phase] = 0.0
+        self.frame_start = time.perf_counter() if self.enabled else None
+
+    def end_frame(self):
+        """Called once a frame is done to keep its times, leaving out the time waiting for the next frame."""
+
+        if self.frame_start is None:
+            return # Not enabled when the frame started
+
+        total = time.perf_counter() - self.frame_start
+        times = [self.times[phase] for phase in PHASES]
+        row = [seconds * 1000 for seconds in times + [total - sum(times), total]]
+        self.history.append(row)
+        self.frames += 1
+        if self.csv_writer is not None:
+            self.csv_writer.writerow([self.frames] + [f"{milliseconds:.4f}" for milliseconds in row])
+
+    def get_summary(self):
+        """Returns lines of text with the average and percentiles of every column over the last frames."""
+
+        lines = [f"{'Phase (ms)':<13}{'avg':>7}{'p50':>7}{'p95':>7}{'p99':>7}"]
+        if not self.history:
+            return lines
+
+        history = np.array(self.history)
+        averages = history.mean(axis=0)
+        percentiles = np.percentile(history, (50, 95, 99), axis=0)
+        for column, name in enumerate(COLUMNS):
+            p50, p95, p99 = percentiles[:, column]
+            lines.append(f"{name:<13}{averages[column]:>7.2f}{p50:>7.2f}{p95:>7.2f}{p99:>7.2f}")
+
+        return lines
@@ -0,0 +1,75 @@
+import unittest
+import os
+import tempfile
+import time
+from frame_timer import FrameTimer, COLUMNS
+
+
+class TestFrameTimerMethods(unittest.TestCase):
+    def setUp(self):
+        """Sets up a timer that is timing before every test."""
+
+        self.timer = FrameTimer()
+        self.timer.toggle()
+
+    def test_1_nested_phases(self):
+        """Test that an inner phase's time is taken out of the outer phase, and nothing is timed while hidden."""
+
+        self.timer.start_frame()
+        with self.timer.measure("events"):
+            self.timer.wrap("tree size", time.sleep)(0.02)
+        self.timer.end_frame()
+        row = dict(zip(COLUMNS, self.timer.history[-1]))
+        with self.subTest("Inner phase counted in outer phase."):
+            self.assertGreaterEqual(row["tree size"], 20)
+            self.assertLess(row["events"], 10)
+            self.assertAlmostEqual(sum(row.values()) - row["total"], row["total"])
+
+        self.timer.toggle()
+        self.timer.start_frame()
+        with self.timer.measure("events"):
+            pass
+        self.timer.end_frame()
+        with self.subTest("Timed while hidden."):
+            self.assertEqual(self.timer.frames, 1)
+
+    def test_2_csv(self):
+        """Test that every timed frame is written to the CSV file."""
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "timings.csv")
+        self.timer.start_csv(path)
+        self.timer.toggle() # Still timed for the file
+        for _ in range(3):
+            self.timer.start_frame()
+            with self.timer.measure("flip"):
+                pass
+            self.timer.end_frame()
+        self.timer.close()
+
+        with open(path) as file:
+            lines = file.read().splitlines()
+        self.assertEqual(lines[0].split(","), ["frame"] + list(COLUMNS))
+        self.assertEqual(len(lines), 4)
+
+    def test_3_kept_on(self):
+        """Test that a timer kept on still times phases while hidden, as the tree tuner reads them."""
+
+        self.timer.toggle()
+        self.timer.keep_on()
+        self.timer.start_frame()
+        self.timer.wrap("queries", time.sleep)(0.01)
+        before = self.timer.get_time("queries", "tree updates")
+        self.timer.wrap("tree updates", time.sleep)(0.01)
+        with self.timer.measure("forces"):
+            time.sleep(0.05)
+        with self.subTest("Not timed while hidden."):
+            self.assertGreaterEqual(before, 0.01)
+        with self.subTest("Other phases added in."):
+            self.assertGreaterEqual(self.timer.get_time("queries", "tree updates") - before, 0.01)
+            self.assertLess(self.timer.get_time("queries", "tree updates") - before, 0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
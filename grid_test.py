@@ -0,0 +1,41 @@
+import unittest
+import numpy as np
+from boids.flock import Flock
+from boids.grid import NeighborGrid
+
+
+class TestNeighborGridMethods(unittest.TestCase):
+    def setUp(self):
+        """Sets up a random flock before every test."""
+
+        self.rng = np.random.default_rng(1)
+        self.flock = Flock()
+        self.flock.spawn(300, 400, 300, 3, 6, (227, 220, 194), self.rng)
+        self.active_area = ((100, 100), (200, 100))
+
+    def test_1_grid_pairs(self):
+        """Test that the grid finds every pair that is within the radius."""
+
+        radius = 25
+        grid = NeighborGrid(self.flock.positions, radius)
+        i, j = grid.pairs()
+        found = set(zip(i.tolist(), j.tolist()))
+        offsets = self.flock.positions[:, None] - self.flock.positions[None, :]
+        close = (offsets ** 2).sum(axis=2) < radius * radius
+        np.fill_diagonal(close, False)
+        expected = set(zip(*[index.tolist() for index in np.nonzero(close)]))
+        self.assertTrue(expected <= found and len(found) == len(i), "Grid missed neighbor pairs.")
+
+    def test_2_grid_chunk(self):
+        """Test that asking for a chunk of boids only returns pairs for that chunk."""
+
+        grid = NeighborGrid(self.flock.positions, 30)
+        all_i, all_j = grid.pairs()
+        i, j = grid.pairs(100, 200)
+        chunk = (all_i >= 100) & (all_i < 200)
+        self.assertEqual(sorted(zip(i.tolist(), j.tolist())),
+                         sorted(zip(all_i[chunk].tolist(), all_j[chunk].tolist())))
+
+
+if __name__ == "__main__":
+    unittest.main()
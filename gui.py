@@ -3,6 +3,20 @@ from pygame.locals import *
 import math
 from pygame.math import Vector2 as Vector
 
+TRANSPARENT = (255, 0, 255) # The color key of cached surfaces, which nothing is drawn in
+
+
+def create_layer(size):
+    """Returns a surface filled with the TRANSPARENT color key for drawing something
+    once and blitting it every frame. A color key blits faster than per pixel alpha."""
+
+    surface = pygame.Surface(size)
+    if pygame.display.get_surface() is not None:
+        surface = surface.convert() # Blits faster in the screen's pixel format
+    surface.fill(TRANSPARENT)
+    surface.set_colorkey(TRANSPARENT, RLEACCEL)
+    return surface
+
     
 def get_offset_rect(rect, offset):
     """This returns a rect that is offset from the original rect.
@@ -15,7 +29,7 @@ def get_offset_rect(rect, offset):
 class Sidebar:
     """This is the entire bar on the side that contains all of the gui elements."""
 
-    def __init__(self, screen, width, margins, settings, default_setting, bg_color=(100, 100, 100),
+    def __init__(self, screen, width, margins, params, default_setting, bg_color=(100, 100, 100),
                  scrollbar_shade=(150, 150, 150), text_color=(0, 0, 0), slider_color=(150, 150, 150)):
         self.screen = screen
         self.screen_width = screen.get_width()
@@ -23,7 +37,8 @@ class Sidebar:
         self.width = width # The width of the sidebar
         self.rect = pygame.Rect(self.screen_width - width, 0, width, self.screen_height)
         self.margins = margins # Margins to pad the sidebar elements
-        self.settings = settings
+        self.params = params # Every change to a setting goes through the SimulationParams
+        self.settings = params.settings
         self.default_settings = default_setting
         self.bg_color = bg_color
         self.scrollbar_shade_color = scrollbar_shade
@@ -40,6 +55,17 @@ class Sidebar:
         self.selected_textbox = None
         self.selected_slider = None
         self.last_slider_pos = None
+        self.surface = None # The sidebar is drawn here and only drawn again when it's dirty
+        self.dirty = True
+        params.add_listener(self.on_setting_changed)
+    
+    def on_setting_changed(self, name, params):
+        """Shows the new value of a setting that was changed somewhere other than the sidebar."""
+
+        for setting in self.setting_list:
+            if setting.name == name:
+                setting.show_value()
+                self.dirty = True
     
     def calculate_scrollbar_props(self):
         """Calculates the height of the bar and how fast the sidebar scrolls as you move it."""
@@ -71,51 +97,70 @@ class Sidebar:
         for setting in self.setting_list:
             bot_of_last_setting += setting.height
         
-        setting = Setting(setting_name, self.settings, self.default_settings, self.font_name, value, min_value, max_value,
+        setting = Setting(setting_name, self.params, self.default_settings, self.font_name, value, min_value, max_value,
                         Vector(self.screen_width - self.width + self.margins[0], bot_of_last_setting),
                         text_color=self.text_color, slider_color=self.slider_color,
                         shade_color=self.scrollbar_shade_color)
         self.setting_list.append(setting)
         self.max_scroll -= setting.height
         self.calculate_scrollbar_props() # Adjust the scrollbar
+        self.dirty = True
     
     def scroll(self, amount):
         """Called when scrolling the mouse."""
         
+        scroll_y = self.scroll_y
         self.scroll_y += amount
         # Prevent scrolling beyond bounds
         self.scroll_y = max(self.max_scroll, min(0, self.scroll_y))
+        if self.scroll_y != scroll_y:
+            self.dirty = True
     
-    def draw_scrollbar(self):
-        """Draws the scrollbar and the scrollbar groove."""
-
-        pygame.draw.rect(self.screen, self.scrollbar_shade_color,
-                         (self.rect.right - 10, self.rect.top, 10, self.rect.height), border_radius=20)
-        pygame.draw.rect(self.screen, self.bg_color,
-                         self.get_scrollbar_pos(), border_radius=20)
-        pygame.draw.rect(self.screen, self.scrollbar_shade_color,
-                         self.get_scrollbar_pos(), 1, border_radius=20)
+    def draw_scrollbar(self, surface):
+        """Draws the scrollbar and the scrollbar groove onto the sidebar's surface."""
+
+        scrollbar_rect = self.get_scrollbar_pos().move(-self.rect.left, -self.rect.top)
+        pygame.draw.rect(surface, self.scrollbar_shade_color,
+                         (self.width - 10, 0, 10, self.rect.height), border_radius=20)
+        pygame.draw.rect(surface, self.bg_color,
+                         scrollbar_rect, border_radius=20)
+        pygame.draw.rect(surface, self.scrollbar_shade_color,
+                         scrollbar_rect, 1, border_radius=20)
     
-    def draw(self):
-        """Draws the sidebar and all its setting elements on the right."""
+    def render(self):
+        """Draws the sidebar and all its setting elements onto the sidebar's own surface."""
 
-        if self.last_scroll_pos != None: # Scrollbar is currently being dragged
-            mouse_pos = pygame.mouse.get_pos()
-            self.scroll(self.last_scroll_pos[1] - mouse_pos[1]) # Move scrollbar to new position
-            self.last_scroll_pos = mouse_pos
+        if self.surface is None:
+            self.surface = create_layer(self.rect.size)
+        else:
+            self.surface.fill(TRANSPARENT)
         
         # Sidebar background
-        width, height = self.screen.get_size()
-        pygame.draw.rect(self.screen, self.bg_color, (width - self.width, 0, self.width, height),
+        outline = pygame.Rect((0, 0), self.rect.size)
+        pygame.draw.rect(self.surface, self.bg_color, outline,
                          border_top_left_radius=15, border_bottom_left_radius=15)
 
-        # Draw settings
+        # Draw settings, which are positioned on the screen rather than the sidebar
+        offset = Vector(-self.rect.left, self.scroll_y - self.rect.top)
         for setting in self.setting_list:
-            setting.draw(self.screen, self.scroll_y)
+            setting.draw(self.surface, offset)
         
-        self.draw_scrollbar()
+        self.draw_scrollbar(self.surface)
         # Black outline
-        pygame.draw.rect(self.screen, (0, 0, 0), self.rect, 1, border_top_left_radius=15, border_bottom_left_radius=15)
+        pygame.draw.rect(self.surface, (0, 0, 0), outline, 1, border_top_left_radius=15, border_bottom_left_radius=15)
+        self.dirty = False
+    
+    def draw(self):
+        """Draws the sidebar on the right, only drawing its elements again if one of them changed."""
+
+        if self.last_scroll_pos != None: # Scrollbar is currently being dragged
+            mouse_pos = pygame.mouse.get_pos()
+            self.scroll(self.last_scroll_pos[1] - mouse_pos[1]) # Move scrollbar to new position
+            self.last_scroll_pos = mouse_pos
+        
+        if self.dirty:
+            self.render()
+        self.screen.blit(self.surface, self.rect)
     
     def overlaps(self, rect, mouse_pos):
         """Used for checking if mouse events overlap UI elements."""
@@ -133,6 +178,7 @@ class Sidebar:
 
         elif event.type == MOUSEBUTTONDOWN:
             if pygame.mouse.get_pressed()[0]: # Left button pressed
+                self.dirty = True # Textboxes may have been selected or applied
                 mouse_pos = pygame.mouse.get_pos()
                 if self.get_scrollbar_pos().collidepoint(mouse_pos): # Clicked the scrollbar
                     self.last_scroll_pos = mouse_pos # Begin tracking dragged scrollbar
@@ -164,14 +210,13 @@ class Sidebar:
                         button = setting.button
                         if button.active:
                             # Set the current setting value to the default
-                            self.settings[setting.name]["value"] = self.default_settings[setting.name]["value"]
-                            setting.textbox.set_value(str(self.settings[setting.name]["value"]))
-                            setting.textbox.apply_value(self.settings)
+                            setting.textbox.set_value(str(self.default_settings[setting.name]["value"]))
+                            setting.textbox.apply_value(self.params)
                             button.active = False
                     else:
                         if setting.textbox.selected:
                             # User clicked outside textbox, so apply the input value
-                            setting.textbox.apply_value(self.settings)
+                            setting.textbox.apply_value(self.params)
                         
                         setting.textbox.selected = False
                         setting.textbox.highlighted = False
@@ -183,15 +228,17 @@ class Sidebar:
 
         elif event.type == MOUSEMOTION:
             if self.selected_slider:
+                self.dirty = True
                 # Update the value in real time
                 self.selected_slider.update_pos(pygame.mouse.get_pos())
-                self.selected_slider.apply_value(self.settings) # Apply settings in real time
+                self.selected_slider.apply_value(self.params) # Apply settings in real time
         
         elif event.type == KEYDOWN:
             if self.selected_textbox != None:
+                self.dirty = True
                 # Textbox selected, so check for user inputing values
                 if event.key == K_RETURN:
-                    self.selected_textbox.apply_value(self.settings)
+                    self.selected_textbox.apply_value(self.params)
                     self.selected_textbox.highlighted = False
                     self.selected_textbox.selected = False
                     self.selected_textbox = None
@@ -204,9 +251,10 @@ class Sidebar:
 class Setting:
     """A sidebar element consisting of a title, textbox, and slider."""
 
-    def __init__(self, name, settings, default_settings, font_name, value, min_value, max_value, top_left, text_color, slider_color, shade_color):
+    def __init__(self, name, params, default_settings, font_name, value, min_value, max_value, top_left, text_color, slider_color, shade_color):
         self.name = name
-        self.settings = settings
+        self.params = params
+        self.settings = params.settings
         self.default_settings = default_settings
         self.font_name = font_name
         self.value = value
@@ -273,13 +321,24 @@ class Setting:
         else:
             self.button.active = True
     
-    def draw(self, screen, offset_y):
-        """Draw all of the setting elements on the sidebar."""
+    def show_value(self):
+        """Moves the slider and changes the textbox to the setting's current value."""
+
+        value = self.settings[self.name]["value"]
+        self.slider.set_value(value)
+        if value == int(value): # Doesn't need to show decimals
+            self.textbox.set_value(str(int(value)))
+        else:
+            self.textbox.set_value(str(value))
+        self.update_button()
+    
+    def draw(self, screen, offset):
+        """Draw all of the setting elements on the sidebar, moved by the offset."""
 
-        self.title.draw(screen, Vector(0, offset_y))
-        self.textbox.draw(screen, Vector(0, offset_y))
-        self.slider.draw(screen, Vector(0, offset_y))
-        self.button.draw(screen, Vector(0, offset_y))
+        self.title.draw(screen, offset)
+        self.textbox.draw(screen, offset)
+        self.slider.draw(screen, offset)
+        self.button.draw(screen, offset)
 
 
 class Button:
@@ -343,14 +402,14 @@ class TextBox:
         else:
             self.value = value
     
-    def apply_value(self, settings):
+    def apply_value(self, params):
         """This function is used when the user enters confirms the new value.
         It will then change the setting and update the slider."""
 
         self.value = self.value or "0" # Default to 0 if empty string entered
         value = float(self.value) or 0.0 # Default the value to 0.0 if string is not number
-        setting = settings[self.parent.name]
-        setting["value"] = min(setting["max"], max(setting["min"], value)) # Make sure entered value is within bounds
+        setting = params.settings[self.parent.name]
+        params.set(self.parent.name, min(setting["max"], max(setting["min"], value))) # Make sure entered value is within bounds
         if setting["value"] == int(setting["value"]): # Doesn't need to show decimals
             self.set_value(str(int(setting["value"]))) # Remove unnecessary trailing 0s
         else:
@@ -455,11 +514,11 @@ class Slider:
         value = min(self.max_val, max(self.min_val, value))
         self.value = value
     
-    def apply_value(self, settings):
+    def apply_value(self, params):
         """Changes the settings and also the textbox value."""
 
-        setting = settings[self.parent.name]
-        setting["value"] = round(self.value, 4) # Shorten value so not infinite decimal length
+        setting = params.settings[self.parent.name]
+        params.set(self.parent.name, round(self.value, 4)) # Shorten value so not infinite decimal length
         self.parent.textbox.set_value(str(setting["value"]))
         self.parent.update_button()
     
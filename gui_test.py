@@ -0,0 +1,62 @@
+import unittest
+import copy
+import pygame
+from pygame.locals import *
+from boids.params import SimulationParams
+from boids.settings import DEFAULT_SETTINGS
+import gui
+
+
+class TestSidebarMethods(unittest.TestCase):
+    def setUp(self):
+        """Sets up a sidebar with every setting before every test."""
+
+        pygame.init()
+        self.screen = pygame.Surface((800, 400))
+        self.params = SimulationParams(copy.deepcopy(DEFAULT_SETTINGS))
+        self.sidebar = gui.Sidebar(self.screen, 250, (10, 10), self.params, DEFAULT_SETTINGS)
+        for name in self.params.settings:
+            self.sidebar.add_setting(name)
+
+    def test_1_dirty(self):
+        """Test that the sidebar is only drawn again after something on it changed."""
+
+        self.sidebar.draw()
+        surface = self.sidebar.surface
+        with self.subTest("Still dirty after drawing."):
+            self.assertFalse(self.sidebar.dirty)
+
+        with self.subTest("Dirty after an event that didn't change anything."):
+            self.sidebar.check_event(pygame.event.Event(MOUSEMOTION, pos=(0, 0), rel=(0, 0), buttons=(0, 0, 0)))
+            self.assertFalse(self.sidebar.dirty)
+
+        changes = {"Setting changed": lambda: self.params.set("boid size", 12),
+                   "Scrolled": lambda: self.sidebar.scroll(-50)}
+        for name, change in changes.items():
+            with self.subTest(f"{name} but not dirty."):
+                change()
+                self.assertTrue(self.sidebar.dirty)
+                self.sidebar.draw()
+
+        with self.subTest("Surface made again instead of reused."):
+            self.assertIs(self.sidebar.surface, surface)
+
+    def test_2_cached_drawing(self):
+        """Test that blitting the cached sidebar looks the same as drawing it on the screen."""
+
+        self.sidebar.scroll(-120)
+        self.params.set("view distance", 80)
+        self.sidebar.draw()
+        self.sidebar.draw() # Only blits the cached surface
+
+        expected = pygame.Surface(self.screen.get_size())
+        pygame.draw.rect(expected, self.sidebar.bg_color, self.sidebar.rect,
+                         border_top_left_radius=15, border_bottom_left_radius=15)
+        for setting in self.sidebar.setting_list:
+            setting.draw(expected, pygame.math.Vector2(0, self.sidebar.scroll_y))
+        self.assertEqual(pygame.image.tobytes(self.screen.subsurface((560, 100, 200, 250)), "RGB"),
+                         pygame.image.tobytes(expected.subsurface((560, 100, 200, 250)), "RGB"))
+
+
+if __name__ == "__main__":
+    unittest.main()
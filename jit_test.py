@@ -0,0 +1,36 @@
+import unittest
+import numpy as np
+from boids.flock import Flock
+from boids.grid import NeighborGrid
+from boids.settings import create_settings
+from boids.params import SimulationParams
+from boids.engine import compute_velocities, Zone
+from boids import jit
+
+
+class TestJitMethods(unittest.TestCase):
+    def setUp(self):
+        """Sets up a random flock before every test."""
+
+        self.rng = np.random.default_rng(1)
+        self.flock = Flock()
+        self.flock.spawn(300, 400, 300, 3, 6, (227, 220, 194), self.rng)
+        self.active_area = ((100, 100), (200, 100))
+
+    def test_1_jit_matches_numpy(self):
+        """Test that the compiled kernel steers like the numpy engine, whether or not Numba is installed."""
+
+        # The sliders let the minimum speed be set above the maximum
+        for settings in (create_settings(), create_settings(minimum_speed=9, maximum_speed=4)):
+            params = SimulationParams(settings)
+            grid = NeighborGrid(self.flock.positions, params.sight_radius)
+            arguments = (self.flock.positions, self.flock.velocities, grid, params.steering_values(),
+                         [Zone((200, 150), 40)], self.active_area)
+            for start, stop in ((0, None), (50, 120)):
+                with self.subTest(start=start, stop=stop, minimum_speed=params.minimum_speed):
+                    self.assertTrue(np.allclose(jit.compute_velocities(*arguments, start, stop),
+                                                compute_velocities(*arguments, start, stop)))
+
+
+if __name__ == "__main__":
+    unittest.main()
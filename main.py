@@ -10,81 +10,34 @@ from boid import Boid
 from pygame.math import Vector2 as Vector
 import simulation
 import quad_tree
+from spatial_hash import SpatialHashGrid
+from neighbor_list import NeighborList
 import time
 import copy
-pygame.init()
-
-# Settings that appear on the sidebar
-settings = {
-    "boids": {
-        "value": 100,
-        "min": 1,
-        "max": 5000
-    },
-    "view distance": {
-        "value": 50,
-        "min": 0,
-        "max": 100
-    },
-    "separation distance": {
-        "value": 15,
-        "min": 0,
-        "max": 100
-    },
-    "minimum speed": {
-        "value": 3,
-        "min": 0.1,
-        "max": 20
-    },
-    "maximum speed": {
-        "value": 6,
-        "min": 0.1,
-        "max": 20
-    },
-    "centering factor": {
-        "value": 0.0005,
-        "min": 0,
-        "max": 0.01
-    },
-    "matching factor": {
-        "value": 0.05,
-        "min": 0,
-        "max": 0.5
-    },
-    "avoid factor": {
-        "value": 0.05,
-        "min": 0,
-        "max": 0.5
-    },
-    "avoid zone factor": {
-        "value": 0.003,
-        "min": 0,
-        "max": 0.1
-    },
-    "turn factor": {
-        "value": 0.2,
-        "min": 0,
-        "max": 5
-    },
-    "boid size": {
-        "value": 8,
-        "min": 0.01,
-        "max": 30
-    },
-    "min per node": {
-        "value": 15,
-        "min": 1,
-        "max": 50
-    },
-    "max per node": {
-        "value": 20,
-        "min": 1,
-        "max": 50
-    }
-}
+import argparse
+import numpy as np
+from boids.flock import Flock
+from boids.settings import create_settings
+from boids.params import SimulationParams
+from boids.parallel import ParallelStepper
+from timestep import FixedTimestep
+from boids.pipeline import SimulationThread
+from boids.jit import JitStepper
+from boids.morton import MortonStepper
+from boids.trajectory import TrajectoryWriter, TrajectoryReader
+from playback import Player
+from frame_timer import FrameTimer
+from tree_tuner import TreeTuner, PHASES as TUNED_PHASES
+from boids import checkpoint
+from boids.checkpoint import CheckpointWriter
+import repel
+import atexit
+from boids import engine as flock_engine
+from boids.engine import Zone
 
-# Copy settings by value not reference
-default_settings = copy.deepcopy(settings)
+# Big changes to the number of boids are made this many at a time, until this many seconds of a frame are used
+POPULATION_BATCH = 500
+POPULATION_BUDGET = 0.004
 
 def get_random_direction():
     """A function that returns a simple, biased random vector direction
@@ -101,42 +54,155 @@ def get_random_direction():
 
 def create_boids(width, height, tree, num_of_boids=10):
     """Creates boid objects with random positions and velocities, inserts them
-    into the quad tree, then returns the list of created boids."""
+    into the quad tree all at once, then returns the list of created boids."""
 
     boids = []
     for _ in range(num_of_boids):
         x, y = random.randint(0, width), random.randint(0, height)
         position = Vector(x, y)
-        speed_range = settings["maximum speed"]["value"] - settings["minimum speed"]["value"]
-        speed = settings["minimum speed"]["value"] + speed_range * random.random() # Randomize the speed
+        speed_range = params.maximum_speed - params.minimum_speed
+        speed = params.minimum_speed + speed_range * random.random() # Randomize the speed
         velocity = get_random_direction() * speed
         boid = Boid(settings,
                     position,
                     velocity,
                     color=(227, 220, 194))
         boids.append(boid)
-        tree.insert_boid(boid)
     
+    tree.insert_boids(boids)
     return boids
 
 def delete_boids(boids, tree, amount):
-    """Deletes the given amount of boids from the quad tree."""
+    """Deletes the given amount of random boids from the list and the quad tree."""
 
     amount = min(amount, len(boids)) # Make sure it's possible to delete that many
+    deleted = []
     for _ in range(amount):
-        boid = random.choice(boids) # Delete random boids
-        tree.remove_boid(boid)
-        boids.remove(boid)
+        # Swap a random boid to the end of the list so removing it doesn't shift the rest
+        index = random.randrange(len(boids))
+        boids[index], boids[-1] = boids[-1], boids[index]
+        deleted.append(boids.pop())
+    
+    tree.remove_boids(deleted)
 
 
-def main(width=1920, height=1080):
-    """Creates a canvas and a tree, adds boids to it, then runs the main loop."""
+def adjust_boids(boids, width, height, tree, amount):
+    """Moves the number of boids towards the amount a batch at a time until the frame's
+    time budget is used up, so a big change is spread over several frames."""
+
+    deadline = time.perf_counter() + POPULATION_BUDGET
+    while len(boids) != amount:
+        change = max(-POPULATION_BATCH, min(amount - len(boids), POPULATION_BATCH))
+        if change > 0:
+            boids += create_boids(width, height, tree=tree, num_of_boids=change)
+        else:
+            delete_boids(boids, tree, -change)
+        
+        if time.perf_counter() > deadline:
+            break # Carry on next frame
+
+
+def adjust_flock(flock, width, height, amount, rng):
+    """Spawns or deletes boids in the flock until it holds the given amount."""
+
+    if len(flock) < amount:
+        flock.spawn(amount - len(flock), width, height, params.minimum_speed, params.maximum_speed,
+                    (227, 220, 194), rng)
+    else:
+        flock.remove_random(len(flock) - amount, rng)
+
+
+def create_index(index, width, height, boids=(), tree_layout=None):
+    """Creates the spatial index the boids will be stored in, either
+    a "quadtree" or a "grid" spatial hash. The index is kept up to
+    date with the settings it depends on as they change. The boids are
+    inserted into it, unless a quad tree can be rebuilt from a layout."""
+
+    if index == "grid":
+        tree = SpatialHashGrid(params.sight_radius)
+    elif tree_layout is not None:
+        tree = quad_tree.QuadTree.from_layout(tree_layout, boids)
+        tree.update_radius(params.sight_radius)
+        boids = () # Already in the tree
+    else:
+        tree = quad_tree.create_tree(5000,
+                                     5000,
+                                     Vector(width // 2, height // 2),
+                                     params.max_per_node,
+                                     params.min_per_node)
+        tree.update_radius(params.sight_radius)
+    
+    for boid in boids:
+        tree.insert_boid(boid)
+    params.add_listener(timer.wrap("tree size", tree.on_setting_changed))
+    return tree
+
+
+def get_checkpoint_state(boids, tree, canvas, rng, step_count, with_layout=False):
+    """Collects everything a checkpoint saves. The layout of a quad tree is only included
+    with_layout, because getting it walks the whole tree. Without it the tree is
+    rebuilt by inserting the boids again when the checkpoint is restored."""
+
+    state = {
+        "settings": settings,
+        "zones": [zone for zone in canvas.zones if zone.placed],
+        "step": step_count,
+        "rng_state": rng.bit_generator.state,
+        "random_state": random.getstate()
+    }
+    if isinstance(boids, Flock):
+        state.update(positions=boids.positions, velocities=boids.velocities, colors=boids.colors)
+    else:
+        state.update(positions=[tuple(boid.position) for boid in boids],
+                     velocities=[tuple(boid.velocity) for boid in boids],
+                     colors=[boid.color for boid in boids])
+        if with_layout and isinstance(tree, quad_tree.QuadTree):
+            state["tree_layout"] = tree.get_layout({boid: index for index, boid in enumerate(boids)})
+    
+    return state
+
+
+def restore_checkpoint(state, canvas, rng, engine, index):
+    """Puts the zones and random states from a checkpoint back, then returns
+    the boids and the tree they're in for the engine. The settings have to be
+    restored before the canvas is created so the sidebar shows them."""
+
+    for x, y, radius in state["zones"].tolist():
+        zone = repel.NoGoZone(Vector(x, y), radius, canvas.screen)
+        zone.placed = True
+        canvas.zones.append(zone)
+    
+    if state["rng_state"] is not None:
+        rng.bit_generator.state = state["rng_state"]
+    if state["random_state"] is not None:
+        random.setstate(state["random_state"])
+    
+    if engine != "objects":
+        return Flock(state["positions"], state["velocities"], state["colors"]), None
+    
+    boids = [Boid(settings, Vector(*position), Vector(*velocity), color=tuple(color))
+             for position, velocity, color in zip(state["positions"].tolist(),
+                                                  state["velocities"].tolist(),
+                                                  state["colors"].tolist())]
+    tree_layout = state["tree_layout"] if index == "quadtree" else None
+    return boids, create_index(index, canvas.width, canvas.height, boids, tree_layout)
+
+
+def record_step(recorder, boids):
+    """Appends the state of the boids after a step to the TrajectoryWriter."""
+
+    if isinstance(boids, Flock):
+        recorder.append(boids.positions, boids.velocities, boids.colors)
+    else:
+        recorder.append([tuple(boid.position) for boid in boids],
+                        [tuple(boid.velocity) for boid in boids],
+                        [boid.color for boid in boids])
 
-    FPS = 60
-    clock = pygame.time.Clock() # Allows pygame to limit the fps to save on performance
-    last_frame = time.time() # Will be used for dt
 
-    canvas = Canvas(width, height, (27, 32, 33), settings, default_settings) # The canvas handles drawing and events
+def create_canvas(width, height):
+    """Creates the canvas and its sidebar of settings."""
+
+    canvas = Canvas(width, height, (27, 32, 33), params, default_settings) # The canvas handles drawing and events
     # Specifications for the sidebar of settings
     canvas.create_sidebar(width=250,
                           margins=(10, 10),
@@ -146,45 +212,267 @@ def main(width=1920, height=1080):
     for key in settings.keys():
         canvas.sidebar.add_setting(key)
     
+    return canvas
+
+
+def play(path, width=1920, height=1080):
+    """Plays back a trajectory recorded with --record, reading every frame straight
+    out of the file instead of simulating it. Never returns."""
+
+    FPS = 60
+    clock = pygame.time.Clock()
+    last_frame = time.perf_counter()
+    reader = TrajectoryReader(path)
+    player = Player(reader)
+    canvas = create_canvas(width, height)
+    canvas.event_handlers.append(player.check_event)
+    status = canvas.add_info(["Space - Pause",
+                              "  > Left and Right to step when paused",
+                              "Left and Right - Seek",
+                              "Up and Down - Change playback speed",
+                              "Home and End - Jump to start and end",
+                              player.get_status()])[-1]
+
+    while True:
+        frame_time = time.perf_counter() - last_frame
+        last_frame = time.perf_counter()
+        canvas.get_events()
+        player.advance(frame_time)
+        status.set_text(player.get_status())
+        flock, alpha = player.get_frame()
+        canvas.draw(flock, alpha=alpha)
+
+        pygame.display.update()
+        clock.tick(FPS)
+
+
+def run_threaded(canvas, flock, stepper, rng, fps, recorder=None):
+    """Runs the numpy engine on a separate thread while this thread only
+    handles events and draws the newest finished step. Never returns."""
+
+    width, height = canvas.width, canvas.height
+    clock = pygame.time.Clock()
+    sim_thread = SimulationThread(flock,
+                                  params,
+                                  canvas.active_area,
+                                  # Copied so the main thread can move the zones during a step
+                                  lambda: [Zone(tuple(zone.position), zone.radius) for zone in canvas.zones],
+                                  lambda flock: adjust_flock(flock, width, height, params.boids, rng),
+                                  stepper.step if stepper else flock_engine.step,
+                                  1 / fps,
+                                  (lambda flock: record_step(recorder, flock)) if recorder else None)
+    sim_thread.start()
+
+    try:
+        while True:
+            # The simulation's own phases happen on its thread, so only drawing is timed
+            canvas.profiler.start_frame()
+            timer.start_frame()
+            with timer.measure("events"):
+                canvas.get_events()
+            sim_thread.check()
+            sim_thread.fast_forward_steps = canvas.fast_forward_steps if canvas.fast_forward else 0
+            canvas.draw(*sim_thread.get_latest())
+
+            with timer.measure("flip"):
+                pygame.display.update()
+            timer.end_frame()
+            canvas.profiler.end_frame()
+            clock.tick(fps)
+    finally:
+        # Let the current step finish instead of exiting in the middle of it
+        sim_thread.stop()
+
+
+def main(width=1920, height=1080, engine="objects", index="quadtree", workers=0, synchronous=False, threaded=False,
+         skin=0, record=None, checkpoint_path=None, checkpoint_every=5, restore=None, timings=None,
+         profile_frames=120, auto_tune=False):
+    """Creates a canvas and a tree, adds boids to it, then runs the main loop.
+    The engine is either "objects" for Boid objects in a spatial index, "numpy"
+    for the vectorized Flock engine or "jit" for the Flock engine compiled with
+    Numba. The index is the spatial index used by the objects engine, either
+    "quadtree" or "grid", or "morton" to have the numpy engine find neighbors with
+    a LinearQuadTree. With workers, the numpy engine computes the boids'
+    steering in that many processes. Synchronous makes the objects engine update
+    every boid from the previous frame's state. Threaded runs the numpy engine on
+    its own thread so drawing doesn't hold it up. A skin gives the objects engine
+    a NeighborList that looks that far past the sight radius. Record is a path
+    to save every step to, which can be played back with play. The whole state
+    is saved to the checkpoint path every checkpoint_every seconds and when the
+    window is closed, and can be continued from by passing it as restore.
+    Timings is a path to save how long each phase of every frame took to as a CSV file.
+    Pressing P profiles the next profile_frames frames. Auto tune keeps
+    changing the quad tree's node sizes to whatever makes the steps fastest."""
+
+    FPS = 60
+    clock = pygame.time.Clock() # Allows pygame to limit the fps to save on performance
+    last_frame = time.perf_counter() # Will be used for dt
+    # Every simulation step is the same length no matter how long a frame takes
+    timestep = FixedTimestep(1 / FPS, max_steps=5)
+
+    state = checkpoint.load(restore) if restore else None
+    if state:
+        for name, value in state["settings"].items():
+            params.set(name, value)
+    
+    canvas = create_canvas(width, height)
+    canvas.timer = timer
+    canvas.profiler.frames = profile_frames
+    if timings:
+        timer.start_csv(timings)
+        atexit.register(timer.close)
     width, height = canvas.width, canvas.height
-    tree = quad_tree.create_tree(5000,
-                                 5000,
-                                 Vector(width // 2, height // 2),
-                                 settings["max per node"]["value"],
-                                 settings["min per node"]["value"])
+    rng = np.random.default_rng()
+    step_count = 0
+    if engine == "jit":
+        stepper = JitStepper() # Steers the same Flock as the numpy engine, just compiled
+    elif engine == "numpy" and index == "morton":
+        stepper = MortonStepper()
+    else:
+        stepper = ParallelStepper(workers) if engine == "numpy" and workers else None
+    if state:
+        boids, tree = restore_checkpoint(state, canvas, rng, engine, index)
+        step_count = state["step"]
+    elif engine in ("numpy", "jit"):
+        tree = None # The vectorized engine finds neighbors without the quad tree
+        boids = Flock()
+        adjust_flock(boids, width, height, params.boids, rng)
+    else:
+        tree = create_index(index, width, height)
+        boids = create_boids(width, height, tree=tree, num_of_boids=params.boids)
+    neighbors = NeighborList(skin) if skin and tree is not None else None
     canvas.tree = tree
-    boids = create_boids(width, height, tree=tree, num_of_boids=settings["boids"]["value"])
+    recorder = None
+    if record:
+        recorder = TrajectoryWriter(record, timestep.step_size)
+        atexit.register(recorder.close) # The window is closed with sys.exit
+    checkpointer = None
+    if checkpoint_path:
+        checkpointer = CheckpointWriter(checkpoint_path, checkpoint_every)
+        # Save one last time when the window is closed, the only time it's worth walking the tree for its layout
+        atexit.register(lambda: checkpointer.write(wait=True, **get_checkpoint_state(boids, tree, canvas, rng,
+                                                                                     step_count, with_layout=True)))
+    tuner = None
+    if auto_tune and isinstance(tree, quad_tree.QuadTree):
+        tuner = TreeTuner(params)
+        timer.keep_on() # The tuner reads the time the tree takes from it
+        tuner_status = canvas.add_info([tuner.get_status()])[0]
+    if threaded and engine in ("numpy", "jit"):
+        run_threaded(canvas, boids, stepper, rng, FPS, recorder)
 
     while True:
-        dt = time.time() - last_frame # Calculate delta time
-        last_frame = time.time()
-        canvas.get_events() # Keypress events
-
-        minimum = settings["min per node"]["value"]
-        maximum = settings["max per node"]["value"]
-        # Check whether it's necessary to update the tree's number of nodes settings
-        if int(minimum) != tree.min_nodes or int(maximum) != tree.max_nodes:
-            tree.update_node_size(int(minimum), int(maximum))
+        frame_time = time.perf_counter() - last_frame # Calculate delta time
+        last_frame = time.perf_counter()
+        canvas.profiler.start_frame()
+        timer.start_frame()
+        with timer.measure("events"):
+            canvas.get_events() # Keypress events, which also apply any changed settings
 
         """ New Simulation Method """
-        boid_setting = int(settings["boids"]["value"])
+        boid_setting = params.boids
         if boid_setting != len(boids): # The setting was changed, so boids should be adjusted
-            if len(boids) < boid_setting:
-                boids += create_boids(width, height, tree=tree, num_of_boids=boid_setting - len(boids))
-            else:
-                delete_boids(boids, tree, len(boids) - boid_setting)
+            with timer.measure("population"):
+                if tree is None:
+                    adjust_flock(boids, width, height, boid_setting, rng)
+                else:
+                    adjust_boids(boids, width, height, tree, boid_setting)
         
-        lost_boids = simulation.simulate(boids, canvas.active_area, settings, tree, canvas.zones, dt)
-        # It is possible for the user to create situations where the boids get stuck outside the span
-        # of the tree with a combination of extreme values and slow simulation update time.
-        # This ensures that, when that happens, the boids are removed and reset within the simulation space.
-        boids += create_boids(width, height, tree, lost_boids)
+        timestep.fast_forward_steps = canvas.fast_forward_steps if canvas.fast_forward else 0
+        steps = timestep.advance(frame_time)
+        for step in range(steps):
+            if step == steps - 1 and tree is not None:
+                # Also while fast forwarding, so the first frame after it doesn't draw from where the boids were
+                # before it. A Flock keeps its own previous positions
+                for boid in boids:
+                    boid.previous_position.update(boid.position)
+            
+            tree_time = timer.get_time(*TUNED_PHASES)
+            lost_boids = simulation.simulate(boids, canvas.active_area, params, tree, canvas.zones, timestep.step_size,
+                                             stepper, synchronous, neighbors, timer)
+            if tuner:
+                tuner.record(timer.get_time(*TUNED_PHASES) - tree_time)
+            # It is possible for the user to create situations where the boids get stuck outside the span
+            # of the tree with a combination of extreme values and slow simulation update time.
+            # This ensures that, when that happens, the boids are removed and reset within the simulation space.
+            if lost_boids:
+                boids += create_boids(width, height, tree, lost_boids)
+            if recorder:
+                record_step(recorder, boids)
+            step_count += 1
         
-        canvas.draw(boids)
+        if tuner and tuner_status.text != tuner.get_status():
+            tuner_status.set_text(tuner.get_status())
+        if checkpointer and checkpointer.is_due():
+            checkpointer.write(**get_checkpoint_state(boids, tree, canvas, rng, step_count))
+        
+        canvas.draw(boids, timestep.alpha)
 
-        pygame.display.update()
+        with timer.measure("flip"):
+            pygame.display.update()
+        timer.end_frame()
+        canvas.profiler.end_frame()
         clock.tick(FPS) # Update at a rate of FPS
 
 
 if __name__ == "__main__":
-    main(1280, 720)
\ No newline at end of file
+    # Only set up when run, since ParallelStepper's worker processes import this file again
+    pygame.init()
+
+    # Settings that appear on the sidebar
+    settings = create_settings()
+    params = SimulationParams(settings) # The settings as attributes, which the sidebar changes
+    timer = FrameTimer() # Times the phases of every frame, shown with T
+
+    # Copy settings by value not reference
+    default_settings = copy.deepcopy(settings)
+
+    parser = argparse.ArgumentParser(description="Runs the boid simulation.")
+    parser.add_argument("--engine", choices=["objects", "numpy", "jit"], default="objects",
+                        help="objects simulates Boid objects in a spatial index, numpy simulates arrays of boids "
+                             "and jit simulates arrays of boids with compiled code (needs Numba)")
+    parser.add_argument("--index", choices=["quadtree", "grid", "morton"], default="quadtree",
+                        help="The spatial index the objects engine stores boids in, or morton to have the numpy "
+                             "engine find neighbors with a linear quad tree rebuilt every step instead of a grid")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Number of processes the numpy engine computes steering in (0 to not use any)")
+    parser.add_argument("--synchronous", action="store_true",
+                        help="Update every boid in the objects engine from the previous frame's state")
+    parser.add_argument("--skin", type=float, default=0,
+                        help="Cache each boid's neighbors this far past the view distance in the objects engine, "
+                             "so the index is only searched every few frames (0 to search every frame)")
+    parser.add_argument("--record", default=None, metavar="PATH",
+                        help="Save the boids after every step to a trajectory file")
+    parser.add_argument("--play", default=None, metavar="PATH",
+                        help="Play back a trajectory file instead of simulating")
+    parser.add_argument("--checkpoint", default=None, metavar="PATH",
+                        help="Save the whole simulation every few seconds and when closed, to continue with --restore")
+    parser.add_argument("--checkpoint-every", type=float, default=5, metavar="SECONDS",
+                        help="Seconds between checkpoints")
+    parser.add_argument("--restore", default=None, metavar="PATH",
+                        help="Continue from a checkpoint instead of random starting positions")
+    parser.add_argument("--timings", default=None, metavar="PATH",
+                        help="Save how long each phase of every frame takes to a CSV file")
+    parser.add_argument("--profile-frames", type=int, default=120, metavar="FRAMES",
+                        help="Frames to profile when P is pressed, saved to the profiles folder")
+    parser.add_argument("--auto-tune", action="store_true",
+                        help="Keep adjusting the quad tree's min and max per node to make the steps fastest, "
+                             "remembering the best values in tree_tuning.json")
+    parser.add_argument("--threaded", action="store_true",
+                        help="Run the numpy engine on its own thread, separate from drawing")
+    args = parser.parse_args()
+    if args.threaded and args.engine == "objects":
+        parser.error("--threaded requires --engine numpy or jit")
+    if args.threaded and args.checkpoint:
+        parser.error("--checkpoint can't be used with --threaded")
+    if args.workers and args.engine != "numpy":
+        parser.error("--workers requires --engine numpy, the jit engine already steers on every core")
+    if args.index == "morton" and (args.engine != "numpy" or args.workers):
+        parser.error("--index morton requires --engine numpy without --workers")
+    if args.auto_tune and (args.engine != "objects" or args.index != "quadtree"):
+        parser.error("--auto-tune requires the objects engine with the quadtree index")
+    if args.play:
+        play(args.play, 1280, 720)
+    main(1280, 720, engine=args.engine, index=args.index, workers=args.workers, synchronous=args.synchronous,
+         threaded=args.threaded, skin=args.skin, record=args.record, checkpoint_path=args.checkpoint,
+         checkpoint_every=args.checkpoint_every, restore=args.restore, timings=args.timings,
+         profile_frames=args.profile_frames, auto_tune=args.auto_tune)
\ No newline at end of file
@@ -0,0 +1,68 @@
+import unittest
+import numpy as np
+from boids.flock import Flock
+from boids.morton import LinearQuadTree, MortonStepper
+from boids.settings import create_settings
+from boids.params import SimulationParams
+import simulation
+
+
+class TestLinearQuadTreeMethods(unittest.TestCase):
+    def setUp(self):
+        """Sets up a random flock before every test."""
+
+        self.rng = np.random.default_rng(1)
+        self.flock = Flock()
+        self.flock.spawn(300, 400, 300, 3, 6, (227, 220, 194), self.rng)
+        self.active_area = ((100, 100), (200, 100))
+
+    def test_1_linear_quad_tree(self):
+        """Test that the linear quad tree finds every pair within the radius once, answers
+        radius queries exactly and steps the flock the same way."""
+
+        tree = LinearQuadTree(self.flock.positions, 25, max_per_leaf=8)
+        offsets = self.flock.positions[:, None] - self.flock.positions[None, :]
+        close = (offsets ** 2).sum(axis=2) < 25 * 25
+        np.fill_diagonal(close, False)
+        for start, stop in ((0, None), (100, 200)):
+            i, j = tree.pairs(start, stop)
+            found = set(zip(i.tolist(), j.tolist()))
+            expected = {(a, b) for a, b in zip(*[index.tolist() for index in np.nonzero(close)])
+                        if start <= a < (stop or len(self.flock))}
+            with self.subTest("Missed pairs.", start=start, stop=stop):
+                self.assertTrue(expected <= found)
+            with self.subTest("Repeated pairs.", start=start, stop=stop):
+                self.assertEqual(len(found), len(i))
+                self.assertTrue(np.all((i >= start) & (i < (stop or len(self.flock))) & (i != j)))
+
+        with self.subTest("Leaves don't cover every boid once."):
+            self.assertTrue(np.array_equal(tree.leaf_starts[1:], tree.leaf_stops[:-1]))
+            self.assertEqual((tree.leaf_starts[0], tree.leaf_stops[-1]), (0, len(self.flock)))
+            self.assertTrue(np.all((tree.leaf_stops - tree.leaf_starts <= 8) | (tree.leaf_levels == tree.depth)))
+        with self.subTest("No leaves bigger than a cell."):
+            self.assertTrue(np.any(tree.leaf_levels < tree.depth))
+
+        left, top, size = tree.get_leaf_rects()
+        leaf = np.repeat(np.arange(len(left)), tree.leaf_stops - tree.leaf_starts)
+        positions = self.flock.positions[tree.order]
+        with self.subTest("Boids outside their leaves."):
+            self.assertTrue(np.all((positions[:, 0] >= left[leaf]) & (positions[:, 0] < left[leaf] + size[leaf]) &
+                                   (positions[:, 1] >= top[leaf]) & (positions[:, 1] < top[leaf] + size[leaf])))
+
+        for position in ((200, 150), (20, 290), (-50, -50)):
+            for radius in (10, 25, 120):
+                distances = np.hypot(*(self.flock.positions - position).T)
+                with self.subTest("Wrong boids in radius.", position=position, radius=radius):
+                    self.assertEqual(sorted(tree.query_radius(position, radius).tolist()),
+                                     np.flatnonzero(distances <= radius).tolist())
+
+        params = SimulationParams(create_settings())
+        flock = Flock(self.flock.positions, self.flock.velocities, self.flock.colors)
+        simulation.simulate(self.flock, self.active_area, params, None, [], 1 / 60)
+        simulation.simulate(flock, self.active_area, params, None, [], 1 / 60, MortonStepper())
+        with self.subTest("Stepped differently."):
+            self.assertTrue(np.allclose(flock.positions, self.flock.positions))
+
+
+if __name__ == "__main__":
+    unittest.main()
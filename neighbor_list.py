@@ -0,0 +1,69 @@
+from itertools import chain
+import numpy as np
+
+
+def get_positions(boids):
+    """Returns the positions of the boids as an array with a row for each boid."""
+
+    return np.fromiter(chain.from_iterable(boid.position for boid in boids), np.float64,
+                       2 * len(boids)).reshape(-1, 2)
+
+
+class NeighborList:
+    """Caches every boid's neighbors within the sight radius plus a skin margin, found
+    with the spatial index's query_all. Until some boid has moved half the skin since
+    the lists were built, no boid outside a list can have come within the sight radius,
+    so in between only the cached candidates need their distance checked."""
+
+    def __init__(self, skin):
+        self.skin = skin # Extra distance the lists look past the sight radius
+        self.lists = {} # Maps each boid to the boids that were within the sight radius plus the skin
+        self.built_boids = [] # The boids in the order they were in when the lists were built
+        self.built_positions = get_positions(()) # Where each of them was, a row for each boid
+        self.sight_radius = None # The sight radius the lists were built for
+        self.rebuilds = 0
+
+    def needs_rebuild(self, boids, sight_radius, max_step):
+        """Whether a boid could now be within the sight radius of a boid whose list doesn't hold it.
+        The max step is the furthest a boid can move before every boid has been queried."""
+
+        if sight_radius != self.sight_radius or boids != self.built_boids: # Any boid added or removed
+            return True
+
+        # Two boids moving towards each other both use up their half of the skin
+        limit = self.skin / 2 - max_step
+        if limit <= 0:
+            return True
+
+        moved = get_positions(boids) - self.built_positions
+        return bool((moved * moved).sum(axis=1).max(initial=0) > limit * limit)
+
+    def update(self, boids, tree, sight_radius, max_step=0):
+        """Rebuilds the lists from the tree if they could be missing a neighbor.
+        Called once per frame before any boids are queried."""
+
+        if not self.needs_rebuild(boids, sight_radius, max_step):
+            return
+
+        radius = sight_radius + self.skin
+        # One pass over the tree, copying each list since query_all refills the same one
+        self.lists = {boid: list(in_range) for boid, in_range in tree.query_all(radius)}
+        self.built_boids = list(boids) # Copied since boids are added to and removed from the list in place
+        self.built_positions = get_positions(boids)
+        self.sight_radius = sight_radius
+        self.rebuilds += 1
+
+    def get_candidates(self, boid):
+        """Returns the boid's cached list. It holds every boid within the sight radius,
+        but also some further away, so they still need their distance checked."""
+
+        return self.lists[boid]
+
+    def remove(self, boid):
+        """Takes a boid that was removed from the tree out of every list, so no other boid
+        sees it before the lists are rebuilt. Removing any boid forces that rebuild."""
+
+        del self.lists[boid]
+        for candidates in self.lists.values():
+            if boid in candidates:
+                candidates.remove(boid)
@@ -0,0 +1,78 @@
+import unittest
+import random
+from neighbor_list import NeighborList
+from spatial_hash import SpatialHashGrid
+from boids.settings import create_settings
+from boids.params import SimulationParams
+import simulation
+from pygame.math import Vector2 as Vector
+from boid import Boid
+
+
+class TestNeighborListMethods(unittest.TestCase):
+    def setUp(self):
+        """Sets up a grid holding random boids before every test."""
+
+        random.seed(3)
+        self.params = SimulationParams(create_settings())
+        self.grid = SpatialHashGrid(self.params.sight_radius)
+        self.boids = []
+        for _ in range(200):
+            boid = Boid({}, Vector(random.uniform(0, 400), random.uniform(0, 400)),
+                        Vector(random.uniform(-5, 5), random.uniform(-5, 5)))
+            self.grid.insert_boid(boid)
+            self.boids.append(boid)
+
+    def test_1_rebuilds_before_missing_neighbors(self):
+        """Test that the lists always hold every boid within the sight radius as the boids move."""
+
+        neighbors = NeighborList(20)
+        radius = self.params.sight_radius
+        for _ in range(10):
+            neighbors.update(self.boids, self.grid, radius)
+            for boid in self.boids:
+                expected = [other for other in self.boids
+                            if boid.position.distance_squared_to(other.position) <= radius**2]
+                candidates = set(map(id, neighbors.get_candidates(boid)))
+                self.assertTrue(candidates.issuperset(map(id, expected)), "Neighbor missing from list.")
+
+            for boid in self.boids:
+                self.grid.adjust_boid_position(boid, 1 / 60)
+
+        with self.subTest("Rebuilt every frame."):
+            self.assertLess(neighbors.rebuilds, 10)
+
+    def test_2_matches_tree_queries(self):
+        """Test that a synchronous frame steers the same with and without the lists."""
+
+        copies = [Boid({}, Vector(boid.position), Vector(boid.velocity)) for boid in self.boids]
+        grid = SpatialHashGrid(self.params.sight_radius)
+        for boid in copies:
+            grid.insert_boid(boid)
+
+        active_area = ((50, 50), (300, 300))
+        simulation.simulate(self.boids, active_area, self.params, self.grid, [], 1 / 60, synchronous=True)
+        simulation.simulate(copies, active_area, self.params, grid, [], 1 / 60, synchronous=True,
+                            neighbors=NeighborList(20))
+        for boid, copy in zip(self.boids, copies):
+            self.assertAlmostEqual(boid.velocity.distance_to(copy.velocity), 0)
+
+    def test_3_remove(self):
+        """Test that a removed boid is taken out of every list and the lists are rebuilt after."""
+
+        neighbors = NeighborList(20)
+        neighbors.update(self.boids, self.grid, self.params.sight_radius)
+        lost = self.boids[0]
+        self.grid.remove_boid(lost)
+        self.boids.remove(lost)
+        neighbors.remove(lost)
+        with self.subTest("Removed boid still in a list."):
+            self.assertFalse(any(lost in neighbors.get_candidates(boid) for boid in self.boids))
+
+        neighbors.update(self.boids, self.grid, self.params.sight_radius)
+        with self.subTest("Not rebuilt after a boid was removed."):
+            self.assertEqual(neighbors.rebuilds, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
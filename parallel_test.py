@@ -0,0 +1,45 @@
+import unittest
+import numpy as np
+from boids.flock import Flock
+from boids.parallel import ParallelStepper
+from boids.settings import create_settings
+from boids.params import SimulationParams
+from boids.engine import Zone
+from boids import engine
+
+
+class TestParallelStepperMethods(unittest.TestCase):
+    def setUp(self):
+        """Sets up a random flock before every test."""
+
+        self.rng = np.random.default_rng(1)
+        self.flock = Flock()
+        self.flock.spawn(300, 400, 300, 3, 6, (227, 220, 194), self.rng)
+        self.active_area = ((100, 100), (200, 100))
+
+    def test_1_parallel_matches_serial(self):
+        """Test that the worker processes step the flock exactly like engine.step, with zones
+        and after the flock grows past the shared buffers."""
+
+        stepper = ParallelStepper(2, min_parallel_boids=0)
+        self.addCleanup(stepper.close)
+        params = SimulationParams(create_settings())
+        flock = Flock(self.flock.positions, self.flock.velocities, self.flock.colors)
+        extra = Flock()
+        extra.spawn(1000, 400, 300, 3, 6, (227, 220, 194), self.rng)
+        for zones in ([], [Zone((200, 150), 40)], [Zone((200, 150), 40)]):
+            if len(self.flock) < stepper.capacity: # Spawn more than fit, so the buffers are made again
+                self.flock.add(extra.positions, extra.velocities, extra.colors)
+                flock.add(extra.positions, extra.velocities, extra.colors)
+            engine.step(self.flock, self.active_area, params, zones, 1 / 60)
+            stepper.step(flock, self.active_area, params, zones, 1 / 60)
+            with self.subTest("Stepped differently.", boids=len(flock), zones=len(zones)):
+                self.assertTrue(np.array_equal(flock.positions, self.flock.positions))
+                self.assertTrue(np.array_equal(flock.velocities, self.flock.velocities))
+
+        with self.subTest("Buffers didn't grow."):
+            self.assertGreaterEqual(stepper.capacity, len(flock))
+
+
+if __name__ == "__main__":
+    unittest.main()
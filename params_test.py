@@ -0,0 +1,54 @@
+import unittest
+from boids.params import SimulationParams
+from boids.settings import create_settings
+
+
+class TestSimulationParamsMethods(unittest.TestCase):
+    def setUp(self):
+        """Sets up params from the default settings and records every change."""
+
+        self.params = SimulationParams(create_settings())
+        self.changes = []
+        self.params.add_listener(lambda name, params: self.changes.append((name, params.get(name))))
+
+    def test_1_attributes(self):
+        """Test that every setting is an attribute of the right type."""
+
+        with self.subTest("Wrong value."):
+            self.assertEqual(self.params.view_distance, 50)
+
+        with self.subTest("Whole number setting not an int."):
+            self.assertIsInstance(self.params.boids, int)
+
+        with self.subTest("Setting not a float."):
+            self.assertIsInstance(self.params.separation_distance, float)
+
+        with self.subTest("Params allowed an unknown attribute."):
+            self.assertRaises(AttributeError, setattr, self.params, "not_a_setting", 1)
+
+    def test_2_set(self):
+        """Test that setting a value updates the dict and notifies the listeners."""
+
+        self.params.set("view distance", 80)
+        with self.subTest("Attribute not changed."):
+            self.assertEqual(self.params.view_distance, 80)
+
+        with self.subTest("Settings dict not changed."):
+            self.assertEqual(self.params.settings["view distance"]["value"], 80)
+
+        with self.subTest("Listener not told which setting changed."):
+            self.assertEqual(self.changes, [("view distance", 80)])
+
+        with self.subTest("Sight radius not updated."):
+            self.assertEqual(self.params.sight_radius, 80)
+
+    def test_3_unchanged(self):
+        """Test that listeners are not notified when the value stays the same."""
+
+        self.params.set("boids", 100.4) # Still 100 boids
+        self.params.set("turn factor", 0.2)
+        self.assertEqual(self.changes, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
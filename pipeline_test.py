@@ -0,0 +1,87 @@
+import unittest
+import threading
+import numpy as np
+from boids.flock import Flock
+from boids.settings import create_settings
+from boids.params import SimulationParams
+from boids.pipeline import TripleBuffer, SimulationThread
+
+
+class TestTripleBufferMethods(unittest.TestCase):
+    def setUp(self):
+        """Sets up a random flock before every test."""
+
+        self.rng = np.random.default_rng(1)
+        self.flock = Flock()
+        self.flock.spawn(300, 400, 300, 3, 6, (227, 220, 194), self.rng)
+
+    def test_1_triple_buffer(self):
+        """Test that the reader gets the newest published frame and never the one being written."""
+
+        buffer = TripleBuffer(Flock)
+        self.flock.copy_to(buffer.get_back())
+        buffer.publish()
+        self.flock.remove_random(10, self.rng)
+        self.flock.copy_to(buffer.get_back())
+        buffer.publish()
+        frame = buffer.get_latest()
+        with self.subTest("Newest frame."):
+            self.assertEqual(len(frame), len(self.flock))
+            self.assertTrue(np.array_equal(frame.positions, self.flock.positions))
+        with self.subTest("Frames are copies."):
+            self.assertIsNot(frame.positions, self.flock.positions)
+        with self.subTest("Reader and writer separate."):
+            self.assertIsNot(buffer.get_back(), frame)
+            self.assertIs(buffer.get_latest(), frame) # Nothing new was published
+
+    def test_2_threads(self):
+        """Test that the reader never gets a frame the writer is still writing on another thread."""
+
+        buffer = TripleBuffer(lambda: np.zeros(200))
+        stopped = threading.Event()
+
+        def write():
+            number = 0
+            while not stopped.is_set():
+                number += 1
+                frame = buffer.get_back()
+                for index in range(len(frame)): # Slowly, so a half written frame would be seen
+                    frame[index] = number
+                buffer.publish()
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        torn = 0
+        for _ in range(2000):
+            frame = buffer.get_latest()
+            first = frame[0]
+            for value in frame:
+                if value != first:
+                    torn += 1
+                    break
+        stopped.set()
+        writer.join()
+        with self.subTest("Frame written while being read."):
+            self.assertEqual(torn, 0)
+
+    def test_3_interpolation(self):
+        """Test that the simulation thread's frames keep the positions from before the step to draw between."""
+
+        step_size = 1 / 60
+        thread = SimulationThread(self.flock, SimulationParams(create_settings()), ((0, 0), (400, 300)),
+                                  list, step_size=step_size)
+        thread.start()
+        while thread.steps < 2:
+            thread.stopped.wait(step_size)
+        thread.stop()
+        thread.check()
+        frame, alpha = thread.get_latest()
+        with self.subTest("Previous positions not kept."):
+            self.assertIsNotNone(frame.next_positions)
+            self.assertTrue(np.allclose(frame.positions - frame.next_positions, frame.velocities))
+        with self.subTest("Wrong interpolation."):
+            self.assertTrue(0 <= alpha <= 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
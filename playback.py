@@ -0,0 +1,96 @@
+import pygame
+from boids.flock import Flock
+
+# Playback speeds the up and down arrows step through
+SPEEDS = (0.125, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+
+
+class Player:
+    """Keeps track of where in a recorded trajectory the playback is. The playback moves
+    through the recording by time instead of by frames drawn, so it plays at the speed
+    it was simulated at, no matter how slowly the simulation originally ran."""
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.time = 0 # Seconds into the recording
+        self.speed_index = SPEEDS.index(1)
+        self.paused = False
+        self.frame = Flock() # Reused for every frame read from the recording
+        self.previous_frame = Flock()
+
+    @property
+    def speed(self):
+        return SPEEDS[self.speed_index]
+
+    @property
+    def last_time(self):
+        """The time of the last recorded frame."""
+
+        return max(len(self.reader) - 1, 0) * self.reader.step_size
+
+    def get_frame_index(self):
+        """The recorded frame at or just before the current time."""
+
+        # The small extra keeps rounding from landing just before the frame that was seeked to
+        return min(int(self.time / self.reader.step_size + 1e-9), max(len(self.reader) - 1, 0))
+
+    def advance(self, frame_time):
+        """Moves the playback forward by the time the last frame took, scaled by the speed."""
+
+        if not self.paused:
+            self.seek(self.time + frame_time * self.speed)
+
+    def seek(self, time):
+        """Jumps to the time in the recording, kept within the recording."""
+
+        self.time = min(max(time, 0), self.last_time)
+
+    def get_frame(self):
+        """Returns the Flock to draw and how far it is from the frame before it to itself,
+        so the drawing can be interpolated between the two recorded frames. An empty
+        recording, such as one from a run that stopped before its first step, gives an empty Flock."""
+
+        if not len(self.reader):
+            return self.frame, 1
+
+        index = self.get_frame_index()
+        if index + 1 >= len(self.reader):
+            return self.reader.get_frame(index, self.frame), 1
+
+        # Show the next frame and the time between them as the interpolation
+        frame = self.reader.get_frame(index + 1, self.frame)
+        previous = self.reader.get_frame(index, self.previous_frame)
+        if len(previous) == len(frame):
+            frame.next_positions = previous.positions # Where Canvas.draw_flock looks for the previous positions
+        alpha = self.time / self.reader.step_size - index
+        return frame, alpha
+
+    def get_status(self):
+        """Returns the text describing where the playback is."""
+
+        index = self.get_frame_index()
+        state = "Paused" if self.paused else f"{self.speed:g}x"
+        return f"Frame {index + 1}/{len(self.reader)}  {state}" if len(self.reader) else "Empty"
+
+    def check_event(self, event):
+        """Handles the playback controls."""
+
+        if event.type != pygame.KEYDOWN:
+            return
+
+        if event.key == pygame.K_SPACE:
+            self.paused = not self.paused
+        elif event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+            direction = 1 if event.key == pygame.K_RIGHT else -1
+            if self.paused: # Step a single frame
+                self.seek((self.get_frame_index() + direction) * self.reader.step_size)
+            else:
+                self.seek(self.time + direction * max(self.speed, 1)) # A second of playback
+        elif event.key == pygame.K_UP:
+            self.speed_index = min(self.speed_index + 1, len(SPEEDS) - 1)
+        elif event.key == pygame.K_DOWN:
+            self.speed_index = max(self.speed_index - 1, 0)
+        elif event.key == pygame.K_HOME:
+            self.seek(0)
+        elif event.key == pygame.K_END:
+            self.seek(self.last_time)
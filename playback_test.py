@@ -0,0 +1,93 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+import pygame
+from boids.flock import Flock
+from boids.trajectory import TrajectoryWriter, TrajectoryReader
+from playback import Player, SPEEDS
+
+
+class TestPlayerMethods(unittest.TestCase):
+    def setUp(self):
+        """Sets up a recording of a flock moving right one unit a frame before every test."""
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "run.traj")
+        self.rng = np.random.default_rng(1)
+        flock = Flock()
+        flock.spawn(50, 400, 300, 3, 6, (227, 220, 194), self.rng)
+        self.recorded = []
+        with TrajectoryWriter(self.path, 0.5, chunk_frames=4) as writer:
+            for _ in range(10):
+                flock.positions = flock.positions + (1, 0)
+                writer.append(flock.positions, flock.velocities, flock.colors)
+                self.recorded.append(flock.positions.copy())
+
+        self.reader = TrajectoryReader(self.path)
+        self.addCleanup(self.reader.close)
+        self.player = Player(self.reader)
+
+    def test_1_seek(self):
+        """Test that seeking stays within the recording and lands on the right frame."""
+
+        for time, index in ((-3, 0), (0, 0), (1.5, 3), (1.74, 3), (100, 9)):
+            self.player.seek(time)
+            with self.subTest(time=time):
+                self.assertEqual(self.player.get_frame_index(), index)
+                self.assertTrue(0 <= self.player.time <= self.player.last_time)
+
+        self.player.seek(0)
+        self.player.paused = True
+        self.player.advance(1)
+        with self.subTest("Moved while paused."):
+            self.assertEqual(self.player.time, 0)
+
+        self.player.paused = False
+        self.player.speed_index = SPEEDS.index(2)
+        self.player.advance(1)
+        with self.subTest("Moved at the wrong speed."):
+            self.assertEqual(self.player.get_frame_index(), 4)
+
+        self.player.check_event(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_END))
+        with self.subTest("End didn't jump to the last frame."):
+            self.assertEqual(self.player.get_frame_index(), 9)
+
+    def test_2_interpolation(self):
+        """Test that the frame between two recorded frames is drawn between them."""
+
+        self.player.seek(1.25) # Halfway from frame 2 to frame 3
+        flock, alpha = self.player.get_frame()
+        with self.subTest("Wrong frame."):
+            self.assertTrue(np.allclose(flock.positions, self.recorded[3], atol=1e-3))
+            self.assertTrue(np.allclose(flock.next_positions, self.recorded[2], atol=1e-3))
+        with self.subTest("Wrong interpolation."):
+            self.assertAlmostEqual(alpha, 0.5)
+
+        self.player.seek(self.player.last_time)
+        flock, alpha = self.player.get_frame()
+        with self.subTest("Wrong frame at the end."):
+            self.assertTrue(np.allclose(flock.positions, self.recorded[9], atol=1e-3))
+            self.assertEqual(alpha, 1)
+        with self.subTest("Wrong status at the end."):
+            self.assertTrue(self.player.get_status().startswith("Frame 10/10"))
+
+    def test_3_empty(self):
+        """Test that a recording without any frames plays as an empty flock."""
+
+        path = os.path.join(self.directory.name, "empty.traj")
+        TrajectoryWriter(path, 0.5).close()
+        reader = TrajectoryReader(path)
+        self.addCleanup(reader.close)
+        player = Player(reader)
+        player.advance(1)
+        flock, alpha = player.get_frame()
+        with self.subTest("Frame not empty."):
+            self.assertEqual((len(flock), alpha), (0, 1))
+        with self.subTest("Wrong status."):
+            self.assertEqual(player.get_status(), "Empty")
+
+
+if __name__ == "__main__":
+    unittest.main()
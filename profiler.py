@@ -0,0 +1,137 @@
+import collections
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+
+
+def get_frame_name(frame):
+    """Names a stack frame by its function and where the function is."""
+
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler(threading.Thread):
+    """Looks at the stack of every other thread every interval seconds and counts how
+    often each stack is seen, which is what the collapsed stack format holds.
+    Threads in idle are skipped, such as the main thread while it waits for the next frame."""
+
+    def __init__(self, interval=0.001):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.stopped = threading.Event()
+        self.idle = set() # Idents of the threads not to sample right now
+
+    def run(self):
+        names = {} # Thread names by ident, since stacks only come with the ident
+        while not self.stopped.wait(self.interval):
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident == self.ident or ident in self.idle:
+                    continue
+
+                if ident not in names:
+                    names.update({thread.ident: thread.name for thread in threading.enumerate()})
+                stack = []
+                while frame is not None:
+                    stack.append(get_frame_name(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident))) # The root of the stack, so each thread is its own tower
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class FrameProfiler:
+    """Profiles a number of frames when asked to, then writes a .pstats file of the
+    main thread and a collapsed stack file of every thread that flame graph tools can
+    read to a new folder. cProfile only sees the thread that started it, so the sampled
+    stacks are what show the simulation thread when it runs on its own."""
+
+    def __init__(self, frames=120, directory="profiles"):
+        self.frames = frames # Frames to profile each time
+        self.directory = directory
+        self.requested = False
+        self.profile = None
+        self.sampler = None
+        self.frames_profiled = 0
+        self.summary = [] # Lines describing the last profile
+        self.summary_time = 0 # When the summary was made, so it's only shown for a while
+
+    @property
+    def running(self):
+        return self.profile is not None
+
+    def request(self):
+        """Starts profiling at the start of the next frame."""
+
+        if not self.running:
+            self.requested = True
+
+    def start_frame(self):
+        """Called at the start of every frame."""
+
+        if self.requested:
+            self.requested = False
+            self.frames_profiled = 0
+            self.sampler = StackSampler()
+            self.sampler.start()
+            self.profile = cProfile.Profile()
+
+        if self.running:
+            self.sampler.idle.discard(threading.get_ident())
+            self.profile.enable()
+
+    def end_frame(self):
+        """Called once a frame is done, before waiting for the next one, so
+        the waiting isn't profiled. Writes the profile after the last frame."""
+
+        if not self.running:
+            return
+
+        self.profile.disable()
+        self.sampler.idle.add(threading.get_ident())
+        self.frames_profiled += 1
+        if self.frames_profiled >= self.frames:
+            self.sampler.stop()
+            self.write()
+            self.profile = self.sampler = None
+
+    def write(self):
+        """Saves the profile and stacks to a folder named after the time and summarizes them."""
+
+        path = os.path.join(self.directory, time.strftime("%Y%m%d-%H%M%S"))
+        os.makedirs(path, exist_ok=True)
+        self.profile.dump_stats(os.path.join(path, "frames.pstats"))
+        with open(os.path.join(path, "frames.folded"), "w") as file:
+            for stack, count in sorted(self.sampler.stacks.items()):
+                file.write(f"{stack} {count}\n")
+
+        self.summary = [f"Profiled {self.frames} frames to {path}"] + self.get_top_functions()
+        self.summary_time = time.perf_counter()
+
+    def get_top_functions(self, count=5):
+        """Returns lines for the functions that took the most time themselves, per frame."""
+
+        stats = pstats.Stats(self.profile).stats
+        # Each entry maps (file, line, function) to (primitive calls, calls, own time, cumulative time, callers)
+        top = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:count]
+        return [f"{own_time * 1000 / self.frames:6.2f} ms  {function} ({os.path.basename(file)}:{line})"
+                for (file, line, function), (_, _, own_time, _, _) in top]
+
+    def get_lines(self, show_for=10):
+        """Returns the text to show on screen, which is the progress while
+        profiling and the summary for show_for seconds afterwards."""
+
+        if self.running:
+            return [f"Profiling {self.frames_profiled}/{self.frames} frames"]
+        if self.summary and time.perf_counter() - self.summary_time < show_for:
+            return self.summary
+
+        return []
@@ -0,0 +1,41 @@
+import unittest
+import os
+import pstats
+import tempfile
+import time
+from profiler import FrameProfiler
+
+
+class TestFrameProfilerMethods(unittest.TestCase):
+    def test_1_profile_frames(self):
+        """Test that the requested number of frames is profiled and written out."""
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        profiler = FrameProfiler(frames=3, directory=directory.name)
+        profiler.request()
+        for _ in range(5):
+            profiler.start_frame()
+            time.sleep(0.01) # Something for the sampler to see
+            profiler.end_frame()
+
+        with self.subTest("Stopped after the frames."):
+            self.assertFalse(profiler.running)
+            self.assertEqual(profiler.frames_profiled, 3)
+
+        path, = os.listdir(directory.name)
+        path = os.path.join(directory.name, path)
+        with self.subTest("Profile written."):
+            self.assertIn("sleep", str(pstats.Stats(os.path.join(path, "frames.pstats")).stats))
+        with self.subTest("Stacks written."):
+            with open(os.path.join(path, "frames.folded")) as file:
+                for line in file:
+                    stack, count = line.rsplit(" ", 1)
+                    self.assertTrue(stack.startswith("MainThread;"))
+                    self.assertGreater(int(count), 0)
+        with self.subTest("Summary shown."):
+            self.assertTrue(profiler.get_lines()[0].startswith("Profiled 3 frames"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,16 @@
 from pygame.math import Vector2 as Vector
 from pygame.locals import Rect
 import pygame
+import heapq
+import math
+import numpy as np
 from boid import Boid
+from spatial_index import SpatialIndex
+
+
+# Indices of the children of a quad. The first bit is set for the right side and the second for the bottom
+TOP_LEFT, TOP_RIGHT, BOTTOM_LEFT, BOTTOM_RIGHT = range(4)
+LEAF_BIT = 1 << 4 # Marks a leaf in a layout
 
 
 def create_tree(width, height, center, max_nodes, min_nodes):
@@ -13,136 +22,210 @@ def create_tree(width, height, center, max_nodes, min_nodes):
     return tree
 
 class Node:
+    __slots__ = ("boid", "x", "y", "leaf") # Saves a dict for every boid
+
     def __init__(self, boid):
         self.boid = boid
         self.x = boid.position.x
         self.y = boid.position.y
+        self.leaf = None # The leaf the node is in, so it can be found without searching the tree
 
 
-class QuadTree:
-    """A quad tree containing multiple nodes per leaf that dynamically change as the nodes move."""
+class QuadTree(SpatialIndex):
+    """A quad tree containing multiple nodes per leaf that dynamically change as the nodes move.
+    Thousands of quads are made and thrown away every second, so they're kept small with slots,
+    their children in a list by quadrant index and their edges as plain numbers."""
 
-    def __init__(self, top_left, bottom_right, nodes=[], parent=None, max_nodes=25, min_nodes=15):
-        self.nodes = nodes
-        self.parent = parent
+    __slots__ = ("nodes", "parent", "root", "max_nodes", "min_nodes", "node_count", "leaf", "children",
+                 "left", "top", "right", "bottom", "center_x", "center_y", "bounds",
+                 "handles", "query_stack", "sight_radius")
+
+    def __init__(self, top_left, bottom_right, nodes=None, parent=None, max_nodes=25, min_nodes=15):
         self.max_nodes = max_nodes # Node number at which the leaf will subdivide
         self.min_nodes = min_nodes # Node number at which a parent will reabsorb its kids' nodes
+        self.sight_radius = 0
+        # Only the root keeps these, so every quad refers to it
+        self.handles = {} if parent is None else None # Maps every boid in the tree to its node
+        self.query_stack = [] if parent is None else None # Reused by every query_radius
+        left, top = top_left
+        right, bottom = bottom_right
+        nodes = [] if nodes is None else nodes
+        self.nodes = nodes
+        for node in nodes:
+            node.leaf = self
+        self.parent = parent
+        self.root = self if parent is None else parent.root
         self.node_count = len(nodes) # The number of total nodes whithin all children combined
         self.leaf = True
-        self.tl_corner = top_left # The extreme corners of the tree
-        self.br_corner = bottom_right
-        self.center = Vector((self.tl_corner.x + self.br_corner.x) // 2, (self.tl_corner.y + self.br_corner.y) // 2)
-        self.rect = Rect(top_left, bottom_right - top_left)
-        self.clear_children()
-    
+        self.left = left # The extreme edges of the tree
+        self.top = top
+        self.right = right
+        self.bottom = bottom
+        self.center_x = (left + right) // 2
+        self.center_y = (top + bottom) // 2
+        # The edges query_radius measures to. Nodes just past the center go in the quad starting at
+        # center + 1, so like get_squared_distance the quad is treated as 1 bigger on that side
+        self.bounds = (left - 1, top - 1, right, bottom)
+        self.children = [None, None, None, None]
+
+    def new_child(self, index, nodes):
+        """Returns a quad for the child at the index. It isn't set as the child yet."""
+
+        left, top, right, bottom = self.get_child_corners(index)
+        return QuadTree((left, top), (right, bottom), nodes=nodes, parent=self, max_nodes=self.max_nodes,
+                        min_nodes=self.min_nodes)
+
     def clear_children(self):
         """All children are removed."""
 
-        self.children = {
-            "tl":None,
-            "tr":None,
-            "bl":None,
-            "br":None
-        }
+        self.children = [None, None, None, None]
     
     def remove_boid(self, boid):
-        """Creates a node from a given boid and is used to remove that boid from the tree."""
+        """Removes the boid from the leaf its handle points to, then updates
+        the quads above it without searching down from the root."""
 
-        self.remove_node(Node(boid))
+        node = self.handles.pop(boid, None)
+        if node is None:
+            raise RuntimeError("Unable to find boid in tree.")
+        
+        leaf = node.leaf
+        leaf.nodes.remove(node)
+        leaf.node_count -= 1
+        tree = leaf
+        too_few = None # The highest quad left with less than the minimum nodes
+        while tree.parent is not None:
+            parent = tree.parent
+            parent.node_count -= 1
+            if tree.node_count <= 0: # No nodes left in that child
+                parent.remove_child(tree)
+                if too_few is tree: # It's gone, so its parent will be reabsorbed if needed
+                    too_few = None
+            if parent.node_count < parent.min_nodes:
+                too_few = parent
+            tree = parent
+        
+        if too_few is not None:
+            # The combined nodes in its children are less than the minimum, so combine them
+            too_few.reabsorb()
     
     def insert_boid(self, boid):
         """Creates a node based off the given boid to insert in the tree."""
 
         self.insert_node(Node(boid))
     
-    def get_child(self, string):
-        """Returns the child tree object based on the given child string [bl,br,tl,tr]."""
+    def insert_boids(self, boids):
+        """Inserts many boids at once with insert_nodes."""
+
+        self.insert_nodes([Node(boid) for boid in boids])
+    
+    def remove_boids(self, boids):
+        """Removes many boids at once. Every node is taken out of the leaf its handle points to,
+        then the counts above each leaf are lowered once for all the nodes taken from it, and
+        only the highest quads left empty or with too few nodes are removed or reabsorbed."""
+
+        handles = self.handles
+        nodes = [handles.pop(boid, None) for boid in boids]
+        if None in nodes: # Missing or given twice, so put the others back before anything changes
+            for node in nodes:
+                if node is not None:
+                    handles[node.boid] = node
+            raise RuntimeError("Unable to find boid in tree.")
+        
+        for node in nodes:
+            node.leaf.nodes.remove(node)
+        # The number of nodes taken from every leaf
+        removed = {leaf: leaf.node_count - len(leaf.nodes) for leaf in {node.leaf for node in nodes}}
+        
+        # Lower the counts above every leaf once for all of its nodes, keeping the quads that
+        # end up empty or with too few nodes. Counts only go down, so they stay that way
+        emptied = []
+        for leaf, count in removed.items():
+            tree = leaf
+            while tree is not None:
+                tree.node_count -= count
+                if tree.node_count <= 0 or (tree.node_count < tree.min_nodes and not tree.leaf):
+                    emptied.append(tree)
+                tree = tree.parent
+        
+        # Only the highest of them are removed or reabsorbed, which takes the ones below them too.
+        # Every quad has at least as many nodes as its children, so those are the ones whose parent has enough
+        highest = [tree for tree in dict.fromkeys(emptied)
+                   if tree.parent is None or tree.parent.node_count >= tree.parent.min_nodes]
+        for tree in highest:
+            if tree.parent is not None and tree.node_count <= 0: # No nodes left in that child
+                tree.parent.remove_child(tree)
+            elif not tree.leaf:
+                # The combined nodes in its children are less than the minimum, so combine them
+                tree.reabsorb()
+    
+    def remove_child(self, child):
+        """Removes the child tree object, whichever quadrant it's in."""
+
+        for index, other in enumerate(self.children):
+            if other is child:
+                self.children[index] = None
+                return
+    
+    def get_child(self, index):
+        """Returns the child tree object at the quadrant index [TOP_LEFT, TOP_RIGHT, BOTTOM_LEFT, BOTTOM_RIGHT]."""
 
         try:
-            return self.children[string]
-        except:
-            raise RuntimeError(f"Unable to retrieve child with the string '{string}'.")
+            return self.children[index]
+        except (IndexError, TypeError):
+            raise RuntimeError(f"Unable to retrieve child with the index '{index}'.")
 
-    def set_child(self, string, tree):
-        """Sets the child tree object of the given child string. Can be None."""
+    def set_child(self, index, tree):
+        """Sets the child tree object at the quadrant index. Can be None."""
 
-        if tree is None or type(tree) == QuadTree:
-            self.children[string] = tree
+        if tree is None or isinstance(tree, QuadTree):
+            self.children[index] = tree
         else:
             raise TypeError("Attempted to set child as non quadtree type.")
     
     def node_within_bounds(self, n):
         """Returns bool of whether node is within the current node's coordinate bounds."""
 
-        tx, ty = self.tl_corner
-        bx, by = self.br_corner
-        return tx <= n.x <= bx and ty <= n.y <= by
+        return self.contains_point(n.x, n.y)
+
+    def contains_point(self, x, y):
+        """Returns whether the point is within the quad's edges."""
+
+        return self.left <= x <= self.right and self.top <= y <= self.bottom
     
-    def find_child_string_for_node(self, n):
-        """Returns the string of which child quad the node is inside."""
+    def find_child_index_for_node(self, n):
+        """Returns the index of the child quad the node is inside."""
 
-        x, y = self.center
-        if n.x <= x:
-            if n.y <= y:
-                return "tl"
-            else:
-                return "bl"
-        else:
-            if n.y <= y:
-                return "tr"
-            else:
-                return "br"
+        return (n.x > self.center_x) + 2 * (n.y > self.center_y)
     
-    def create_child(self, child_string, node, parent=None):
-        """Creates a new tree object based on the given child string to quadrant off the correct area."""
-
-        if child_string == "tl":
-            new_child = QuadTree(self.tl_corner,
-                                 self.center,
-                                 nodes=[node],
-                                 parent=parent,
-                                 max_nodes=self.max_nodes,
-                                 min_nodes=self.min_nodes)
-            self.set_child("tl", new_child)
-            return new_child
-        elif child_string == "bl":
-            new_child = QuadTree(Vector(self.tl_corner.x, self.center.y + 1),
-                                Vector(self.center.x, self.br_corner.y),
-                                nodes=[node],
-                                parent=parent,
-                                max_nodes=self.max_nodes,
-                                min_nodes=self.min_nodes)
-            self.set_child("bl", new_child)
-            return new_child
-        elif child_string == "tr":
-            new_child = QuadTree(Vector(self.center.x + 1, self.tl_corner.y),
-                                Vector(self.br_corner.x, self.center.y),
-                                nodes=[node],
-                                parent=parent,
-                                max_nodes=self.max_nodes,
-                                min_nodes=self.min_nodes)
-            self.set_child("tr", new_child)
-            return new_child
-        elif child_string == "br":
-            new_child = QuadTree(self.center + Vector(1, 1),
-                                self.br_corner,
-                                nodes=[node],
-                                parent=parent,
-                                max_nodes=self.max_nodes,
-                                min_nodes=self.min_nodes)
-            self.set_child("br", new_child)
-            return new_child
+    def get_child_corners(self, index):
+        """Returns the left, top, right and bottom edges of the quadrant at the index."""
+
+        if index == TOP_LEFT:
+            return self.left, self.top, self.center_x, self.center_y
+        elif index == BOTTOM_LEFT:
+            return self.left, self.center_y + 1, self.center_x, self.bottom
+        elif index == TOP_RIGHT:
+            return self.center_x + 1, self.top, self.right, self.center_y
+        elif index == BOTTOM_RIGHT:
+            return self.center_x + 1, self.center_y + 1, self.right, self.bottom
         else:
-            raise RuntimeError("Received invalid child string.")
+            raise RuntimeError("Received invalid child index.")
+    
+    def create_child(self, index, node):
+        """Creates a new tree object holding the node to quadrant off the correct area."""
+
+        new_child = self.new_child(index, [node])
+        self.set_child(index, new_child)
+        return new_child
     
     def divide(self):
         """Subdivides the current leaf and separate its nodes into the appropriate children."""
 
         for node in self.nodes:
-            child_string = self.find_child_string_for_node(node)
-            child = self.get_child(child_string)
+            index = self.find_child_index_for_node(node)
+            child = self.children[index]
             if child is None: # No child in that quadrant yet
-                self.create_child(child_string, node, self)
+                self.create_child(index, node)
             else:
                 child.insert_node(node)
         
@@ -152,24 +235,27 @@ class QuadTree:
     def insert_node(self, n):
         """Finds the correct leaf to place the given node into."""
 
-        if self.parent == None and not self.node_within_bounds(n): # In the root
-            # The node is outside of the area of the tree.
-            raise RuntimeError("Node outside of tree boundaries.")
+        if self.parent == None: # In the root
+            if not self.node_within_bounds(n):
+                # The node is outside of the area of the tree.
+                raise RuntimeError("Node outside of tree boundaries.")
+            self.handles[n.boid] = n
 
         if self.leaf:
             self.nodes.append(n)
+            n.leaf = self
             self.node_count += 1
             # Check if needs/can subdivide
             if len(self.nodes) > self.max_nodes and\
-                    abs(self.tl_corner.x - self.br_corner.x) >= 4 and\
-                    abs(self.tl_corner.y - self.br_corner.y) >= 4: # There's room for more subtrees
+                    self.right - self.left >= 4 and\
+                    self.bottom - self.top >= 4: # There's room for more subtrees
                 self.divide()
         else:
-            child_string = self.find_child_string_for_node(n)
-            child = self.get_child(child_string)
+            index = self.find_child_index_for_node(n)
+            child = self.children[index]
             if child is None:
                 # Create a new leaf to place the node in
-                self.create_child(child_string, n, self)
+                self.create_child(index, n)
             else:
                 child.insert_node(n)
             
@@ -177,6 +263,131 @@ class QuadTree:
             # Keeps track of number of nodes in children too in case
             # it needs to reabsorb them.
     
+    def split_nodes(self, nodes):
+        """Splits the nodes into lists for the child quads they belong in, in the order of their indices."""
+
+        x = self.center_x
+        y = self.center_y
+        top_left, top_right, bottom_left, bottom_right = [], [], [], []
+        for node in nodes: # The same rules as find_child_index_for_node, without a call per node
+            if node.x <= x:
+                if node.y <= y:
+                    top_left.append(node)
+                else:
+                    bottom_left.append(node)
+            elif node.y <= y:
+                top_right.append(node)
+            else:
+                bottom_right.append(node)
+        
+        return top_left, top_right, bottom_left, bottom_right
+    
+    def insert_nodes(self, nodes):
+        """Inserts many nodes at once. Rather than every node descending the tree on its own,
+        each quad splits the whole batch between its children in one pass, and a leaf that
+        gets too full divides once instead of every time another node is added."""
+
+        if self.parent is None:
+            for n in nodes:
+                if not self.node_within_bounds(n):
+                    raise RuntimeError("Node outside of tree boundaries.")
+            for n in nodes:
+                self.handles[n.boid] = n
+
+        if not nodes:
+            return
+        
+        self.node_count += len(nodes)
+        if self.leaf:
+            self.nodes = self.nodes + nodes
+            if not (len(self.nodes) > self.max_nodes and
+                    self.right - self.left >= 4 and
+                    self.bottom - self.top >= 4): # Fits, or no room for more subtrees
+                for n in nodes:
+                    n.leaf = self
+                return
+            
+            # Divide, passing every node on to the children at once
+            nodes = self.nodes
+            self.nodes = []
+            self.leaf = False
+        
+        for index, child_nodes in enumerate(self.split_nodes(nodes)):
+            if not child_nodes:
+                continue
+            
+            child = self.children[index]
+            if child is None:
+                child = self.new_child(index, [])
+                self.set_child(index, child)
+            child.insert_nodes(child_nodes)
+    
+    def get_layout(self, boid_indices):
+        """Returns the shape of the tree and which boids are in each leaf as arrays, with
+        the boids given as their index in the boid_indices dict. from_layout uses them to
+        rebuild the tree without inserting the boids one at a time."""
+
+        flags = [] # Which children every quad has and whether it's a leaf, in depth first order
+        counts = [] # The number of nodes in every quad that is a leaf
+        order = [] # The indices of the boids in every leaf, one leaf after another
+        stack = [self]
+        while stack:
+            tree = stack.pop()
+            children = tree.children
+            flag = LEAF_BIT if tree.leaf else 0
+            for bit, child in enumerate(children):
+                if child:
+                    flag |= 1 << bit
+            flags.append(flag)
+            counts.append(len(tree.nodes) if tree.leaf else 0)
+            if tree.leaf:
+                order += [boid_indices[node.boid] for node in tree.nodes]
+            stack += [child for child in reversed(children) if child] # So the children come out in order
+
+        return {
+            "flags": np.array(flags, dtype=np.uint8),
+            "counts": np.array(counts, dtype=np.int64),
+            "order": np.array(order, dtype=np.int64),
+            "corners": np.array([self.left, self.top, self.right, self.bottom], dtype=np.float64),
+            "node_sizes": np.array([self.max_nodes, self.min_nodes], dtype=np.int64)
+        }
+    
+    @classmethod
+    def from_layout(cls, layout, boids):
+        """Rebuilds a tree from get_layout, where the boids are the list the indices refer to."""
+
+        flags = iter(layout["flags"].tolist())
+        counts = iter(layout["counts"].tolist())
+        order = layout["order"].tolist()
+        max_nodes, min_nodes = layout["node_sizes"].tolist()
+        left, top, right, bottom = layout["corners"].tolist()
+        next_node = 0
+
+        def build(tree):
+            nonlocal next_node
+            flag = next(flags)
+            count = next(counts)
+            if flag & LEAF_BIT:
+                tree.nodes = [Node(boids[index]) for index in order[next_node:next_node + count]]
+                for node in tree.nodes:
+                    node.leaf = tree
+                    root.handles[node.boid] = node
+                tree.node_count = count
+                next_node += count
+                return
+
+            tree.leaf = False
+            for index in range(4):
+                if flag & (1 << index):
+                    child = tree.new_child(index, [])
+                    tree.set_child(index, child)
+                    build(child)
+                    tree.node_count += child.node_count
+
+        root = cls((left, top), (right, bottom), nodes=[], max_nodes=max_nodes, min_nodes=min_nodes)
+        build(root)
+        return root
+    
     def get_all_leaves(self):
         """Finds all of the leaves' nodes within itself/its children."""
 
@@ -184,7 +395,7 @@ class QuadTree:
             return self.nodes
         else:
             leaves = []
-            for child in self.children.values():
+            for child in self.children:
                 if child:
                     leaves += child.get_all_leaves()
             
@@ -194,133 +405,272 @@ class QuadTree:
         """Finds every node in its children, it makes itself a leaf to hold them, and deletes its children."""
 
         self.nodes = self.get_all_leaves()
+        for node in self.nodes:
+            node.leaf = self
         self.clear_children()
         self.leaf = True
     
     def remove_node(self, n):
-        """Checks the appropriate leaf where the node should be located, then removes it when found."""
-
-        if self.nodes != []:
-            for index, node in enumerate(self.nodes):
-                if node.boid is n.boid:
-                    self.nodes.pop(index)
-                    self.node_count -= 1
-                    return
-            
-            raise RuntimeError("Unable to find boid in tree.")
-        else:
-            child_string = self.find_child_string_for_node(n)
-            child = self.get_child(child_string)
-            if child is None:
-                raise RuntimeError("Unable to find boid in tree.")
-            
-            child.remove_node(n)
-            self.node_count -= 1
-            if child.node_count <= 0: # No nodes left in that child
-                self.set_child(child_string, None) # Remove the child
-            
-            if self.node_count < self.min_nodes:
-                # The combined nodes in its children are less than the minimum, so combine them
-                self.reabsorb()
+        """Removes the node's boid from the tree through its handle, like remove_boid."""
+
+        self.root.remove_boid(n.boid)
     
+    def get_rect(self):
+        """Returns the quad as a pygame Rect."""
+
+        return Rect(self.left, self.top, self.right - self.left, self.bottom - self.top)
+
     def get_possible_nodes(self, check_rect):
-        """Based on a given Rect, find all quads who overlap with that rect, as
-        they may contain nodes within the Rect."""
+        """Based on a given Rect, find the nodes of all leaves that overlap with that rect,
+        as they may contain nodes within the Rect."""
 
-        if self.leaf:
-            return self.nodes
-        else:
-            all_nodes = []
-            for child in self.children.values():
-                if child and check_rect.colliderect(child.rect): # Overlaps
-                    all_nodes += child.get_possible_nodes(check_rect)
-            
-            return all_nodes
+        leaves = []
+        self.find_leaves_near(check_rect.left, check_rect.top, check_rect.right, check_rect.bottom, 0, leaves)
+        return [node for leaf in leaves for node in leaf.nodes]
     
     def find_points_in_radius(self, position, radius):
-        """First finds the possible nodes within a Rect surrounding
-        the circle. Then it checks each node separately to see if it is within the circle."""
+        """Returns the nodes of the boids query_radius finds, in the same order."""
 
-        rect = Rect(position.x - radius, position.y - radius, radius*2, radius*2) # Rect surrounding circle
-        possible_points = self.get_possible_nodes(rect)
+        handles = self.root.handles
+        return [handles[boid] for boid in self.query_radius(position, radius)]
+    
+    def query_radius(self, position, radius, out=None):
+        """Finds all boids within the radius of the position. The quads are walked with a stack kept on the tree instead
+        of recursing, and a quad is skipped unless the circle reaches it, not just the
+        square around the circle. The boids are appended to out after clearing it if it's
+        given, so the same list can be reused for every query instead of making new ones."""
+
+        if out is None:
+            out = []
+        else:
+            out.clear()
+        x, y = position
+        squared_radius = radius * radius
+        min_x, max_x, min_y, max_y = x - radius, x + radius, y - radius, y + radius
+        stack = self.query_stack if self.parent is None else [] # Only the root keeps one
+        stack.append(self)
+        while stack:
+            tree = stack.pop()
+            if tree.leaf:
+                for node in tree.nodes:
+                    dx = node.x - x
+                    dy = node.y - y
+                    if dx * dx + dy * dy <= squared_radius: # Checking the square for computation time
+                        out.append(node.boid)
+                continue
+
+            # Pushed last to first so they come off the stack in order
+            for child in reversed(tree.children):
+                if child is None:
+                    continue
+
+                left, top, right, bottom = child.bounds
+                if left > max_x or right < min_x or top > max_y or bottom < min_y: # Outside the square
+                    continue
+                if (x < left or x > right) and (y < top or y > bottom):
+                    # Off a corner of the quad, so the circle can miss it even though the square doesn't
+                    dx = left - x if x < left else x - right
+                    dy = top - y if y < top else y - bottom
+                    if dx * dx + dy * dy > squared_radius:
+                        continue
+                stack.append(child)
+
+        return out
+
+    def find_leaves_near(self, min_x, min_y, max_x, max_y, radius, out):
+        """Appends every leaf within the radius of the box to out, in the order query_radius visits them."""
+
+        squared_radius = radius * radius
+        stack = self.query_stack if self.parent is None else [] # Only the root keeps one
+        stack.append(self)
+        while stack:
+            tree = stack.pop()
+            if tree.leaf:
+                if tree.nodes:
+                    out.append(tree)
+                continue
+
+            for child in reversed(tree.children):
+                if child is None:
+                    continue
+
+                left, top, right, bottom = child.bounds
+                dx = left - max_x if max_x < left else (min_x - right if min_x > right else 0)
+                dy = top - max_y if max_y < top else (min_y - bottom if min_y > bottom else 0)
+                if dx * dx + dy * dy <= squared_radius:
+                    stack.append(child)
+
+    def query_all(self, radius):
+        """Yields (boid, boids within the radius of it) for every boid in the tree, a leaf
+        at a time. The boids of a leaf are close together, so the leaves near them are found
+        once for the box around all of them, instead of walking down from the root for every
+        boid. Each boid then only checks the nodes of those leaves its circle reaches. The
+        boids come in the same order as query_radius gives them. The same list is refilled
+        for every boid, so it has to be used before the next one is asked for."""
+
+        squared_radius = radius * radius
+        near = []
         in_range = []
-        for node in possible_points: # Check each node separately
-            if position.distance_squared_to(node.boid.position) <= radius**2: # Checking the square for computation time
-                in_range.append(node)
+        leaves = [self]
+        while leaves:
+            leaf = leaves.pop()
+            if not leaf.leaf:
+                leaves += [child for child in reversed(leaf.children) if child is not None]
+                continue
+            if not leaf.nodes:
+                continue
+
+            xs = [node.x for node in leaf.nodes]
+            ys = [node.y for node in leaf.nodes]
+            near.clear()
+            self.find_leaves_near(min(xs), min(ys), max(xs), max(ys), radius, near)
+            for node in leaf.nodes:
+                x = node.x
+                y = node.y
+                in_range.clear()
+                for other_leaf in near:
+                    left, top, right, bottom = other_leaf.bounds
+                    dx = left - x if x < left else (x - right if x > right else 0)
+                    dy = top - y if y < top else (y - bottom if y > bottom else 0)
+                    if dx * dx + dy * dy > squared_radius:
+                        continue
+
+                    for other in other_leaf.nodes:
+                        dx = other.x - x
+                        dy = other.y - y
+                        if dx * dx + dy * dy <= squared_radius:
+                            in_range.append(other.boid)
+                yield node.boid, in_range
+
+    def get_squared_distance(self, position):
+        """Returns the squared distance from the position to the closest point of this quad."""
+
+        # Nodes just past the center go in the quad starting at center + 1, so the quads
+        # are treated as 1 bigger on that side to never overestimate the distance
+        x, y = position
+        if x < self.left - 1:
+            dx = self.left - 1 - x
+        elif x > self.right:
+            dx = x - self.right
+        else:
+            dx = 0
+
+        if y < self.top - 1:
+            dy = self.top - 1 - y
+        elif y > self.bottom:
+            dy = y - self.bottom
+        else:
+            dy = 0
+
+        return dx * dx + dy * dy
+
+    def find_nearest_nodes(self, position, k, radius=None):
+        """Finds the k nodes closest to the position, closest first, by always opening whichever
+        quad or node is closest to the position next. Quads further away than the k-th closest
+        node seen so far are never added. Nodes further away than the radius are left out."""
+
+        bound = math.inf if radius is None else radius * radius # Nothing further than this can be needed
+        heap = [(0, 0, self)] # The count breaks ties so quads and nodes are never compared
+        count = 1
+        closest_seen = [] # The negated distances of the k closest nodes seen so far
+        nearest = []
+        while heap and len(nearest) < k:
+            squared_distance, _, item = heapq.heappop(heap)
+            if squared_distance > bound:
+                break
+            if isinstance(item, Node): # Nothing left in the heap can be closer
+                nearest.append(item)
+            elif item.leaf:
+                for node in item.nodes:
+                    squared_distance = position.distance_squared_to(node.boid.position)
+                    if squared_distance <= bound:
+                        heapq.heappush(heap, (squared_distance, count, node))
+                        count += 1
+                        if len(closest_seen) < k:
+                            heapq.heappush(closest_seen, -squared_distance)
+                        else:
+                            heapq.heapreplace(closest_seen, -squared_distance)
+                        if len(closest_seen) == k:
+                            bound = -closest_seen[0]
+            else:
+                for child in item.children:
+                    if child:
+                        squared_distance = child.get_squared_distance(position)
+                        if squared_distance <= bound:
+                            heapq.heappush(heap, (squared_distance, count, child))
+                            count += 1
         
-        return in_range
+        return nearest
     
-    def get_boids_in_sight(self, boid):
-        """This finds all boids within sight of this boid based on the boids'
-        position and view radius."""
+    def query_nearest(self, position, k, radius):
+        """Finds the k boids closest to the position within the radius, closest first."""
 
-        nodes = self.find_points_in_radius(boid.position,
-                                           max(boid.settings["view distance"]["value"],
-                                            boid.settings["separation distance"]["value"]))
-        return [node.boid for node in nodes] # Return the boids, not the nodes
+        return [node.boid for node in self.find_nearest_nodes(position, k, radius)]
 
     def adjust_boid_position(self, boid, dt):
-        """This will move the boid based on its velocity. It then checks
-        where it used to be in the tree and checks whether it would still
-        stay within that leaf. If not, it is moved."""
+        """This will move the boid based on its velocity. The boid's handle points
+        straight at its node and leaf, so if it stays within that leaf only the node
+        is updated. If not, it is moved with update_node."""
 
-        node = Node(boid) # Make a node based on the old position
+        node = self.handles.get(boid)
+        if node is None:
+            raise RuntimeError("Unable to find boid.")
+        
         boid.position += boid.velocity * dt * 60 # Update its position
+        x, y = boid.position
+        leaf = node.leaf
+        # The same test as contains_point, written out since this runs for every boid
+        if leaf.left <= x <= leaf.right and leaf.top <= y <= leaf.bottom: # Can stay within the leaf
+            node.x = x
+            node.y = y
+            return
+        
         outside_tree_bounds = self.update_node(node)
-        # If a node was returned, the new node climbed so far up the tree trying to find
-        # the correct node that it exited. This means there is no leaf that
-        # can contain it
+        # If the node climbed so far up the tree trying to find a quad that
+        # contains it that it exited the root, there is no leaf that can contain it
         if outside_tree_bounds:
             # Quick dirty fix
             boid.velocity *= -1 # Reverse the velocity
             # Move the boid back within the bounds of the tree
-            boid.position.x = min(max(boid.position.x, self.tl_corner.x + 10), self.br_corner.x - 10)
-            boid.position.y = min(max(boid.position.y, self.tl_corner.y + 10), self.br_corner.y - 10)
-            self.insert_boid(boid)
+            boid.position.x = min(max(boid.position.x, self.left + 10), self.right - 10)
+            boid.position.y = min(max(boid.position.y, self.top + 10), self.bottom - 10)
+            node.x = boid.position.x
+            node.y = boid.position.y
+            self.insert_node(node)
     
     def update_node(self, n):
-        """Find where this node is, check if it can stay in the same leaf.
-        Either update the old node, or move the node to a new leaf."""
-
-        if self.leaf:
-            for node in self.nodes:
-                if node.boid is n.boid: # Found old node
-                    if self.rect.collidepoint(n.boid.position): # Can stay within the leaf
-                        # Update the old node
-                        node.x = n.boid.position.x
-                        node.y = n.boid.position.y
-                        return False # Found a satisfactory leaf
-                    else:
-                        self.nodes.remove(node)
-                        self.node_count -= 1
-                        return n
+        """Moves a node whose boid has left its leaf. It's taken out of the leaf, then climbs
+        up to the lowest quad that contains the boid's new position and is inserted from there,
+        so only that part of the tree is walked. Returns the node if even the root can't hold it."""
+
+        tree = n.leaf
+        tree.nodes.remove(n)
+        tree.node_count -= 1
+        n.x = n.boid.position.x
+        n.y = n.boid.position.y
+        while tree.parent is not None:
+            parent = tree.parent
+            parent.node_count -= 1
+            if tree.node_count <= 0: # The child it was just removed from should be deleted
+                parent.remove_child(tree)
+            tree = parent
             
-            raise RuntimeError("Unable to find boid.")
-        else:
-            child_string = self.find_child_string_for_node(n)
-            child = self.get_child(child_string)
-            if child is None:
-                raise RuntimeError("Unable to find boid.")
-            
-            node = child.update_node(n)
-            if not node: # Node was updated
+            if tree.contains_point(n.x, n.y): # The node fits somewhere within this quad
+                tree.insert_node(n)
                 return False
-            else:
-                # Need to find the correct new leaf
-                self.node_count -= 1
-                if child.node_count <= 0: # The child it was just removed from should be deleted
-                    self.set_child(child_string, None)
-                
-                if self.rect.collidepoint(n.boid.position): # The node fits somewhere within the current node
-                    n.x = n.boid.position.x
-                    n.y = n.boid.position.y
-                    self.insert_node(n)
-                    return False
-                else:
-                    if self.node_count < self.min_nodes: # Update the tree as it goes
-                        self.reabsorb()
-                    
-                    return n
+            elif tree.node_count < tree.min_nodes: # Update the tree as it goes
+                tree.reabsorb()
+        
+        return n
+    
+    def on_setting_changed(self, name, params):
+        """Retunes the tree when the node size settings change, on top of
+        what every SpatialIndex reacts to."""
+
+        if name in ("min per node", "max per node"):
+            self.update_node_size(params.min_per_node, params.max_per_node)
+        else:
+            super().on_setting_changed(name, params)
     
     def update_node_size(self, minimum, maximum):
         """Changes the minimum and maximum node sizes for the tree
@@ -332,19 +682,17 @@ class QuadTree:
             return
         
         # Propogate the change to its children
-        for child in self.children.values():
+        for child in self.children:
             if child:
                 child.update_node_size(minimum, maximum)
     
     def draw_grid(self, screen):
         """For display the node quadrants on the simulation screen."""
 
-        pygame.draw.rect(screen, (255, 255, 255), (self.rect.left,
-                                                   self.rect.top, 
-                                                   self.rect.width + 1,
-                                                   self.rect.height + 1), 1)
+        left, top, width, height = self.get_rect()
+        pygame.draw.rect(screen, (255, 255, 255), (left, top, width + 1, height + 1), 1)
         if not self.leaf:
-            for child in self.children.values():
+            for child in self.children:
                 if child:
                     child.draw_grid(screen)
 
@@ -355,20 +703,21 @@ class QuadTree:
             for node in self.nodes:
                 pygame.draw.circle(screen, node.boid.color, (node.x, node.y), 2)
             
-            pygame.draw.rect(screen, (255, 0, 0), (self.tl_corner, self.br_corner - self.tl_corner + Vector(1, 1)), 1)
+            pygame.draw.rect(screen, (255, 0, 0), (self.left, self.top, self.right - self.left + 1,
+                                                   self.bottom - self.top + 1), 1)
         else:
-            for child in self.children.values():
+            for child in self.children:
                 if child is not None:
                     child.draw(screen)
             
-            pygame.draw.rect(screen, (255, 0, 0), (self.tl_corner, self.br_corner - self.tl_corner + Vector(1, 1)), 1)
+            pygame.draw.rect(screen, (255, 0, 0), (self.left, self.top, self.right - self.left + 1,
+                                                   self.bottom - self.top + 1), 1)
 
 
 if __name__ == "__main__":
     import pygame
     import sys
     from pygame.locals import *
-    from main import create_boids
     import random
 
     screen = pygame.display.set_mode((1280,720))
@@ -384,7 +733,9 @@ if __name__ == "__main__":
                     sys.exit()
                 elif event.key == K_EQUALS:
                     # Add 200 boids to the tree
-                    new_boids = create_boids(1280, 720, tree, 200)
+                    new_boids = [Boid({}, Vector(random.randint(0, 1280), random.randint(0, 720)))
+                                 for _ in range(200)]
+                    tree.insert_boids(new_boids)
                     boids += new_boids
                 elif event.key == K_MINUS and boids:
                     for i in range(min(100, len(boids))):
@@ -64,15 +64,15 @@ class TestQuadTreeMethods(unittest.TestCase):
         self.tree.insert_node(n2)
         self.tree.divide()
         with self.subTest("BR child not created."):
-            child = self.tree.children["br"]
+            child = self.tree.children[qt.BOTTOM_RIGHT]
             self.assertTrue(child and child.nodes == [n1])
         
         with self.subTest("BL child not created."):
-            child = self.tree.children["bl"]
+            child = self.tree.children[qt.BOTTOM_LEFT]
             self.assertTrue(child and child.nodes == [n2])
         
         with self.subTest("TL and TR are not empty."):
-            self.assertFalse(self.tree.children["tl"] or self.tree.children["tr"])
+            self.assertFalse(self.tree.children[qt.TOP_LEFT] or self.tree.children[qt.TOP_RIGHT])
         
         with self.subTest("Root not empty."):
             self.assertTrue(self.tree.nodes == [] and self.tree.node_count == 2)
@@ -84,13 +84,13 @@ class TestQuadTreeMethods(unittest.TestCase):
         self.tree.insert_node(qt.Node(Boid({}, Vector(20, 20))))
         self.tree.insert_node(qt.Node(Boid({}, Vector(-220, 220))))
         with self.subTest("Tree divided too early."):
-            self.assertTrue(not any(self.tree.children.values()) and len(self.tree.nodes) == 3)
+            self.assertTrue(not any(self.tree.children) and len(self.tree.nodes) == 3)
         
         self.tree.insert_node(qt.Node(Boid({}, Vector(220, -220))))
         with self.subTest("Tree did not divide."):
             self.assertTrue(
                 self.tree.nodes == [] and\
-                any(self.tree.children.values()) and\
+                any(self.tree.children) and\
                 self.tree.node_count == 4
             )
         
@@ -102,7 +102,7 @@ class TestQuadTreeMethods(unittest.TestCase):
         self.tree.insert_node(qt.Node(Boid({}, Vector(10, -10))))
         self.tree.insert_node(qt.Node(Boid({}, Vector(-10, -10))))
         self.tree.insert_node(qt.Node(Boid({}, Vector(100, 100))))
-        self.assertEqual(self.tree.children["br"].node_count, 2)
+        self.assertEqual(self.tree.children[qt.BOTTOM_RIGHT].node_count, 2)
     
     def test_6_quad_reabsorb(self):
         """Test that reabsorbing nodes from children works."""
@@ -112,13 +112,13 @@ class TestQuadTreeMethods(unittest.TestCase):
         self.tree.insert_node(qt.Node(Boid({}, Vector(10, -10))))
         self.tree.insert_node(qt.Node(Boid({}, Vector(-10, -10))))
         with self.subTest("Did not create child."):
-            self.assertTrue(self.tree.children["br"].node_count == 2 and self.tree.nodes == [])
+            self.assertTrue(self.tree.children[qt.BOTTOM_RIGHT].node_count == 2 and self.tree.nodes == [])
 
         self.tree.reabsorb()        
         with self.subTest("Nodes were not reabsorbed."):
             self.assertTrue(
                 len(self.tree.nodes) == 4 and\
-                not any(self.tree.children.values())
+                not any(self.tree.children)
             )
     
     def test_7_quad_remove_node(self):
@@ -150,7 +150,7 @@ class TestQuadTreeMethods(unittest.TestCase):
             self.assertTrue(
                 self.tree.node_count == 0 and\
                 self.tree.nodes == [] and\
-                not any(self.tree.children.values())
+                not any(self.tree.children)
             )
     
     def test_8_quad_possible_nodes(self):
@@ -184,6 +184,160 @@ class TestQuadTreeMethods(unittest.TestCase):
                         n3 not in nodes_in_sight,
                         "Incorrect nodes in sight.")
 
+    def test_10_quad_nearest(self):
+        """Check that the nearest nodes are found closest first and the radius is respected."""
+
+        nodes = [qt.Node(Boid({}, Vector(x * 37 % 400 - 200, x * 91 % 400 - 200))) for x in range(60)]
+        for node in nodes:
+            self.tree.insert_node(node)
+        
+        position = Vector(13, -7)
+        by_distance = sorted(nodes, key=lambda node: position.distance_squared_to(node.boid.position))
+        with self.subTest("Wrong nearest nodes."):
+            self.assertEqual(self.tree.find_nearest_nodes(position, 8), by_distance[:8])
+
+        radius = position.distance_to(by_distance[3].boid.position)
+        with self.subTest("Nodes outside radius."):
+            self.assertEqual(self.tree.find_nearest_nodes(position, 8, radius), by_distance[:4])
+
+    def test_11_quad_layout(self):
+        """Check that a tree rebuilt from its layout holds the same boids in the same quads."""
+
+        boids = [Boid({}, Vector(x * 37 % 400 - 200, x * 91 % 400 - 200)) for x in range(60)]
+        for boid in boids:
+            self.tree.insert_node(qt.Node(boid))
+        
+        layout = self.tree.get_layout({boid: index for index, boid in enumerate(boids)})
+        rebuilt = qt.QuadTree.from_layout(layout, boids)
+        with self.subTest("Different layout."):
+            rebuilt_layout = rebuilt.get_layout({boid: index for index, boid in enumerate(boids)})
+            for name in layout:
+                self.assertEqual(layout[name].tolist(), rebuilt_layout[name].tolist())
+        
+        with self.subTest("Different boids in radius."):
+            for position in (Vector(0, 0), Vector(-150, 120)):
+                self.assertEqual([node.boid for node in self.tree.find_points_in_radius(position, 100)],
+                                 [node.boid for node in rebuilt.find_points_in_radius(position, 100)])
+
+
+    def test_12_quad_bulk(self):
+        """Check that inserting and removing boids in bulk gives the same tree as one at a time."""
+
+        boids = [Boid({}, Vector(x * 37 % 400 - 200, x * 91 % 400 - 200)) for x in range(300)]
+        indices = {boid: index for index, boid in enumerate(boids)}
+        single = qt.QuadTree(Vector(-1000, -1000), Vector(1000, 1000), nodes=[], max_nodes=3, min_nodes=2)
+        bulk = qt.QuadTree(Vector(-1000, -1000), Vector(1000, 1000), nodes=[], max_nodes=3, min_nodes=2)
+        for boid in boids:
+            single.insert_boid(boid)
+        bulk.insert_boids(boids)
+        for removed in ([], boids[::3], boids[1::3]):
+            for boid in removed:
+                single.remove_boid(boid)
+            bulk.remove_boids(removed)
+            with self.subTest("Different trees.", removed=len(removed)):
+                single_layout = single.get_layout(indices)
+                bulk_layout = bulk.get_layout(indices)
+                self.assertEqual(single_layout["flags"].tolist(), bulk_layout["flags"].tolist())
+                self.assertEqual(single_layout["counts"].tolist(), bulk_layout["counts"].tolist())
+                self.assertEqual(sorted(single_layout["order"].tolist()), sorted(bulk_layout["order"].tolist()))
+                self.assertEqual(single.node_count, bulk.node_count)
+        
+        with self.subTest("Missing boid removed."):
+            self.assertRaises(RuntimeError, bulk.remove_boids, boids[:1])
+
+    def test_13_quad_handles(self):
+        """Check that every boid's handle points at its node in the leaf holding it as the boids move."""
+
+        boids = [Boid({}, Vector(x * 37 % 400 - 200, x * 91 % 400 - 200), Vector(x % 7 - 3, x % 5 - 2) * 10)
+                 for x in range(100)]
+        for boid in boids:
+            self.tree.insert_boid(boid)
+        for step in range(20):
+            for boid in boids:
+                self.tree.adjust_boid_position(boid, 1 / 60)
+            if step == 10:
+                for boid in boids[:30]:
+                    self.tree.remove_boid(boid)
+                boids = boids[30:]
+        
+        self.assertEqual(len(self.tree.handles), len(boids))
+        for boid in boids:
+            node = self.tree.handles[boid]
+            with self.subTest("Wrong handle."):
+                self.assertTrue(node.leaf.leaf and node in node.leaf.nodes)
+                self.assertTrue(node.leaf.node_within_bounds(node))
+                self.assertEqual((node.x, node.y), tuple(boid.position))
+        
+        with self.subTest("Missing boid removed."):
+            self.assertRaises(RuntimeError, self.tree.remove_boid, Boid({}, Vector(0, 0)))
+
+    def test_14_quad_query_radius(self):
+        """Check that radius queries find exactly the boids within the radius and reuse the given list."""
+
+        boids = [Boid({}, Vector(x * 37 % 400 - 200.5, x * 91 % 400 - 199.5)) for x in range(200)]
+        for boid in boids:
+            self.tree.insert_boid(boid)
+
+        out = []
+        for position, radius in ((Vector(0, 0), 50), (Vector(-150.3, 120.7), 33.3), (Vector(190, -190), 120)):
+            expected = [boid for boid in boids if position.distance_squared_to(boid.position) <= radius * radius]
+            found = self.tree.query_radius(position, radius, out)
+            with self.subTest("Wrong boids.", position=position, radius=radius):
+                self.assertIs(found, out)
+                self.assertEqual(sorted(map(id, found)), sorted(map(id, expected)))
+            with self.subTest("Different order.", position=position, radius=radius):
+                nodes = [node.boid for node in self.tree.find_points_in_radius(position, radius)]
+                self.assertEqual([boid for boid in found if boid in nodes], nodes)
+
+    def test_15_quad_query_all(self):
+        """Check that finding every boid's neighbors a leaf at a time gives the same lists as one query each."""
+
+        boids = [Boid({}, Vector(x * 37 % 400 - 200.5, x * 91 % 400 - 199.5)) for x in range(200)]
+        for boid in boids:
+            self.tree.insert_boid(boid)
+
+        for radius in (0, 40, 150):
+            batched = {boid: list(found) for boid, found in self.tree.query_all(radius)}
+            with self.subTest(radius=radius):
+                self.assertEqual(batched, {boid: self.tree.query_radius(boid.position, radius) for boid in boids})
+
+    def test_16_quad_bulk_remove(self):
+        """Check that removing boids in bulk leaves exactly the tree removing them one at a time does."""
+
+        def get_counts(tree):
+            # The node count of every quad, depth first
+            counts = [tree.node_count]
+            for child in tree.children:
+                if child is not None:
+                    counts += get_counts(child)
+            return counts
+
+        boids = [Boid({}, Vector(x * 37 % 400 - 200, x * 91 % 400 - 200)) for x in range(400)]
+        indices = {boid: index for index, boid in enumerate(boids)}
+        for min_nodes, max_nodes in ((2, 3), (6, 10)):
+            single = qt.QuadTree(Vector(-1000, -1000), Vector(1000, 1000), max_nodes=max_nodes, min_nodes=min_nodes)
+            bulk = qt.QuadTree(Vector(-1000, -1000), Vector(1000, 1000), max_nodes=max_nodes, min_nodes=min_nodes)
+            single.insert_boids(boids)
+            bulk.insert_boids(boids)
+            rest = [boid for index, boid in enumerate(boids) if index % 10]
+            for removed in (boids[::10], rest[:180], rest[180:350], rest[350:]):
+                for boid in removed:
+                    single.remove_boid(boid)
+                bulk.remove_boids(removed)
+                with self.subTest("Different trees.", min_nodes=min_nodes, removed=len(removed)):
+                    single_layout = single.get_layout(indices)
+                    bulk_layout = bulk.get_layout(indices)
+                    for name in ("flags", "counts", "order"):
+                        self.assertEqual(single_layout[name].tolist(), bulk_layout[name].tolist())
+                    self.assertEqual(get_counts(single), get_counts(bulk))
+                with self.subTest("Wrong handles.", min_nodes=min_nodes, removed=len(removed)):
+                    self.assertEqual(single.handles.keys(), bulk.handles.keys())
+                    for node in bulk.handles.values():
+                        self.assertTrue(node.leaf.leaf and node in node.leaf.nodes)
+
+        with self.subTest("Boid removed twice."):
+            bulk.insert_boids(boids[:5])
+            self.assertRaises(RuntimeError, bulk.remove_boids, boids[:1] * 2)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,70 @@
+import unittest
+import contextlib
+import io
+import os
+import tempfile
+from unittest import mock
+import numpy as np
+from boids import engine
+from boids import checkpoint
+from boids import run
+
+
+class TestRunMethods(unittest.TestCase):
+    def setUp(self):
+        """Sets up a folder for the checkpoints before every test."""
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_1_headless_restore(self):
+        """Test that a headless run stopped partway checkpoints the last step it finished,
+        and that continuing from it matches a run that was never stopped."""
+
+        path = os.path.join(self.directory.name, "state.npz")
+        area = ["--width", "400", "--height", "300"] # Not saved in the checkpoint
+        arguments = ["--boids", "100", "--seed", "1"] + area
+        calls = []
+
+        def interrupted_step(*step_arguments):
+            if len(calls) == 3:
+                raise KeyboardInterrupt
+            calls.append(None)
+            engine.step(*step_arguments)
+
+        with mock.patch("boids.run.step", interrupted_step), contextlib.redirect_stdout(io.StringIO()):
+            with self.assertRaises(KeyboardInterrupt):
+                run.main(arguments + ["--steps", "10", "--checkpoint", path])
+        with self.subTest("Wrong step saved."):
+            self.assertEqual(checkpoint.load(path)["step"], 3)
+
+        dump = os.path.join(self.directory.name, "final.npz")
+        expected = os.path.join(self.directory.name, "expected.npz")
+        with contextlib.redirect_stdout(io.StringIO()):
+            run.main(area + ["--restore", path, "--steps", "4", "--checkpoint", path, "--dump", dump])
+            run.main(arguments + ["--steps", "7", "--dump", expected])
+        with self.subTest("Wrong step saved after restoring."):
+            self.assertEqual(checkpoint.load(path)["step"], 7)
+        with np.load(dump) as restored, np.load(expected) as uninterrupted:
+            with self.subTest("Stepped differently after restoring."):
+                self.assertTrue(np.array_equal(restored["positions"], uninterrupted["positions"]))
+                self.assertTrue(np.array_equal(restored["velocities"], uninterrupted["velocities"]))
+
+    def test_2_headless_arguments(self):
+        """Test that the headless runner rejects unknown settings, values outside the sidebar's ranges,
+        --boids with --restore and --workers with --jit."""
+
+        for arguments in (["--set", "view distanse=60"], ["--set", "view distance=-1"], ["--boids", "-5"],
+                          ["--boids", "5001"], ["--boids", "1.5"], ["--boids", "10", "--restore", "state.npz"],
+                          ["--jit", "--workers", "2"]):
+            with self.subTest(arguments=arguments), contextlib.redirect_stderr(io.StringIO()):
+                with self.assertRaises(SystemExit):
+                    run.main(arguments)
+
+        with self.subTest("Setting not changed."), contextlib.redirect_stdout(io.StringIO()) as out:
+            run.main(["--set", "view_distance=60", "--set", "boids=5", "--steps", "1"])
+            self.assertTrue(out.getvalue().startswith("5 boids"))
+
+
+if __name__ == "__main__":
+    unittest.main()
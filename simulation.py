@@ -1,107 +1,183 @@
 from pygame.math import Vector2 as Vector
-from main import create_boids
-
-
-def get_necessary_settings(settings):
-    """Helps to get the values of all of the many settings."""
-
-    find_keys = [
-        "view distance",
-        "separation distance",
-        "centering factor",
-        "matching factor",
-        "avoid factor",
-        "avoid zone factor",
-        "turn factor",
-        "minimum speed",
-        "maximum speed"
-    ]
-    values = []
-    for key in find_keys:
-        values.append(settings[key]["value"])
+from boids.flock import Flock
+from boids import engine
+from spatial_index import get_nearest
+
+
+def steer_boid(boid, boids_in_sight, values, zones, active_area):
+    """Calculates the boid's new velocity from the boids it can see, without changing the boid.
+    The values are in the order returned by SimulationParams.steering_values."""
+
+    # The neighbor count only decides which boids are passed in as the boids in sight
+    view_distance, separation_distance, centering_factor, \
+        matching_factor, avoid_factor, avoid_zone_factor, turn_factor, \
+        min_speed, max_speed, neighbor_count = values
+    avoid_vector = Vector(0, 0)
+    neighboring_boids = 0
+    average_pos = Vector(0, 0)
+    average_vel = Vector(0, 0)
+    avoid_zone_vector = Vector(0, 0)
+    velocity = boid.velocity
+    
+    for other in boids_in_sight:
+        if other is not boid: # It's not itself
+            distance_to_other = boid.position - other.position                
+            squared_distance = distance_to_other.x * distance_to_other.x + distance_to_other.y * distance_to_other.y
+            # Testing squared distances because it's faster than using sqrt
+            if squared_distance < separation_distance * separation_distance:  # Is too close and needs to steer away
+                avoid_vector += distance_to_other # Adding all the close boids results in the vector pointing away from all
+            elif squared_distance < view_distance * view_distance:  # Not too close, but still in view
+                average_pos += other.position
+                average_vel += other.velocity
+                neighboring_boids += 1
+    
+    for zone in zones:
+        distance_to_other = boid.position - zone.position                
+        squared_distance = distance_to_other.x * distance_to_other.x + distance_to_other.y * distance_to_other.y
+        # Check if within radius of nogozone
+        if squared_distance < zone.radius * zone.radius:  # Is too close and needs to steer away
+            avoid_zone_vector += distance_to_other # Average all zones within range
+    
+    if neighboring_boids > 0:
+        # Try to match surrounding boids
+        position_average = average_pos / neighboring_boids
+        velocity_average = average_vel / neighboring_boids
+
+        # The settings decide whether the boid prioritizes positioning in the middle, or pointing the same way
+        velocity = (velocity +
+                        (position_average - boid.position) * centering_factor +
+                        (velocity_average - velocity) * matching_factor)
     
-    return values
+    # Push away from avoidences (these make a new vector, so the boid's velocity isn't changed below)
+    velocity = velocity + (avoid_vector * avoid_factor)
+    velocity = velocity + (avoid_zone_vector * avoid_zone_factor)
+
+    speed = velocity.length()
+    if speed == 0:
+        # Don't want a vector of 0
+        speed = 0.0001
+    
+    # Clamp speed
+    if speed > max_speed:
+        velocity.x = (velocity.x / speed) * max_speed
+        velocity.y = (velocity.y / speed) * max_speed
+    if speed < min_speed:
+        velocity.x = (velocity.x / speed) * min_speed
+        velocity.y = (velocity.y / speed) * min_speed
+
+    margin_pos_x, margin_pos_y = active_area[0]
+    arena_width, arena_height = active_area[1]
+    # Turn around when outside active area
+    if boid.position.y < margin_pos_y:
+        velocity.y += turn_factor
+    if boid.position.x < margin_pos_x:
+        velocity.x += turn_factor
+    if boid.position.y > margin_pos_y + arena_height:
+        velocity.y -= turn_factor
+    if boid.position.x > margin_pos_x + arena_width:
+        velocity.x -= turn_factor
+    
+    return velocity
+
+def simulate(boids, active_area, params, tree, zones, dt, stepper=None, synchronous=False, neighbors=None,
+             timer=None):
+    """Simulates the movement of the boids based on the SimulationParams.
+    The tree can be any SpatialIndex the boids are stored in.
+    The boids can either be a list of Boid objects or a Flock of arrays,
+    in which case the vectorized engine is used and the tree is not needed.
+    A Flock can also be given a stepper, such as a ParallelStepper, to step it instead.
+
+    Normally each boid is moved as soon as its velocity is found, so boids later in the
+    list see some neighbors that already moved this frame. When synchronous, every
+    velocity is found from the state at the start of the frame before any boid moves,
+    so the result doesn't depend on the order of the boids. A Flock is always synchronous.
+    That also lets the index find every boid's neighbors at once with query_all.
+
+    Neighbors can be a NeighborList, so the boids are found in its cached lists
+    instead of querying the tree for every boid every frame. When the neighbor count
+    setting is above 0, each boid only reacts to that many of the closest boids it can see.
 
-def simulate(boids, active_area, settings, tree, zones, dt):
-    """Simulates the movement of the boids based on the settings."""
+    A FrameTimer can be given to time the neighbor queries, steering forces and tree updates.
+    A Flock finds its neighbors and steering together, so its whole step counts as forces."""
+
+    if isinstance(boids, Flock):
+        step = stepper.step if stepper else engine.step
+        if timer is not None:
+            step = timer.wrap("forces", step)
+        step(boids, active_area, params, zones, dt)
+        return 0 # Boids in a Flock are never outside of a tree
 
     reinsert = 0
+    # Read the settings once per frame rather than once per boid
+    values = params.steering_values()
+    sight_radius = params.sight_radius
 
-    for boid in boids:
-        avoid_vector = Vector(0, 0)
-        neighboring_boids = 0
-        average_pos = Vector(0, 0)
-        average_vel = Vector(0, 0)
-        avoid_zone_vector = Vector(0, 0)
-        view_distance, separation_distance, centering_factor, \
-            matching_factor, avoid_factor, avoid_zone_factor, turn_factor, \
-            min_speed, max_speed = get_necessary_settings(settings)
-        
-        boids_in_sight = tree.get_boids_in_sight(boid)
-        for other in boids_in_sight:
-            if other is not boid: # It's not itself
-                distance_to_other = boid.position - other.position                
-                squared_distance = distance_to_other.x * distance_to_other.x + distance_to_other.y * distance_to_other.y
-                # Testing squared distances because it's faster than using sqrt
-                if squared_distance < separation_distance * separation_distance:  # Is too close and needs to steer away
-                    avoid_vector += distance_to_other # Adding all the close boids results in the vector pointing away from all
-                elif squared_distance < view_distance * view_distance:  # Not too close, but still in view
-                    average_pos += other.position
-                    average_vel += other.velocity
-                    neighboring_boids += 1
-        
-        for zone in zones:
-            distance_to_other = boid.position - zone.position                
-            squared_distance = distance_to_other.x * distance_to_other.x + distance_to_other.y * distance_to_other.y
-            # Check if within radius of nogozone
-            if squared_distance < zone.radius * zone.radius:  # Is too close and needs to steer away
-                avoid_zone_vector += distance_to_other # Average all zones within range
-        
-        if neighboring_boids > 0:
-            # Try to match surrounding boids
-            position_average = average_pos / neighboring_boids
-            velocity_average = average_vel / neighboring_boids
-
-            # The settings decide whether the boid prioritizes positioning in the middle, or pointing the same way
-            boid.velocity = (boid.velocity +
-                                (position_average - boid.position) * centering_factor +
-                                (velocity_average - boid.velocity) * matching_factor)
-        
-        # Push away from avoidences
-        boid.velocity = boid.velocity + (avoid_vector * avoid_factor)
-        boid.velocity = boid.velocity + (avoid_zone_vector * avoid_zone_factor)
-
-        speed = boid.velocity.length()
-        if speed == 0:
-            # Don't want a vector of 0
-            speed = 0.0001
-        
-        # Clamp speed
-        if speed > max_speed:
-            boid.velocity.x = (boid.velocity.x / speed) * max_speed
-            boid.velocity.y = (boid.velocity.y / speed) * max_speed
-        if speed < min_speed:
-            boid.velocity.x = (boid.velocity.x / speed) * min_speed
-            boid.velocity.y = (boid.velocity.y / speed) * min_speed
-
-        margin_pos_x, margin_pos_y = active_area[0]
-        arena_width, arena_height = active_area[1]
-        # Turn around when outside active area
-        if boid.position.y < margin_pos_y:
-            boid.velocity.y += turn_factor
-        if boid.position.x < margin_pos_x:
-            boid.velocity.x += turn_factor
-        if boid.position.y > margin_pos_y + arena_height:
-            boid.velocity.y -= turn_factor
-        if boid.position.x > margin_pos_x + arena_width:
-            boid.velocity.x -= turn_factor
+    neighbor_count = params.neighbor_count
+    if neighbors is not None:
+        # When not synchronous, boids can move up to a step further before the last ones are queried
+        max_step = 0 if synchronous else (params.maximum_speed + 2 * params.turn_factor) * dt * 60
+        update = neighbors.update if timer is None else timer.wrap("queries", neighbors.update)
+        update(boids, tree, sight_radius, max_step)
+
+    in_sight = [] # Refilled by every query, since each boid's neighbors are used before the next query
+
+    def find_neighbors(boid):
+        """Returns the boids this boid reacts to. steer_boid checks the exact distances."""
+
+        # With a neighbor count, look for one more since the boid finds itself
+        if neighbors is not None:
+            candidates = neighbors.get_candidates(boid)
+            if neighbor_count:
+                return get_nearest(candidates, boid.position, neighbor_count + 1, sight_radius)
+            return candidates
         
+        if neighbor_count:
+            return tree.query_nearest(boid.position, neighbor_count + 1, sight_radius)
+        return tree.query_radius(boid.position, sight_radius, in_sight)
+
+    steer = steer_boid
+    adjust_position = tree.adjust_boid_position
+    if timer is not None and timer.enabled:
+        find_neighbors = timer.wrap("queries", find_neighbors)
+        steer = timer.wrap("forces", steer)
+        adjust_position = timer.wrap("tree updates", adjust_position)
+
+    if synchronous and neighbors is None and not neighbor_count:
+        # Nothing moves until every boid is steered, so the index can find every boid's neighbors in one pass
+        batches = tree.query_all(sight_radius)
+        next_batch = next
+        if timer is not None and timer.enabled:
+            next_batch = timer.wrap("queries", next)
+        next_velocities = {}
+        batch = next_batch(batches, None)
+        while batch is not None:
+            boid, boids_in_sight = batch
+            next_velocities[boid] = steer(boid, boids_in_sight, values, zones, active_area)
+            batch = next_batch(batches, None)
+        moving = [(boid, next_velocities[boid]) for boid in boids]
+    elif synchronous:
+        # Read only from the current state and write into the next velocities
+        next_velocities = [steer(boid, find_neighbors(boid), values, zones, active_area) for boid in boids]
+        moving = list(zip(boids, next_velocities))
+    else:
+        moving = boids
+
+    for item in moving:
+        if synchronous:
+            boid, velocity = item
+        else:
+            boid = item
+            velocity = steer(boid, find_neighbors(boid), values, zones, active_area)
+
+        boid.velocity = velocity # Swap in the next state
 
         try:
-            tree.adjust_boid_position(boid, dt)
+            adjust_position(boid, dt)
         except RuntimeError:
             # Boid managed to get outside of tree bounds
             boids.remove(boid)
+            if neighbors is not None:
+                neighbors.remove(boid)
             reinsert += 1 # Tell it to create a new boid somewhere to make up for it
     
-    return reinsert
\ No newline at end of file
+    return reinsert
@@ -0,0 +1,125 @@
+import math
+import pygame
+from spatial_index import SpatialIndex
+
+
+class SpatialHashGrid(SpatialIndex):
+    """A uniform grid of square cells stored in a dict by cell coordinates.
+    When the cell size is the query radius, every query only needs to look
+    through the 9 cells around the position."""
+
+    def __init__(self, cell_size):
+        self.sight_radius = cell_size
+        self.cell_size = max(cell_size, 1) # A cell size of 0 would put every boid in its own cell
+        self.cells = {} # Maps (column, row) to a dict of the boids inside used as an ordered set
+        self.boid_cells = {} # Maps each boid to the key of the cell it's in
+
+    def __len__(self):
+        return len(self.boid_cells)
+
+    def get_cell_key(self, x, y):
+        """Returns the (column, row) of the cell that contains the point."""
+
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def insert_boid(self, boid):
+        """Places the boid in the cell containing its position."""
+
+        key = self.get_cell_key(boid.position.x, boid.position.y)
+        self.boid_cells[boid] = key
+        self.cells.setdefault(key, {})[boid] = None
+
+    def remove_boid(self, boid):
+        """Removes the boid from the cell it was last placed in."""
+
+        try:
+            key = self.boid_cells.pop(boid)
+        except KeyError:
+            raise RuntimeError("Unable to find boid in grid.")
+
+        cell = self.cells[key]
+        del cell[boid]
+        if not cell: # Don't keep empty cells around
+            del self.cells[key]
+
+    def adjust_boid_position(self, boid, dt):
+        """This will move the boid based on its velocity, then move it to a
+        different cell only if it crossed a cell border."""
+
+        boid.position += boid.velocity * dt * 60 # Update its position
+        key = self.get_cell_key(boid.position.x, boid.position.y)
+        if key != self.boid_cells[boid]:
+            self.remove_boid(boid)
+            self.boid_cells[boid] = key
+            self.cells.setdefault(key, {})[boid] = None
+
+    def query_radius(self, position, radius, out=None):
+        """Checks every boid in the cells that overlap the square around the
+        circle and returns the ones that are within the circle, in out if it's given."""
+
+        min_column, min_row = self.get_cell_key(position.x - radius, position.y - radius)
+        max_column, max_row = self.get_cell_key(position.x + radius, position.y + radius)
+        squared_radius = radius * radius
+        in_range = [] if out is None else out
+        in_range.clear()
+        for column in range(min_column, max_column + 1):
+            for row in range(min_row, max_row + 1):
+                cell = self.cells.get((column, row))
+                if cell is None:
+                    continue
+
+                for boid in cell:
+                    dx = boid.position.x - position.x
+                    dy = boid.position.y - position.y
+                    if dx * dx + dy * dy <= squared_radius: # Checking the square for computation time
+                        in_range.append(boid)
+
+        return in_range
+
+    def query_all(self, radius):
+        """Yields (boid, boids within the radius of it) for every boid, a cell at a time.
+        The boids of a cell share the cells around it, so those are only looked up once.
+        The same list is refilled for every boid, so it has to be used before the next one."""
+
+        span = math.ceil(radius / self.cell_size) # Cells away from a boid's cell that it can reach
+        squared_radius = radius * radius
+        in_range = []
+        for (column, row), cell in self.cells.items():
+            near = [self.cells[key] for key in ((column + dx, row + dy) for dx in range(-span, span + 1)
+                                                for dy in range(-span, span + 1)) if key in self.cells]
+            for boid in cell:
+                x, y = boid.position
+                in_range.clear()
+                for other_cell in near:
+                    for other in other_cell:
+                        dx = other.position.x - x
+                        dy = other.position.y - y
+                        if dx * dx + dy * dy <= squared_radius:
+                            in_range.append(other)
+                yield boid, in_range
+
+    def update_radius(self, radius):
+        """Rebuilds the grid with a new cell size so queries of the
+        new radius still only look at 9 cells."""
+
+        self.sight_radius = radius
+        cell_size = max(radius, 1)
+        if cell_size == self.cell_size:
+            return
+
+        boids = list(self.boid_cells)
+        self.cell_size = cell_size
+        self.cells = {}
+        self.boid_cells = {}
+        for boid in boids:
+            self.insert_boid(boid)
+
+    def draw_grid(self, screen):
+        """For displaying the cells that currently contain boids."""
+
+        size = math.ceil(self.cell_size)
+        for column, row in self.cells:
+            pygame.draw.rect(screen, (255, 255, 255), (column * self.cell_size,
+                                                       row * self.cell_size,
+                                                       size + 1,
+                                                       size + 1), 1)
@@ -0,0 +1,85 @@
+import unittest
+import random
+from spatial_hash import SpatialHashGrid
+from pygame.math import Vector2 as Vector
+from boid import Boid
+
+
+class TestSpatialHashGridMethods(unittest.TestCase):
+    def setUp(self):
+        """Sets up a grid holding random boids before every test."""
+
+        random.seed(2)
+        self.grid = SpatialHashGrid(50)
+        self.boids = []
+        for _ in range(200):
+            boid = Boid({}, Vector(random.uniform(-300, 300), random.uniform(-300, 300)),
+                        Vector(random.uniform(-5, 5), random.uniform(-5, 5)))
+            self.grid.insert_boid(boid)
+            self.boids.append(boid)
+
+    def assertSameQueries(self, radius):
+        """Checks the grid finds the same boids around every boid as checking every boid,
+        and that finding them all at once gives the same lists."""
+
+        for boid in self.boids:
+            found = self.grid.query_radius(boid.position, radius)
+            expected = [other for other in self.boids if boid.position.distance_squared_to(other.position) <= radius**2]
+            self.assertEqual(set(map(id, found)), set(map(id, expected)))
+
+        batched = {boid: list(found) for boid, found in self.grid.query_all(radius)}
+        self.assertEqual(batched, {boid: self.grid.query_radius(boid.position, radius) for boid in self.boids})
+
+    def test_1_insert(self):
+        """Test that boids are placed in the cell containing them."""
+
+        boid = Boid({}, Vector(-10, 75))
+        self.grid.insert_boid(boid)
+        with self.subTest("Boid in wrong cell."):
+            self.assertEqual(self.grid.boid_cells[boid], (-1, 1))
+
+        with self.subTest("Boid not in cell."):
+            self.assertIn(boid, self.grid.cells[(-1, 1)])
+
+    def test_2_query(self):
+        """Test that radius queries are correct, including radii larger than a cell."""
+
+        self.assertSameQueries(50)
+        self.assertSameQueries(120)
+
+    def test_3_move(self):
+        """Test that moved boids are still found after crossing cell borders."""
+
+        for _ in range(5):
+            for boid in self.boids:
+                self.grid.adjust_boid_position(boid, 1 / 60)
+
+        self.assertSameQueries(50)
+
+    def test_4_remove(self):
+        """Test that removing boids removes them and empties their cells."""
+
+        for boid in self.boids:
+            self.grid.remove_boid(boid)
+
+        with self.subTest("Grid not empty."):
+            self.assertTrue(len(self.grid) == 0 and self.grid.cells == {})
+
+        with self.subTest("No error thrown when removing non-existent boid."):
+            self.assertRaises(RuntimeError, self.grid.remove_boid, self.boids[0])
+
+    def test_5_update_radius(self):
+        """Test that changing the cell size keeps every boid."""
+
+        self.grid.update_radius(20)
+        with self.subTest("Cell size not changed."):
+            self.assertEqual(self.grid.cell_size, 20)
+
+        with self.subTest("Lost boids when rebuilding."):
+            self.assertEqual(len(self.grid), len(self.boids))
+
+        self.assertSameQueries(20)
+
+
+if __name__ == "__main__":
+    unittest.main()
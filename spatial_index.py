@@ -0,0 +1,84 @@
+import heapq
+
+
+class SpatialIndex:
+    """The operations the simulation needs from a structure that stores boids by
+    their position. QuadTree and SpatialHashGrid both implement this."""
+
+    __slots__ = () # So an index can use slots
+    sight_radius = 0 # The radius get_boids_in_sight looks within, set through update_radius
+
+    def insert_boid(self, boid):
+        """Adds the boid to the index at its current position."""
+
+        raise NotImplementedError
+
+    def remove_boid(self, boid):
+        """Removes the boid from the index."""
+
+        raise NotImplementedError
+
+    def insert_boids(self, boids):
+        """Adds many boids at once. Indexes that can do better than inserting one at a time override this."""
+
+        for boid in boids:
+            self.insert_boid(boid)
+
+    def remove_boids(self, boids):
+        """Removes many boids at once. Indexes that can do better than removing one at a time override this."""
+
+        for boid in boids:
+            self.remove_boid(boid)
+
+    def adjust_boid_position(self, boid, dt):
+        """Moves the boid based on its velocity and updates where it is stored."""
+
+        raise NotImplementedError
+
+    def query_radius(self, position, radius, out=None):
+        """Returns every boid within the radius of the position. If out is given,
+        it is cleared and filled with the boids instead of making a new list."""
+
+        raise NotImplementedError
+
+    def query_all(self, radius):
+        """Yields (boid, boids within the radius of it) for every boid in the index.
+        The list may be refilled for the next boid, so it has to be used first."""
+
+        raise NotImplementedError
+
+    def query_nearest(self, position, k, radius):
+        """Returns the k boids closest to the position within the radius, closest first."""
+
+        return get_nearest(self.query_radius(position, radius), position, k, radius)
+
+    def update_radius(self, radius):
+        """Called when the largest radius that will be queried changes,
+        so the index can adapt to it."""
+
+        self.sight_radius = radius
+
+    def on_setting_changed(self, name, params):
+        """A SimulationParams listener that only reacts to the settings the index depends on."""
+
+        if name in ("view distance", "separation distance"):
+            self.update_radius(params.sight_radius)
+
+    def get_boids_in_sight(self, boid):
+        """This finds all boids within sight of this boid based on the boid's
+        position and the index's sight radius."""
+
+        return self.query_radius(boid.position, self.sight_radius)
+
+    def draw_grid(self, screen):
+        """For displaying how the index divides up the simulation screen."""
+
+        pass
+
+
+def get_nearest(boids, position, k, radius):
+    """Returns the k boids closest to the position within the radius, closest first."""
+
+    squared_radius = radius * radius
+    in_range = [boid for boid in boids if position.distance_squared_to(boid.position) <= squared_radius]
+    return heapq.nsmallest(k, in_range, key=lambda boid: position.distance_squared_to(boid.position))
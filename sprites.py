@@ -0,0 +1,114 @@
+import math
+import pygame
+import numpy as np
+from pygame.math import Vector2 as Vector
+
+
+class BoidSprites:
+    """Pre-renders the boid triangle pointing in a number of evenly spaced headings,
+    so drawing a boid is only picking the sprite closest to its heading and blitting it.
+    The sprites of each color are kept until the boid size changes."""
+
+    def __init__(self, headings=64):
+        self.headings = headings
+        self.size = None
+        self.half = 0 # Distance from the corner of a sprite to its center
+        self.atlas = {} # Maps colors to their list of sprites, one for each heading
+
+    def set_size(self, size):
+        """Throws away the sprites if the boids are now a different size."""
+
+        if size != self.size:
+            self.size = size
+            # The back corners are the farthest points from the center, at sqrt(1 + 0.5**2) times the size
+            self.half = math.ceil(size * math.hypot(1, 0.5)) + 1
+            self.atlas = {}
+
+    def get_sprites(self, color):
+        """Returns the sprites of a color for every heading, drawing them the first time."""
+
+        color = tuple(color)
+        sprites = self.atlas.get(color)
+        if sprites is None:
+            sprites = [self.render(color, 2 * math.pi * heading / self.headings)
+                       for heading in range(self.headings)]
+            self.atlas[color] = sprites
+        return sprites
+
+    def render(self, color, angle):
+        """Draws the same triangle Canvas used to draw for every boid, pointing at the angle."""
+
+        # A color key blits much faster than per pixel alpha. The inverted color can never be the boid's color
+        key = [255 - rgb for rgb in color]
+        surface = pygame.Surface((self.half * 2, self.half * 2))
+        surface.fill(key)
+        center = Vector(self.half, self.half)
+        direction = Vector(math.cos(angle), math.sin(angle))
+        perpendicular = Vector(direction.y, -direction.x) / 2
+        points = [center + direction * self.size,
+                  center - direction * self.size + perpendicular * self.size,
+                  center - direction * self.size - perpendicular * self.size]
+        pygame.draw.polygon(surface, color, points)
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert() # Blits faster in the screen's pixel format
+        surface.set_colorkey(key, pygame.RLEACCEL)
+        return surface
+
+    def get_heading(self, velocity_x, velocity_y):
+        """Returns the index of the sprite closest to the direction of a velocity."""
+
+        if velocity_x == 0 and velocity_y == 0: # It has no direction to point
+            velocity_y = 1
+        return round(math.atan2(velocity_y, velocity_x) * self.headings / (2 * math.pi)) % self.headings
+
+    def get_headings(self, velocities):
+        """Returns the index of the sprite closest to the direction of every velocity."""
+
+        still = (velocities[:, 0] == 0) & (velocities[:, 1] == 0)
+        angles = np.arctan2(np.where(still, 1, velocities[:, 1]), velocities[:, 0])
+        return np.rint(angles * self.headings / (2 * np.pi)).astype(np.int64) % self.headings
+
+    def draw_boids(self, screen, boids, alpha=1):
+        """Draws a list of Boid objects with one blits call, alpha of the way from
+        where they were before the last step to their position."""
+
+        blits = []
+        sprites = None
+        sprites_color = None
+        half = self.half
+        scale = self.headings / (2 * math.pi)
+        headings = self.headings
+        atan2 = math.atan2
+        for boid in boids:
+            if boid.color != sprites_color: # The boids are usually all the same color
+                sprites_color = boid.color
+                sprites = self.get_sprites(sprites_color)
+
+            x, y = boid.position
+            if alpha < 1:
+                previous_x, previous_y = boid.previous_position
+                x = previous_x + (x - previous_x) * alpha
+                y = previous_y + (y - previous_y) * alpha
+
+            velocity_x, velocity_y = boid.velocity
+            if velocity_x == 0 and velocity_y == 0: # It has no direction to point
+                velocity_y = 1
+            # Same as get_heading, without the call for every boid
+            sprite = sprites[round(atan2(velocity_y, velocity_x) * scale) % headings]
+            blits.append((sprite, (round(x) - half, round(y) - half)))
+        screen.blits(blits, doreturn=False)
+
+    def draw_flock(self, screen, positions, velocities, colors):
+        """Draws the boids of a Flock's arrays with one blits call, working out
+        every boid's sprite and corner at once."""
+
+        # Give every color its own run of sprites in one table. Packing each color into one
+        # number makes finding the different colors much faster than comparing rows
+        codes = colors.astype(np.int64) @ np.array((1 << 16, 1 << 8, 1))
+        unique_codes, color_indices = np.unique(codes, return_inverse=True)
+        table = []
+        for code in unique_codes.tolist():
+            table += self.get_sprites((code >> 16, (code >> 8) & 255, code & 255))
+        indices = color_indices * self.headings + self.get_headings(velocities)
+        corners = (np.rint(positions) - self.half).astype(np.int64)
+        screen.blits(zip(map(table.__getitem__, indices.tolist()), map(tuple, corners.tolist())), doreturn=False)
@@ -0,0 +1,89 @@
+import unittest
+import random
+import numpy as np
+import pygame
+from pygame.math import Vector2 as Vector
+from boid import Boid
+from sprites import BoidSprites
+
+
+class TestBoidSpritesMethods(unittest.TestCase):
+    def setUp(self):
+        """Sets up sprites for boids of size 8 and some random boids before every test."""
+
+        random.seed(3)
+        self.sprites = BoidSprites(headings=32)
+        self.sprites.set_size(8)
+        self.boids = [Boid({}, Vector(random.uniform(20, 280), random.uniform(20, 180)),
+                           Vector(random.uniform(-5, 5), random.uniform(-5, 5)),
+                           color=random.choice([(227, 220, 194), (255, 0, 0)]))
+                      for _ in range(50)]
+        self.boids[0].velocity = Vector(0, 0)
+
+    def test_1_cache(self):
+        """Test that the sprites are only drawn again when the size changes."""
+
+        sprites = self.sprites.get_sprites((227, 220, 194))
+        with self.subTest("Sprite for every heading not made."):
+            self.assertEqual(len(sprites), 32)
+
+        with self.subTest("Sprites drawn again for the same size."):
+            self.sprites.set_size(8)
+            self.assertIs(self.sprites.get_sprites([227, 220, 194]), sprites)
+
+        with self.subTest("Sprites not drawn again for a new size."):
+            self.sprites.set_size(12)
+            self.assertIsNot(self.sprites.get_sprites((227, 220, 194)), sprites)
+            self.assertGreater(self.sprites.get_sprites((227, 220, 194))[0].get_width(), sprites[0].get_width())
+
+    def test_2_headings(self):
+        """Test that velocities pick the closest heading, and no velocity points down like before."""
+
+        velocities = np.array([[1, 0], [0, 1], [-1, 0], [0, -1], [0, 0], [1, 0.05]])
+        expected = [0, 8, 16, 24, 8, 0]
+        with self.subTest("Wrong headings picked at once."):
+            self.assertEqual(self.sprites.get_headings(velocities).tolist(), expected)
+
+        with self.subTest("Wrong heading picked for one velocity."):
+            self.assertEqual([self.sprites.get_heading(*velocity) for velocity in velocities.tolist()], expected)
+
+    def test_3_draw(self):
+        """Test that Boid objects and a Flock's arrays are drawn the same, close to where the triangles were."""
+
+        objects_screen = pygame.Surface((300, 200))
+        self.sprites.draw_boids(objects_screen, self.boids)
+        arrays_screen = pygame.Surface((300, 200))
+        self.sprites.draw_flock(arrays_screen,
+                                np.array([boid.position for boid in self.boids]),
+                                np.array([boid.velocity for boid in self.boids]),
+                                np.array([boid.color for boid in self.boids], dtype=np.uint8))
+        with self.subTest("Boid objects and arrays drawn differently."):
+            self.assertEqual(pygame.image.tobytes(objects_screen, "RGB"), pygame.image.tobytes(arrays_screen, "RGB"))
+
+        polygon_screen = pygame.Surface((300, 200))
+        for boid in self.boids:
+            direction = boid.velocity.normalize() if boid.velocity.length() else Vector(0, 1)
+            perpendicular = Vector(direction.y, -direction.x) / 2
+            pygame.draw.polygon(polygon_screen, boid.color, [boid.position + direction * 8,
+                                                             boid.position - direction * 8 + perpendicular * 8,
+                                                             boid.position - direction * 8 - perpendicular * 8])
+        drawn = pygame.surfarray.array3d(objects_screen).any(axis=2)
+        expected = pygame.surfarray.array3d(polygon_screen).any(axis=2)
+        with self.subTest("Sprites far from the triangles."):
+            self.assertGreater((drawn & expected).sum(), 0.75 * expected.sum())
+
+        for boid in self.boids:
+            boid.previous_position.update(boid.position - boid.velocity * 4)
+        objects_screen.fill((0, 0, 0))
+        arrays_screen.fill((0, 0, 0))
+        self.sprites.draw_boids(objects_screen, self.boids, 0.5)
+        self.sprites.draw_flock(arrays_screen,
+                                np.array([boid.position - boid.velocity * 2 for boid in self.boids]),
+                                np.array([boid.velocity for boid in self.boids]),
+                                np.array([boid.color for boid in self.boids], dtype=np.uint8))
+        with self.subTest("Boid objects not drawn between their previous and current positions."):
+            self.assertEqual(pygame.image.tobytes(objects_screen, "RGB"), pygame.image.tobytes(arrays_screen, "RGB"))
+
+
+if __name__ == "__main__":
+    unittest.main()
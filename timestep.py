@@ -0,0 +1,37 @@
+class FixedTimestep:
+    """Turns the varying time between frames into a whole number of equal sized
+    simulation steps, so a slow frame runs several normal steps instead of one huge one.
+    The time left over is kept for the next frame and used to interpolate the drawing."""
+
+    def __init__(self, step_size=1 / 60, max_steps=5):
+        self.step_size = step_size # Seconds of simulation per step
+        self.max_steps = max_steps # Most steps to catch up on in a single frame
+        self.accumulator = 0 # Time that hasn't been simulated yet
+        self.fast_forward_steps = 0 # When above 0, run exactly this many steps every frame
+
+    def advance(self, frame_time):
+        """Adds the time the last frame took and returns how many steps to simulate."""
+
+        if self.fast_forward_steps:
+            # Run as fast as possible and only show the last step
+            self.accumulator = 0
+            return self.fast_forward_steps
+
+        self.accumulator += frame_time
+        steps = int(self.accumulator // self.step_size)
+        if steps > self.max_steps:
+            # Too far behind to catch up, so forget about the extra time instead of falling further behind
+            self.accumulator = 0
+            return self.max_steps
+
+        self.accumulator -= steps * self.step_size
+        return steps
+
+    @property
+    def alpha(self):
+        """How far between the last two steps the current time is, from 0 to 1."""
+
+        if self.fast_forward_steps:
+            return 1
+
+        return min(self.accumulator / self.step_size, 1)
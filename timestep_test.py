@@ -0,0 +1,70 @@
+import unittest
+from timestep import FixedTimestep
+
+
+class TestFixedTimestepMethods(unittest.TestCase):
+    def setUp(self):
+        """Sets up a timestep of 1/60th of a second steps before every test."""
+
+        self.timestep = FixedTimestep(step_size=1 / 60, max_steps=5)
+
+    def test_1_accumulator(self):
+        """Test that frame times add up into whole steps and the rest is kept for the next frame."""
+
+        with self.subTest("Step taken before a whole step passed."):
+            self.assertEqual(self.timestep.advance(0.01), 0)
+            self.assertAlmostEqual(self.timestep.accumulator, 0.01)
+
+        with self.subTest("Leftover time lost."):
+            self.assertEqual(self.timestep.advance(0.01), 1)
+            self.assertAlmostEqual(self.timestep.accumulator, 0.02 - 1 / 60)
+
+        with self.subTest("Wrong number of steps for a slow frame."):
+            self.assertEqual(self.timestep.advance(3 / 60), 3)
+            self.assertAlmostEqual(self.timestep.accumulator, 0.02 - 1 / 60)
+
+    def test_2_max_steps(self):
+        """Test that a very slow frame only runs max_steps and forgets the rest of its time."""
+
+        self.timestep.advance(0.005)
+        with self.subTest("More than max_steps."):
+            self.assertEqual(self.timestep.advance(1), 5)
+
+        with self.subTest("Extra time kept."):
+            self.assertEqual(self.timestep.accumulator, 0)
+            self.assertEqual(self.timestep.advance(0.001), 0)
+
+    def test_3_fast_forward(self):
+        """Test that fast forward runs its steps every frame no matter how long the frame took."""
+
+        self.timestep.advance(0.01)
+        self.timestep.fast_forward_steps = 16
+        for frame_time in (0, 0.001, 1):
+            with self.subTest("Wrong number of steps.", frame_time=frame_time):
+                self.assertEqual(self.timestep.advance(frame_time), 16)
+                self.assertEqual(self.timestep.accumulator, 0)
+
+        with self.subTest("Not drawn at the last step."):
+            self.assertEqual(self.timestep.alpha, 1)
+
+        self.timestep.fast_forward_steps = 0
+        with self.subTest("Time from fast forward kept afterwards."):
+            self.assertEqual(self.timestep.advance(0.01), 0)
+
+    def test_4_alpha(self):
+        """Test that alpha is how far the leftover time is into the next step."""
+
+        with self.subTest("Not 0 at the start."):
+            self.assertEqual(self.timestep.alpha, 0)
+
+        self.timestep.advance(1.5 / 60)
+        with self.subTest("Not halfway."):
+            self.assertAlmostEqual(self.timestep.alpha, 0.5)
+
+        self.timestep.accumulator = 2 / 60 # More than a step can't be drawn past the newest step
+        with self.subTest("Past 1."):
+            self.assertEqual(self.timestep.alpha, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
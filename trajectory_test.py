@@ -0,0 +1,57 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+from boids.flock import Flock
+from boids.settings import create_settings
+from boids.params import SimulationParams
+from boids.trajectory import TrajectoryWriter, TrajectoryReader
+import simulation
+
+
+class TestTrajectoryMethods(unittest.TestCase):
+    def setUp(self):
+        """Sets up a random flock before every test."""
+
+        self.rng = np.random.default_rng(1)
+        self.flock = Flock()
+        self.flock.spawn(300, 400, 300, 3, 6, (227, 220, 194), self.rng)
+        self.active_area = ((100, 100), (200, 100))
+
+    def test_1_trajectory(self):
+        """Test that recorded frames are read back the same, across chunks, population and color changes."""
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "run.traj")
+        recorded = []
+        recorded_colors = []
+        writer = TrajectoryWriter(path, 1 / 60, chunk_frames=4)
+        for step in range(10):
+            if step == 3:
+                self.flock.colors[:5] = (255, 0, 0) # Changed in place, in the middle of a chunk
+            if step == 6:
+                self.flock.remove_random(20, self.rng)
+            simulation.simulate(self.flock, self.active_area, SimulationParams(create_settings()), None, [], 1 / 60)
+            writer.append(self.flock.positions, self.flock.velocities, self.flock.colors)
+            recorded.append(self.flock.positions.copy())
+            recorded_colors.append(self.flock.colors.copy())
+
+        writer.flush() # Everything is written except the index
+        with self.subTest("Unclosed file."):
+            self.assertEqual(len(TrajectoryReader(path)), 10)
+
+        writer.close()
+        reader = TrajectoryReader(path)
+        with self.subTest("Frame count."):
+            self.assertEqual(len(reader), 10)
+        for frame in (0, 2, 3, 5, 6, 9):
+            with self.subTest(frame=frame):
+                self.assertTrue(np.allclose(reader.get_frame(frame).positions, recorded[frame], atol=1e-3))
+                self.assertTrue(np.array_equal(reader.get_frame(frame).colors, recorded_colors[frame]))
+                self.assertEqual(reader.get_step(frame), frame)
+        reader.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
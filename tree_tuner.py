@@ -0,0 +1,172 @@
+import json
+import math
+import os
+import statistics
+
+# The FrameTimer phases that depend on the node sizes, which are what the tuner times
+PHASES = ("queries", "tree updates")
+# Changes to (min per node, max per node) tried from the best values so far, as multiples of the step size
+MOVES = ((0, 1), (0, -1), (1, 0), (-1, 0))
+
+
+def get_bucket(boids, view_distance):
+    """Groups flocks that likely need the same node sizes, by rounding the
+    number of boids to a power of 2 and the view distance to a multiple of 10."""
+
+    return f"{2 ** round(math.log2(max(boids, 1)))} boids, {round(view_distance / 10) * 10} view"
+
+
+def load_cache(path):
+    """Returns the tuned node sizes saved for every bucket, or nothing if there aren't any yet."""
+
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+class TreeTuner:
+    """Finds the quad tree's min and max per node settings that make the tree's queries
+    and updates fastest by hill climbing, leaving out the rest of the step. Each pair of values is given a few steps for the
+    tree to settle, then timed over a window of steps. A change is only kept if it
+    beats the best time by the hysteresis, so noise doesn't send it back and forth.
+    Once no change helps it waits a while before trying again, since the flock changes.
+    The best values for each bucket of boid count and view distance are saved to a cache
+    file, so a later run with a similar flock starts from them."""
+
+    def __init__(self, params, cache_path="tree_tuning.json", window=60, settle=30, hysteresis=0.05, recheck=1800):
+        self.params = params
+        self.cache_path = cache_path
+        self.cache = load_cache(cache_path)
+        self.window = window # Steps timed for each pair of values
+        self.settle = settle # Steps skipped after changing the values
+        self.hysteresis = hysteresis # Fraction faster a change has to be to be kept
+        self.recheck = recheck # Steps to wait after settling before trying to improve again
+        self.bucket = None
+        self.best = None # The fastest (min per node, max per node) so far
+        self.best_cost = None # Median seconds of tree work per step of the best values
+        self.trying = None # The move from the best values being timed
+        self.moves = [] # Moves left to try from the best values
+        self.costs = []
+        self.skip = 0
+        self.waiting = 0 # Steps left before trying to improve again
+        self.applying = False
+        params.add_listener(self.on_setting_changed)
+
+    def on_setting_changed(self, name, params):
+        """Starts over from the node sizes someone else set."""
+
+        if name in ("min per node", "max per node") and not self.applying:
+            self.start(self.bucket, (params.min_per_node, params.max_per_node))
+
+    def start(self, bucket, values):
+        """Starts climbing from the values by timing them first."""
+
+        self.bucket = bucket
+        self.best = values
+        self.best_cost = None
+        self.trying = None
+        self.moves = list(MOVES)
+        self.waiting = 0
+        self.apply(values)
+
+    def apply(self, values):
+        """Changes the settings, which tells the tree, then skips the steps it takes to settle."""
+
+        self.applying = True
+        self.params.set("min per node", values[0])
+        self.params.set("max per node", values[1])
+        self.applying = False
+        self.costs = []
+        self.skip = self.settle
+
+    def record(self, seconds):
+        """Adds how long the tree's queries and updates took in the last simulation step."""
+
+        bucket = get_bucket(self.params.boids, self.params.view_distance)
+        if bucket != self.bucket:
+            cached = self.cache.get(bucket)
+            if cached:
+                self.start(bucket, (cached["min per node"], cached["max per node"]))
+            else:
+                self.start(bucket, (self.params.min_per_node, self.params.max_per_node))
+            return
+
+        if self.waiting:
+            self.waiting -= 1
+            if not self.waiting:
+                self.start(bucket, self.best) # See if the flock has changed enough for other values to be better
+            return
+
+        if self.skip:
+            self.skip -= 1
+            return
+
+        self.costs.append(seconds)
+        if len(self.costs) >= self.window:
+            self.evaluate(statistics.median(self.costs))
+
+    def evaluate(self, cost):
+        """Keeps the values being tried if they beat the best, then tries the next move."""
+
+        if self.trying is None:
+            self.best_cost = cost # The starting values
+        elif cost < self.best_cost * (1 - self.hysteresis):
+            self.best = self.get_values(self.trying)
+            self.best_cost = cost
+            opposite = (-self.trying[0], -self.trying[1])
+            # Keep going the same way first
+            self.moves = [self.trying] + [move for move in MOVES if move not in (self.trying, opposite)]
+            self.save()
+
+        self.try_next_move()
+
+    def get_values(self, move):
+        """The values one move away from the best values. Each move is about a quarter of the value."""
+
+        minimum, maximum = self.best
+        return (minimum + move[0] * max(1, round(minimum / 4)),
+                maximum + move[1] * max(1, round(maximum / 4)))
+
+    def is_valid(self, values):
+        minimum, maximum = values
+        settings = self.params.settings
+        return (settings["min per node"]["min"] <= minimum and maximum <= settings["max per node"]["max"]
+                and minimum < maximum)
+
+    def try_next_move(self):
+        """Times the next move that gives valid values, or stays at the best values if there are none left."""
+
+        while self.moves:
+            self.trying = self.moves.pop(0)
+            values = self.get_values(self.trying)
+            if self.is_valid(values):
+                self.apply(values)
+                return
+
+        self.trying = None
+        self.apply(self.best)
+        self.waiting = self.recheck
+        self.save()
+
+    def save(self):
+        """Saves the best values for the bucket to the cache file."""
+
+        self.cache[self.bucket] = {"min per node": self.best[0],
+                                   "max per node": self.best[1],
+                                   "ms per step": round(self.best_cost * 1000, 4)}
+        temporary_path = self.cache_path + ".tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(self.cache, file, indent=4)
+        os.replace(temporary_path, self.cache_path)
+
+    def get_status(self):
+        """Returns a line of text describing what the tuner is doing."""
+
+        if self.best is None:
+            return "Auto-tune: starting"
+
+        state = "tuned" if self.waiting else "tuning"
+        cost = f", {self.best_cost * 1000:.2f} ms per step" if self.best_cost is not None else ""
+        return f"Auto-tune: {state} min/max per node {self.best[0]}/{self.best[1]}{cost}"
@@ -0,0 +1,56 @@
+import unittest
+import os
+import tempfile
+from tree_tuner import TreeTuner, load_cache, get_bucket
+from boids.settings import create_settings
+from boids.params import SimulationParams
+
+
+class TestTreeTunerMethods(unittest.TestCase):
+    def setUp(self):
+        """Sets up a tuner with a short window and its own cache file before every test."""
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache_path = os.path.join(directory.name, "tuning.json")
+        self.params = SimulationParams(create_settings())
+        self.tuner = TreeTuner(self.params, self.cache_path, window=3, settle=1, recheck=1000)
+
+    def get_cost(self):
+        """A made up step time that is fastest at 6 min and 30 max per node."""
+
+        return 1 + 0.01 * ((self.params.min_per_node - 6) ** 2 + (self.params.max_per_node - 30) ** 2)
+
+    def test_1_climbs_and_caches(self):
+        """Test that the tuner moves towards faster node sizes, settles and remembers them."""
+
+        start_cost = self.get_cost()
+        for _ in range(400):
+            self.tuner.record(self.get_cost())
+
+        with self.subTest("Not faster."):
+            self.assertLess(self.get_cost(), start_cost * 0.5)
+        with self.subTest("Not settled."):
+            self.assertTrue(self.tuner.waiting)
+
+        cached = load_cache(self.cache_path)[get_bucket(self.params.boids, self.params.view_distance)]
+        with self.subTest("Not cached."):
+            self.assertEqual((cached["min per node"], cached["max per node"]),
+                             (self.params.min_per_node, self.params.max_per_node))
+
+        params = SimulationParams(create_settings())
+        TreeTuner(params, self.cache_path).record(1)
+        with self.subTest("Didn't start from the cache."):
+            self.assertEqual((params.min_per_node, params.max_per_node),
+                             (self.params.min_per_node, self.params.max_per_node))
+
+    def test_2_user_change(self):
+        """Test that setting the node sizes by hand makes the tuner start from them."""
+
+        self.tuner.record(1)
+        self.params.set("max per node", 40)
+        self.assertEqual(self.tuner.best, (self.params.min_per_node, 40))
+
+
+if __name__ == "__main__":
+    unittest.main()